@@ -0,0 +1,366 @@
+"""
+Persistent position analysis store.
+
+Finished searches are recorded here (position key -> best move, score, depth,
+nodes) so positions that come up again - typically the popular ones just
+past the opening book - can be answered without searching, also after a
+restart. Positions are identified by their Zobrist key (zobrist.py), which
+is seeded and therefore the same in every process and run.
+
+A key says nothing about how the game reached the position, while a search
+score can depend on it (repetitions, the fifty-move rule). The store is
+only read and written for positions where the game's history cannot matter
+(is_storable): a small halfmove clock and no repeated position.
+
+The store is one fixed-size file mapped into memory by every process that
+uses it (API server, engine workers), so its size never grows. Writes go to
+the shared mapping and reach the disk in the background (write-behind);
+flush() only asks the OS to write dirty pages out now. Like the
+transposition table, slots are written without locks: each slot carries a
+check word, so a slot torn by two processes writing at once reads as empty.
+
+File layout: a HEADER_BYTES header, then buckets of BUCKET_SIZE slots of
+four 64-bit words:
+    word 0: position key
+    word 1: best move (bits 0-15), depth (bits 16-23),
+            score in 1/VALUE_SCALE centipawns offset to unsigned (bits 32-63)
+    word 2: nodes (bits 0-47), day stored (bits 48-63, days since DAY_ZERO)
+    word 3: word 0 ^ word 1 ^ word 2
+
+A file with another format or key scheme is never truncated in place,
+since other processes may have it mapped: a fresh file is written next to
+it and renamed over it. Processes that mapped the old file keep using it
+until they restart.
+
+Every process holds a shared lock (flock) on the file it has mapped.
+Run `python analysis_store.py stats|compact ...` for maintenance; see main().
+Compaction must run offline: it replaces the file, so writes that running
+processes make to the old one would be lost, and it refuses to start while
+another process has the store open.
+"""
+import argparse
+import fcntl
+import mmap
+import os
+import struct
+import time
+from typing import Iterator, Optional, Tuple
+import bulletchess
+from transposition import VALUE_SCALE, VALUE_OFFSET, VALUE_LIMIT, encode_move, decode_move
+from zobrist import SIDE_KEY, compute_key
+
+ANALYSIS_STORE_PATH = os.environ.get("ANALYSIS_STORE_PATH", "data/analysis.bin")  # "" disables
+ANALYSIS_STORE_MB = float(os.environ.get("ANALYSIS_STORE_MB", 64))
+# Stored searches at least this deep answer bot moves without searching
+ANALYSIS_MIN_DEPTH = int(os.environ.get("ANALYSIS_MIN_DEPTH", 6))
+# Positions further from the last capture or pawn move are not stored or probed
+ANALYSIS_MAX_HALFMOVE = 20
+
+MAGIC = b"CMANALY1"
+HEADER = struct.Struct("<8sQQ")  # magic, number of buckets, key scheme check
+HEADER_BYTES = 64
+BUCKET_SIZE = 4
+WORDS_PER_SLOT = 4
+SLOT_BYTES = WORDS_PER_SLOT * 8
+KEY_MASK = 0xFFFFFFFFFFFFFFFF
+NODES_MASK = (1 << 48) - 1
+MAX_STORED_DEPTH = 0xFF
+DAY_ZERO = 1577836800  # 2020-01-01 UTC
+# Changes whenever the Zobrist tables do, which invalidates stored keys
+KEY_SCHEME = SIDE_KEY
+
+
+class AnalysisEntry:
+    __slots__ = ("best_move", "score", "depth", "nodes", "day")
+    def __init__(self, best_move: Optional[bulletchess.Move], score: float, depth: int,
+                 nodes: int, day: int):
+        self.best_move = best_move
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.day = day
+
+
+def _today() -> int:
+    return int((time.time() - DAY_ZERO) // 86400)
+
+def _num_buckets(size_mb: float) -> int:
+    num_buckets = 1
+    while num_buckets * 2 * BUCKET_SIZE * SLOT_BYTES <= size_mb * 1024 * 1024:
+        num_buckets *= 2
+    return num_buckets
+
+def is_storable(board: bulletchess.Board) -> bool:
+    """
+    Whether a score for `board` holds in any game reaching it: the fifty-move
+    rule is far away and no position since the last irreversible move repeats.
+    """
+    if board.halfmove_clock > ANALYSIS_MAX_HALFMOVE:
+        return False
+    if board.halfmove_clock < 4:
+        return True  # A repetition needs at least 4 reversible plies
+    previous = board.copy()
+    keys = {compute_key(previous)}
+    for _ in range(min(board.halfmove_clock, len(previous.history))):
+        previous.undo()
+        key = compute_key(previous)
+        if key in keys:
+            return False
+        keys.add(key)
+    return True
+
+
+class AnalysisStore:
+    """A memory-mapped, fixed-size key -> analysis table in `path`."""
+
+    def __init__(self, path: str, size_mb: float = ANALYSIS_STORE_MB):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Several workers start at once: only one may create/initialize the file
+        with open(path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._open(path, size_mb)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _open(self, path: str, size_mb: float):
+        num_buckets = _read_header(path)
+        if num_buckets is None:
+            # New file, other format or other key scheme: start empty
+            num_buckets = _num_buckets(size_mb)
+            _create(path, num_buckets)
+        fd = os.open(path, os.O_RDWR)
+        try:
+            self.map = mmap.mmap(fd, 0)
+        except BaseException:
+            os.close(fd)
+            raise
+        # Kept open for the shared lock that tells compact() the file is in use
+        self.fd = fd
+        fcntl.flock(fd, fcntl.LOCK_SH)
+        self.num_buckets = num_buckets
+        self.bucket_mask = num_buckets - 1
+        self.words = memoryview(self.map)[HEADER_BYTES:].cast("Q")
+
+    @property
+    def num_slots(self) -> int:
+        return self.num_buckets * BUCKET_SIZE
+
+    def _slot_range(self, key: int) -> range:
+        start = (key & self.bucket_mask) * BUCKET_SIZE * WORDS_PER_SLOT
+        return range(start, start + BUCKET_SIZE * WORDS_PER_SLOT, WORDS_PER_SLOT)
+
+    def probe(self, key: int) -> Optional[AnalysisEntry]:
+        key &= KEY_MASK
+        words = self.words
+        for i in self._slot_range(key):
+            if words[i] == key and words[i + 1]:
+                return self._decode(i)
+        return None
+
+    def _decode(self, i: int) -> Optional[AnalysisEntry]:
+        words = self.words
+        key, info, extra, check = words[i], words[i + 1], words[i + 2], words[i + 3]
+        if not info or key ^ info ^ extra != check:
+            return None  # Empty, or torn by concurrent writers
+        return AnalysisEntry(
+            decode_move(info & 0xFFFF),
+            ((info >> 32) - VALUE_OFFSET) / VALUE_SCALE,
+            (info >> 16) & 0xFF,
+            extra & NODES_MASK,
+            extra >> 48,
+        )
+
+    def record(self, key: int, best_move: bulletchess.Move, score: float, depth: int,
+               nodes: int, day: Optional[int] = None):
+        """Store a finished search unless an equally deep one is already stored."""
+        key &= KEY_MASK
+        words = self.words
+        slot = -1
+        for i in self._slot_range(key):
+            if words[i + 1] and words[i] == key:
+                if ((words[i + 1] >> 16) & 0xFF) > depth:
+                    return
+                slot = i
+                break
+        if slot < 0:
+            # An empty slot, else the shallowest entry that is not deeper than this one
+            shallowest = 0
+            for i in self._slot_range(key):
+                info = words[i + 1]
+                if not info:
+                    slot = i
+                    break
+                stored_depth = (info >> 16) & 0xFF
+                if stored_depth <= depth and (slot < 0 or stored_depth < shallowest):
+                    slot, shallowest = i, stored_depth
+            if slot < 0:
+                return  # Bucket full of deeper analysis
+
+        score = max(-VALUE_LIMIT, min(VALUE_LIMIT, score))
+        info = (
+            (int(round(score * VALUE_SCALE)) + VALUE_OFFSET) << 32
+            | min(max(depth, 1), MAX_STORED_DEPTH) << 16
+            | encode_move(best_move)
+        )
+        extra = ((_today() if day is None else day) & 0xFFFF) << 48 | min(nodes, NODES_MASK)
+        words[slot] = key
+        words[slot + 1] = info
+        words[slot + 2] = extra
+        words[slot + 3] = key ^ info ^ extra
+
+    def entries(self) -> Iterator[Tuple[int, AnalysisEntry]]:
+        """All valid entries (key, entry)."""
+        words = self.words
+        for i in range(0, self.num_slots * WORDS_PER_SLOT, WORDS_PER_SLOT):
+            if words[i + 1]:
+                entry = self._decode(i)
+                if entry is not None:
+                    yield words[i], entry
+
+    def flush(self):
+        """Write dirty pages to disk now instead of whenever the OS gets to it."""
+        self.map.flush()
+
+    def close(self):
+        self.words.release()
+        self.map.close()
+        os.close(self.fd)
+
+
+def _read_header(path: str) -> Optional[int]:
+    """Number of buckets of the store at `path`, None if missing or not usable."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+    try:
+        header = os.pread(fd, HEADER.size, 0)
+        if len(header) != HEADER.size:
+            return None
+        magic, num_buckets, scheme = HEADER.unpack(header)
+        if (magic == MAGIC and scheme == KEY_SCHEME and num_buckets > 0
+                and os.fstat(fd).st_size == HEADER_BYTES + num_buckets * BUCKET_SIZE * SLOT_BYTES):
+            return num_buckets
+        return None
+    finally:
+        os.close(fd)
+
+def _create(path: str, num_buckets: int):
+    """Write an empty store next to `path` and rename it over `path`."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.ftruncate(fd, HEADER_BYTES + num_buckets * BUCKET_SIZE * SLOT_BYTES)
+        os.pwrite(fd, HEADER.pack(MAGIC, num_buckets, KEY_SCHEME), 0)
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, path)
+
+def _in_use(path: str) -> bool:
+    """Whether another process has the store at `path` open."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+    return False
+
+
+# One store per process, opened on first use
+_store: Optional[AnalysisStore] = None
+
+def get_analysis_store() -> Optional[AnalysisStore]:
+    """The process's store, or None when ANALYSIS_STORE_PATH is empty."""
+    global _store
+    if _store is None and ANALYSIS_STORE_PATH:
+        _store = AnalysisStore(ANALYSIS_STORE_PATH)
+    return _store
+
+# -------------------------
+# Maintenance
+# -------------------------
+def compact(path: str, size_mb: float, min_depth: int = 1, max_age_days: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Rewrite the store at `path` as a `size_mb` file holding its most valuable
+    entries: deepest first, then most nodes, then most recent. Entries below
+    `min_depth` or older than `max_age_days` are dropped.
+    Returns (entries kept, entries dropped).
+
+    Must run while no server uses the store; raises RuntimeError otherwise.
+    """
+    if _in_use(path):
+        raise RuntimeError(f"{path} is open in another process; stop the server before compacting")
+    old = AnalysisStore(path)
+    today = _today()
+    candidates = []
+    total = 0
+    for key, entry in old.entries():
+        total += 1
+        if entry.depth < min_depth:
+            continue
+        if max_age_days is not None and today - entry.day > max_age_days:
+            continue
+        candidates.append((entry.depth, entry.nodes, entry.day, key, entry))
+    old.close()
+
+    tmp_path = path + ".compact"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    new = AnalysisStore(tmp_path, size_mb)
+    # Insert the least valuable first so that collisions keep the most valuable
+    candidates.sort(key=lambda c: c[:3])
+    for _, _, _, key, entry in candidates:
+        new.record(key, entry.best_move, entry.score, entry.depth, entry.nodes, day=entry.day)
+    kept = sum(1 for _ in new.entries())
+    new.flush()
+    new.close()
+    os.replace(tmp_path, path)
+    os.remove(tmp_path + ".lock")
+    return kept, total - kept
+
+def stats(path: str) -> dict:
+    store = AnalysisStore(path)
+    depths = {}
+    count = 0
+    for _, entry in store.entries():
+        count += 1
+        depths[entry.depth] = depths.get(entry.depth, 0) + 1
+    result = {
+        "slots": store.num_slots,
+        "entries": count,
+        "fill": count / store.num_slots,
+        "file_bytes": os.path.getsize(path),
+        "depths": dict(sorted(depths.items())),
+    }
+    store.close()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the persistent analysis store")
+    parser.add_argument("--path", default=ANALYSIS_STORE_PATH or "data/analysis.bin")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Entry count, fill rate and depth histogram")
+    p = sub.add_parser("compact", help="Rewrite the file keeping its most valuable entries")
+    p.add_argument("--size-mb", type=float, default=ANALYSIS_STORE_MB, help="Size of the new file")
+    p.add_argument("--min-depth", type=int, default=1, help="Drop entries shallower than this")
+    p.add_argument("--max-age-days", type=int, default=None, help="Drop entries stored longer ago")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        for name, value in stats(args.path).items():
+            print(f"{name}: {value}")
+    elif args.command == "compact":
+        try:
+            kept, dropped = compact(args.path, args.size_mb, args.min_depth, args.max_age_days)
+        except RuntimeError as e:
+            raise SystemExit(str(e))
+        print(f"kept {kept} entries, dropped {dropped}")
+
+if __name__ == "__main__":
+    main()
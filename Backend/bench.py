@@ -0,0 +1,166 @@
+"""
+Deterministic engine benchmark.
+
+Searches BENCH_POSITIONS to a fixed depth, each from a fresh SearchContext
+(empty transposition table, history and killers) and without a clock, so
+the node count depends only on the engine's code: the total is a
+functional signature. A change meant to be a pure speed-up must leave it
+unchanged; a change to search or evaluation shows up as a new signature.
+
+Usage (from the Backend directory):
+    python bench.py [--depth D] [--tt-mb MB] [--json]
+
+Prints per position: best move, score, nodes, time, NPS, TT hit rate and
+effective branching factor (nodes ** (1 / depth)); then the totals, which
+also give the eval cache and pawn hash hit rates. With
+--json the same data is printed as one JSON document, to be saved and
+compared between commits.
+"""
+import argparse
+import json
+import time
+from typing import Any, Dict, List, Optional
+import bulletchess
+
+BENCH_DEPTH = 4
+BENCH_TT_MB = 16
+
+# Openings, middlegames and endgames; every position has legal moves
+BENCH_POSITIONS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 10",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 11",
+    "4rrk1/pp1n3p/3q2pQ/2p1pb2/2PP4/2P3N1/P2B2PP/4RRK1 b - - 7 19",
+    "rq3rk1/ppp2ppp/1bnpb3/3N2B1/3NP3/7P/PPPQ1PP1/2KR3R w - - 7 14",
+    "r1bq1r1k/1pp1n1pp/1p1p4/4p2Q/4Pp2/1BNP4/PPP2PPP/3R1RK1 w - - 2 14",
+    "r3r1k1/2p2ppp/p1p1bn2/8/1q2P3/2NPQN2/PPP3PP/R4RK1 b - - 2 15",
+    "r1bbk1nr/pp3p1p/2n5/1N4p1/2Np1B2/8/PPP2PPP/2KR1B1R w kq - 0 13",
+    "r1bq1rk1/ppp1nppp/4n3/3p3Q/3P4/1BP1B3/PP1N2PP/R4RK1 w - - 1 16",
+    "4r1k1/r1q2ppp/ppp2n2/4P3/5Rb1/1N1BQ3/PPP3PP/R5K1 w - - 1 17",
+    "2rqkb1r/ppp2p2/2npb1p1/1N1Nn2p/2P1PP2/8/PP2B1PP/R1BQK2R b KQ - 0 11",
+    "r1bq1r1k/b1p1npp1/p2p3p/1p6/3PP3/1B2NN2/PP3PPP/R2Q1RK1 w - - 1 16",
+    "3r1rk1/p5pp/bpp1pp2/8/q1PP1P2/b3P3/P2NQRPP/1R2B1K1 b - - 6 22",
+    "r1q2rk1/2p1bppp/2Pp4/p6b/Q1PNp3/4B3/PP1R1PPP/2K4R w - - 2 18",
+    "4k2r/1pb2ppp/1p2p3/1R1p4/3P4/2r1PN2/P4PPP/1R4K1 b - - 3 22",
+    "3q2k1/pb3p1p/4pbp1/2r5/PpN2N2/1P2P2P/5PP1/Q2R2K1 b - - 4 26",
+    "6k1/6p1/6Pp/ppp5/3pn2P/1P3K2/1PP2P2/8 b - - 3 54",
+    "3b4/5kp1/1p1p1p1p/pP1PpP1P/P1P1P3/3KN3/8/8 w - - 0 1",
+    "2K5/p7/7P/5pR1/8/5k2/r7/8 w - - 0 1",
+    "8/6pk/1p6/8/PP3p1p/5P2/4KP1q/3Q4 w - - 0 1",
+    "7k/3p2pp/4q3/8/4Q3/5Kp1/P6b/8 w - - 0 1",
+    "8/2p5/8/2kPKp1p/2p4P/2P5/3P4/8 w - - 0 1",
+    "8/1p3pp1/7p/5P1P/2k3P1/8/2K2P2/8 w - - 0 1",
+    "8/pp2r1k1/2p1p3/3pP2p/1P1P1P1P/P5KR/8/8 w - - 0 1",
+    "8/3p4/p1bk3p/Pp6/1Kp1PpPp/2P2P1P/2P5/5B2 b - - 0 1",
+    "5k2/7R/4P2p/5K2/p1r2P1p/8/8/8 b - - 0 1",
+    "6k1/6p1/P6p/r1N5/5p2/7P/1b3PP1/4R1K1 w - - 0 1",
+    "1r3k2/4q3/2Pp3b/3Bp3/2Q2p2/1p1P2P1/1P2KP2/3N4 w - - 0 1",
+    "6k1/4pp1p/3p2p1/P1pPb3/R7/1r2P1PP/3B1P2/6K1 w - - 0 1",
+    "8/3p3B/5p2/5P2/p7/PP5b/k7/6K1 w - - 0 1",
+    "5rk1/q6p/2p3bR/1pPp1rP1/1P1Pp3/P3B1Q1/1K3P2/R7 w - - 93 90",
+    "4rrk1/1p1nq3/p7/2p1P1pp/3P2bp/3Q1Bn1/PPPB4/1K2R1NR w - - 40 21",
+    "r3k2r/3nnpbp/q2pp1p1/p7/Pp1PPPP1/4BNN1/1P5P/R2Q1RK1 w kq - 0 16",
+    "3Qb1k1/1r2ppb1/pN1n2q1/Pp1Pp1Pr/4P2p/4BP2/4B1R1/1R5K b - - 11 40",
+    "4k3/3q1r2/1N2r1b1/3ppN2/2nPP3/1B1R2n1/2R1Q3/3K4 w - - 5 1",
+    "8/8/8/8/5kp1/P7/8/1K1N4 w - - 0 1",
+    "8/8/8/5N2/8/p7/8/2NK3k w - - 0 1",
+    "8/8/1P6/5pr1/8/4R3/7k/2K5 w - - 0 1",
+    "8/2p4P/8/kr6/6R1/8/8/1K6 w - - 0 1",
+    "8/8/3P3k/8/1p6/8/1P6/1K3n2 b - - 0 1",
+    "8/R7/2q5/8/6k1/8/1P5p/K6R w - - 0 124",
+    "6k1/3b3r/1p1p4/p1n2p2/1PPNpP1q/P3Q1p1/1R1RB1P1/5K2 b - - 0 1",
+    "r2r1n2/pp2bk2/2p1p2p/3q4/3PN1QP/2P3R1/P4PP1/5RK1 w - - 0 1",
+    "r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP1QBPPP/R3KB1R w KQ - 0 8",
+    "r2q1rk1/1b1nbppp/p2ppn2/1p6/3NP3/1BN1BP2/PPPQ2PP/2KR3R w - - 0 12",
+    "2r2rk1/pp1bqppp/2n1pn2/3p4/3P4/2PBPN2/P1Q2PPP/R1B2RK1 w - - 0 13",
+    "rnbqkbnr/ppp2ppp/8/3pp3/4P3/5Q2/PPPP1PPP/RNB1KBNR b KQkq - 1 3",
+    "4k3/8/8/8/8/8/3q4/R3K3 w Q - 0 1",
+    "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+    "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+]
+
+def bench_position(fen: str, depth: int, tt_mb: float) -> Dict[str, Any]:
+    from chess_engine import SearchContext, get_best_move_and_eval
+
+    ctx = SearchContext(tt_size_mb=tt_mb)
+    board = bulletchess.Board.from_fen(fen)
+    start = time.perf_counter()
+    move, score = get_best_move_and_eval(board, time_limit=float("inf"), max_depth=depth, ctx=ctx)
+    elapsed = time.perf_counter() - start
+    nodes = ctx.nodes_searched
+    return {
+        "fen": fen,
+        "move": move,
+        "score": score,
+        "depth": ctx.depth_reached,
+        "nodes": nodes,
+        "time": elapsed,
+        "nps": nodes / elapsed if elapsed else 0.0,
+        "tt_hit_rate": ctx.tt_hits / nodes if nodes else 0.0,
+        "eval_probes": ctx.stats.eval_probes,
+        "eval_hits": ctx.stats.eval_hits,
+        "pawn_probes": ctx.stats.pawn_probes,
+        "pawn_hits": ctx.stats.pawn_hits,
+        "ebf": nodes ** (1 / ctx.depth_reached) if ctx.depth_reached else 0.0,
+    }
+
+def run_bench(depth: int = BENCH_DEPTH, tt_mb: float = BENCH_TT_MB) -> Dict[str, Any]:
+    """Search every bench position; the totals' "nodes" is the signature."""
+    positions = [bench_position(fen, depth, tt_mb) for fen in BENCH_POSITIONS]
+    nodes = sum(p["nodes"] for p in positions)
+    elapsed = sum(p["time"] for p in positions)
+    tt_hits = sum(p["tt_hit_rate"] * p["nodes"] for p in positions)
+    eval_probes = sum(p["eval_probes"] for p in positions)
+    eval_hits = sum(p["eval_hits"] for p in positions)
+    pawn_probes = sum(p["pawn_probes"] for p in positions)
+    pawn_hits = sum(p["pawn_hits"] for p in positions)
+    searched = [p for p in positions if p["depth"]]
+    return {
+        "depth": depth,
+        "tt_mb": tt_mb,
+        "positions": positions,
+        "total": {
+            "nodes": nodes,
+            "time": elapsed,
+            "nps": nodes / elapsed if elapsed else 0.0,
+            "tt_hit_rate": tt_hits / nodes if nodes else 0.0,
+            "eval_hit_rate": eval_hits / eval_probes if eval_probes else 0.0,
+            "pawn_hit_rate": pawn_hits / pawn_probes if pawn_probes else 0.0,
+            "ebf": sum(p["ebf"] for p in searched) / len(searched) if searched else 0.0,
+        },
+    }
+
+def _print_bench(result: Dict[str, Any]):
+    print(f"{'#':>3} {'move':>6} {'score':>8} {'depth':>5} {'nodes':>8} {'time':>7} {'nps':>7} {'tt hit':>7} {'ebf':>5}")
+    for i, p in enumerate(result["positions"], 1):
+        print(f"{i:>3} {p['move'] or '-':>6} {p['score']:>8.1f} {p['depth']:>5} {p['nodes']:>8} "
+              f"{p['time']:>6.2f}s {p['nps']:>7.0f} {p['tt_hit_rate']:>6.1%} {p['ebf']:>5.2f}")
+    total = result["total"]
+    print()
+    print(f"depth:       {result['depth']}")
+    print(f"signature:   {total['nodes']}")
+    print(f"time:        {total['time']:.2f} s")
+    print(f"nps:         {total['nps']:.0f}")
+    print(f"tt hit rate: {total['tt_hit_rate']:.1%}")
+    print(f"eval hits:   {total['eval_hit_rate']:.1%}")
+    print(f"pawn hits:   {total['pawn_hit_rate']:.1%}")
+    print(f"average ebf: {total['ebf']:.2f}")
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--depth", type=int, default=BENCH_DEPTH)
+    parser.add_argument("--tt-mb", type=float, default=BENCH_TT_MB, help="Transposition table size per position")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args(argv)
+    if args.depth < 1:
+        parser.error("depth must be at least 1")
+
+    result = run_bench(args.depth, args.tt_mb)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        _print_bench(result)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+Endgame bitbases: win/draw for every position of king + queen, rook or
+pawn against a lone king.
+
+One bit per position and side to move says whether the side with the extra
+piece (the "strong" side) wins. Positions are normalized so the strong side
+is white: for a black strong side, ranks are mirrored (square ^ 56). The
+index of a position is strong king, weak king and piece square, 6 bits
+each; illegal positions read as draws and are never probed.
+
+Tables are built offline by retrograde analysis (python bitbase.py
+generate, about half a minute): each ending's positions are solved by
+repeated passes until nothing changes. A strong-side position is won if
+some move reaches a won weak-side position; a weak-side position is won if
+it is checkmate or every move reaches a won strong-side position. KQK and
+KRK are built in parallel processes; KPK follows, as its promotions are
+looked up in them.
+
+The file (BITBASE_PATH) is memory-mapped by every process that probes it,
+so the pages are shared. Its header records GENERATOR_VERSION and a CRC-32
+of the tables. Both are checked on load, so a file left over from another
+solver version or a damaged file is never probed. A missing or rejected
+file makes probing report nothing and the search runs as before.
+
+The tables ignore the fifty-move rule. A won position is only won for the
+search while the halfmove clock leaves room for the longest win
+(BITBASE_MAX_HALFMOVE).
+"""
+import argparse
+import mmap
+import multiprocessing as mp
+import os
+import struct
+import time
+import zlib
+from array import array
+from typing import Dict, List, Optional, Tuple
+from bulletchess import PAWN, ROOK, QUEEN
+from bitboards import KING_ATTACKS, PAWN_ATTACKS, bishop_attacks, rook_attacks
+from zobrist import BLACK_KING, WHITE_KING, PIECE_INDEX_TYPES
+
+BITBASE_PATH = os.environ.get("BITBASE_PATH", "data/bitbases.bin")
+
+MAGIC = b"CMBITBS2"
+# Bump whenever the solver or the table layout changes; older files are rejected
+GENERATOR_VERSION = 1
+HEADER = struct.Struct("<8sIII")  # magic, number of endings, generator version, CRC-32 of the tables
+# Endings in file order: (name, piece type of the strong side)
+ENDINGS: List[Tuple[str, object]] = [("KQK", QUEEN), ("KRK", ROOK), ("KPK", PAWN)]
+POSITIONS = 64 * 64 * 64
+TABLE_BYTES = POSITIONS // 8
+# Per ending: strong side to move, then weak side to move
+ENDING_BYTES = 2 * TABLE_BYTES
+
+WIN, DRAW, LOSS = 1, 0, -1
+
+# Wins are only trusted up to this halfmove clock: KRK takes up to 16 moves
+# (32 plies) to mate, and the fifty-move rule draws at 100
+BITBASE_MAX_HALFMOVE = 60
+
+def position_index(strong_king: int, weak_king: int, piece: int) -> int:
+    return strong_king << 12 | weak_king << 6 | piece
+
+# -------------------------
+# Generation
+# -------------------------
+_WIN_SUCCESSOR = -1  # A strong move that wins outright (a winning promotion)
+
+def _squares(bb: int):
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+def _piece_attacks(ptype, sq: int, occupied: int) -> int:
+    if ptype == QUEEN:
+        return rook_attacks(sq, occupied) | bishop_attacks(sq, occupied)
+    if ptype == ROOK:
+        return rook_attacks(sq, occupied)
+    return PAWN_ATTACKS[0][sq]
+
+def _legal(ptype, sk: int, wk: int, p: int) -> bool:
+    if sk == wk or sk == p or wk == p or KING_ATTACKS[sk] >> wk & 1:
+        return False
+    return ptype != PAWN or 8 <= p < 56
+
+def solve_ending(ptype, promotions: Optional[Dict[object, bytes]] = None) -> Tuple[bytearray, bytearray]:
+    """
+    Win flags (one byte per position) with the strong side to move and with
+    the weak side to move. `promotions` maps QUEEN/ROOK to their solved
+    weak-to-move tables, for KPK.
+    """
+    strong_win = bytearray(POSITIONS)
+    weak_win = bytearray(POSITIONS)
+    # Successors of undecided positions, as flat index lists with offsets
+    strong_pending: List[int] = []
+    strong_succ = array("i")
+    strong_off = array("i", [0])
+    weak_pending: List[int] = []
+    weak_succ = array("i")
+    weak_off = array("i", [0])
+
+    for sk in range(64):
+        for wk in range(64):
+            for p in range(64):
+                if not _legal(ptype, sk, wk, p):
+                    continue
+                i = position_index(sk, wk, p)
+                occupied = 1 << sk | 1 << wk | 1 << p
+                check = _piece_attacks(ptype, p, occupied) >> wk & 1
+
+                # Weak side to move: king moves only
+                succ = []
+                drawn = False
+                for t in _squares(KING_ATTACKS[wk] & ~KING_ATTACKS[sk] & ~(1 << sk)):
+                    if t == p:
+                        drawn = True  # Takes the undefended piece
+                        break
+                    if _piece_attacks(ptype, p, 1 << sk | 1 << p) >> t & 1:
+                        continue
+                    succ.append(position_index(sk, t, p))
+                if not drawn:
+                    if not succ:
+                        if check:
+                            weak_win[i] = 1  # Checkmate
+                    else:
+                        weak_pending.append(i)
+                        weak_succ.extend(succ)
+                        weak_off.append(len(weak_succ))
+
+                # Strong side to move: illegal if the weak king is in check
+                if check:
+                    continue
+                succ = []
+                for t in _squares(KING_ATTACKS[sk] & ~KING_ATTACKS[wk] & ~(1 << p) & ~(1 << wk)):
+                    succ.append(position_index(t, wk, p))
+                if ptype == PAWN:
+                    push = p + 8
+                    if not occupied >> push & 1:
+                        if push >= 56:
+                            promoted = position_index(sk, wk, push)
+                            if promotions[QUEEN][promoted] or promotions[ROOK][promoted]:
+                                succ.append(_WIN_SUCCESSOR)
+                        else:
+                            succ.append(position_index(sk, wk, push))
+                            if p < 16 and not occupied >> (push + 8) & 1:
+                                succ.append(position_index(sk, wk, push + 8))
+                else:
+                    for t in _squares(_piece_attacks(ptype, p, occupied) & ~(1 << sk | 1 << wk)):
+                        succ.append(position_index(sk, wk, t))
+                if _WIN_SUCCESSOR in succ:
+                    strong_win[i] = 1
+                elif succ:
+                    strong_pending.append(i)
+                    strong_succ.extend(succ)
+                    strong_off.append(len(strong_succ))
+
+    changed = True
+    while changed:
+        changed = False
+        for n, i in enumerate(strong_pending):
+            if any(weak_win[j] for j in strong_succ[strong_off[n]:strong_off[n + 1]]):
+                strong_win[i] = 1
+                changed = True
+        for n, i in enumerate(weak_pending):
+            if not weak_win[i] and all(strong_win[j] for j in weak_succ[weak_off[n]:weak_off[n + 1]]):
+                weak_win[i] = 1
+                changed = True
+        # Drop decided positions so later passes only look at the rest
+        strong_pending, strong_succ, strong_off = _compact(strong_pending, strong_succ, strong_off, strong_win)
+        weak_pending, weak_succ, weak_off = _compact(weak_pending, weak_succ, weak_off, weak_win)
+    return strong_win, weak_win
+
+def _compact(pending: List[int], succ: array, off: array, decided: bytearray):
+    new_pending, new_succ, new_off = [], array("i"), array("i", [0])
+    for n, i in enumerate(pending):
+        if not decided[i]:
+            new_pending.append(i)
+            new_succ.extend(succ[off[n]:off[n + 1]])
+            new_off.append(len(new_succ))
+    return new_pending, new_succ, new_off
+
+def _pack(flags: bytearray) -> bytes:
+    packed = bytearray(TABLE_BYTES)
+    for i in range(POSITIONS):
+        if flags[i]:
+            packed[i >> 3] |= 1 << (i & 7)
+    return bytes(packed)
+
+def _solve_packed(name: str) -> Tuple[bytes, bytes, bytearray]:
+    ptype = dict(ENDINGS)[name]
+    strong_win, weak_win = solve_ending(ptype)
+    return _pack(strong_win), _pack(weak_win), weak_win
+
+def generate(path: str = BITBASE_PATH, workers: int = 2) -> Dict[str, float]:
+    """Solve every ending and write the bitbase file; returns seconds per ending."""
+    timings = {}
+    start = time.perf_counter()
+    with mp.get_context("spawn").Pool(workers) as pool:
+        solved = dict(zip(["KQK", "KRK"], pool.map(_solve_packed, ["KQK", "KRK"])))
+    timings["KQK+KRK"] = time.perf_counter() - start
+    start = time.perf_counter()
+    strong_win, weak_win = solve_ending(PAWN, {QUEEN: solved["KQK"][2], ROOK: solved["KRK"][2]})
+    solved["KPK"] = (_pack(strong_win), _pack(weak_win), weak_win)
+    timings["KPK"] = time.perf_counter() - start
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tables = b"".join(solved[name][0] + solved[name][1] for name, _ in ENDINGS)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(ENDINGS), GENERATOR_VERSION, zlib.crc32(tables)))
+        f.write(tables)
+    os.replace(tmp_path, path)
+    return timings
+
+# -------------------------
+# Probing
+# -------------------------
+class Bitbases:
+    """The memory-mapped bitbase file."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        valid = len(self.map) == HEADER.size + len(ENDINGS) * ENDING_BYTES
+        if valid:
+            magic, count, version, checksum = HEADER.unpack_from(self.map, 0)
+            valid = (magic == MAGIC and count == len(ENDINGS) and version == GENERATOR_VERSION
+                     and zlib.crc32(self.map[HEADER.size:]) == checksum)
+        if not valid:
+            self.map.close()
+            raise ValueError(f"{path} is not a bitbase file of this version")
+        self.offsets = {ptype: HEADER.size + n * ENDING_BYTES for n, (_, ptype) in enumerate(ENDINGS)}
+
+    def probe(self, ptype, strong_king: int, weak_king: int, piece: int, strong_to_move: bool) -> int:
+        """WIN or DRAW for the strong side; squares already normalized to a white strong side."""
+        i = position_index(strong_king, weak_king, piece)
+        offset = self.offsets[ptype] + (0 if strong_to_move else TABLE_BYTES)
+        return WIN if self.map[offset + (i >> 3)] >> (i & 7) & 1 else DRAW
+
+    def probe_position(self, occupied: int, mailbox: List[int], white_to_move: bool) -> Optional[int]:
+        """
+        WIN, DRAW or LOSS for the side to move of a position with exactly
+        three pieces on `occupied`, or None if it is not one of ENDINGS.
+        Castling rights and the fifty-move counter are the caller's concern.
+        """
+        kings = {}
+        piece = ptype = strong_white = None
+        while occupied:
+            low = occupied & -occupied
+            sq = low.bit_length() - 1
+            occupied ^= low
+            index = mailbox[sq]
+            if index == WHITE_KING or index == BLACK_KING:
+                kings[index] = sq
+            else:
+                piece, ptype, strong_white = sq, PIECE_INDEX_TYPES[index], index < 6
+        if ptype not in self.offsets or len(kings) != 2:
+            return None
+        if strong_white:
+            result = self.probe(ptype, kings[WHITE_KING], kings[BLACK_KING], piece, white_to_move)
+            strong_to_move = white_to_move
+        else:
+            # Mirror the ranks so the strong side plays up the board as white
+            result = self.probe(ptype, kings[BLACK_KING] ^ 56, kings[WHITE_KING] ^ 56, piece ^ 56,
+                                not white_to_move)
+            strong_to_move = not white_to_move
+        if result == DRAW:
+            return DRAW
+        return WIN if strong_to_move else LOSS
+
+    def close(self):
+        self.map.close()
+
+def load_bitbases(path: str = BITBASE_PATH) -> Optional[Bitbases]:
+    """The bitbases at `path`, or None if they have not been generated or are out of date."""
+    if not os.path.exists(path):
+        return None
+    try:
+        return Bitbases(path)
+    except ValueError as e:
+        print(f"Bitbases not loaded: {e}; run `python bitbase.py generate`")
+        return None
+
+# -------------------------
+# CLI
+# -------------------------
+def _count(path: str) -> Dict[str, Tuple[int, int]]:
+    """Won positions per ending: (strong side to move, weak side to move)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    counts = {}
+    for n, (name, _) in enumerate(ENDINGS):
+        start = HEADER.size + n * ENDING_BYTES
+        strong = data[start:start + TABLE_BYTES]
+        weak = data[start + TABLE_BYTES:start + ENDING_BYTES]
+        counts[name] = (sum(b.bit_count() for b in strong), sum(b.bit_count() for b in weak))
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect the endgame bitbases")
+    parser.add_argument("--path", default=BITBASE_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("generate", help="Solve all endings and write the file")
+    p.add_argument("--workers", type=int, default=2)
+    sub.add_parser("stats", help="Won positions per ending")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        for name, seconds in generate(args.path, args.workers).items():
+            print(f"{name}: {seconds:.1f} s")
+        print(f"wrote {args.path} ({os.path.getsize(args.path)} bytes)")
+    if args.command in ("generate", "stats"):
+        for name, (strong, weak) in _count(args.path).items():
+            print(f"{name}: {strong} wins with the strong side to move, {weak} with the weak side to move")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Precomputed bitboard tables as plain Python ints.
+
+Square i is bit i (A1 = 0, H1 = 7, A8 = 56), the same layout as
+int(bulletchess.Bitboard). Sliding attacks use ray tables: the first blocker
+along a ray is the lowest set bit for rays that increase the square index and
+the highest set bit for rays that decrease it.
+
+The evaluation masks at the end (files, ranks, passed-pawn spans, king
+shields, distances) let eval.py score a term with a few ANDs and a popcount
+instead of looping over squares.
+"""
+from typing import List
+
+FULL = (1 << 64) - 1
+
+def _on_board(file: int, rank: int) -> bool:
+    return 0 <= file < 8 and 0 <= rank < 8
+
+def _step_table(steps) -> List[int]:
+    table = []
+    for sq in range(64):
+        file, rank = sq % 8, sq // 8
+        bb = 0
+        for df, dr in steps:
+            if _on_board(file + df, rank + dr):
+                bb |= 1 << ((rank + dr) * 8 + file + df)
+        table.append(bb)
+    return table
+
+KNIGHT_ATTACKS = _step_table([(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)])
+KING_ATTACKS = _step_table([(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)])
+# PAWN_ATTACKS[0] = squares a white pawn attacks, PAWN_ATTACKS[1] = black
+PAWN_ATTACKS = [_step_table([(-1, 1), (1, 1)]), _step_table([(-1, -1), (1, -1)])]
+
+# Ray directions: (file step, rank step); the first four increase the index
+ROOK_DIRECTIONS = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+BISHOP_DIRECTIONS = [(1, 1), (-1, 1), (1, -1), (-1, -1)]
+
+def _ray_table(df: int, dr: int) -> List[int]:
+    table = []
+    for sq in range(64):
+        file, rank = sq % 8 + df, sq // 8 + dr
+        bb = 0
+        while _on_board(file, rank):
+            bb |= 1 << (rank * 8 + file)
+            file += df
+            rank += dr
+        table.append(bb)
+    return table
+
+# (ray table, increasing?) per direction
+ROOK_RAYS = [(_ray_table(df, dr), dr * 8 + df > 0) for df, dr in ROOK_DIRECTIONS]
+BISHOP_RAYS = [(_ray_table(df, dr), dr * 8 + df > 0) for df, dr in BISHOP_DIRECTIONS]
+
+def _slider_attacks(rays, sq: int, occupied: int) -> int:
+    attacks = 0
+    for table, increasing in rays:
+        ray = table[sq]
+        blockers = ray & occupied
+        if blockers:
+            if increasing:
+                first = (blockers & -blockers).bit_length() - 1
+            else:
+                first = blockers.bit_length() - 1
+            ray ^= table[first]
+        attacks |= ray
+    return attacks
+
+def rook_attacks(sq: int, occupied: int) -> int:
+    return _slider_attacks(ROOK_RAYS, sq, occupied)
+
+def bishop_attacks(sq: int, occupied: int) -> int:
+    return _slider_attacks(BISHOP_RAYS, sq, occupied)
+
+def popcount(bb: int) -> int:
+    return bb.bit_count()
+
+def lsb(bb: int) -> int:
+    """Index of the lowest set bit (bb must be non-zero)."""
+    return (bb & -bb).bit_length() - 1
+
+# Evaluation masks, indexed like PAWN_ATTACKS where a color is involved
+# (0 = white, 1 = black)
+FILE_MASKS = [0x0101010101010101 << file for file in range(8)]
+RANK_MASKS = [0xFF << (8 * rank) for rank in range(8)]
+ADJACENT_FILES = [(FILE_MASKS[file - 1] if file > 0 else 0) | (FILE_MASKS[file + 1] if file < 7 else 0)
+                  for file in range(8)]
+
+def _ranks_ahead(rank: int, color: int) -> int:
+    """All ranks strictly in front of `rank` for `color`."""
+    if color == 0:
+        return FULL & ~((1 << (8 * (rank + 1))) - 1)
+    return (1 << (8 * rank)) - 1
+
+# Squares an enemy pawn must not occupy for a pawn on sq to be passed: its own
+# and the adjacent files, strictly in front of it
+PASSED_SPANS = [[_ranks_ahead(sq // 8, color) & (FILE_MASKS[sq % 8] | ADJACENT_FILES[sq % 8])
+                 for sq in range(64)] for color in (0, 1)]
+
+def _king_shield(sq: int, color: int) -> int:
+    rank = sq // 8 + (1 if color == 0 else -1)
+    if not 0 <= rank < 8:
+        return 0
+    return RANK_MASKS[rank] & (FILE_MASKS[sq % 8] | ADJACENT_FILES[sq % 8])
+
+# Pawn shield of a king on sq: the (up to three) squares just in front of it
+KING_SHIELD = [[_king_shield(sq, color) for sq in range(64)] for color in (0, 1)]
+CENTER = (1 << 27) | (1 << 28) | (1 << 35) | (1 << 36)  # d4, e4, d5, e5
+
+MANHATTAN_DISTANCE = [[abs(a % 8 - b % 8) + abs(a // 8 - b // 8) for b in range(64)] for a in range(64)]
+# Steps from sq to the nearest edge of the board (0 on the edge, 3 in the center)
+EDGE_DISTANCE = [min(sq % 8, 7 - sq % 8, sq // 8, 7 - sq // 8) for sq in range(64)]
+
+def file_set(bb: int) -> int:
+    """8-bit set of the files `bb` has a square on (bit f = file f)."""
+    bb |= bb >> 32
+    bb |= bb >> 16
+    bb |= bb >> 8
+    return bb & 0xFF
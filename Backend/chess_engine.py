@@ -1,17 +1,43 @@
 import bulletchess
 from bulletchess import *
 from bulletchess.utils import *
-import time
+import os
+import threading
 import random
-from typing import Tuple, Optional, Dict, List
-from eval import evaluate_position
+from typing import Any, Callable, Tuple, Optional, Dict, List
+from bitbase import BITBASE_MAX_HALFMOVE, DRAW as BITBASE_DRAW, WIN as BITBASE_WIN, load_bitbases
+from bitboards import FULL
+from eval import (
+    EVAL_STAGES, PawnStructure, compute_psqt, evaluate_lazy, evaluate_position, pawn_structure, update_psqt
+)
+from eval_cache import EVAL_CACHE_ENTRIES, LOWER as EVAL_LOWER, UPPER as EVAL_UPPER, EvalCache
+from search_stats import SearchStats
+from skill import eval_noise, get_skill_level
+from pawn_hash import PawnHashTable
+from see import see, see_ge
+from timeman import TimeManager
+from transposition import TranspositionTable, TTEntry
+from zobrist import (
+    EMPTY, PIECE_INDEX_TYPES, build_mailbox, compute_key, compute_pawn_key, castling_mask,
+    ep_file, move_delta, null_move_delta
+)
 
 # -------------------------
 # Config / globals
 # -------------------------
 RNG = random.Random(1234567)
+# Recompute the Zobrist key from scratch after every move and compare (slow, debug only)
+VERIFY_KEYS = os.environ.get("ENGINE_VERIFY_KEYS") == "1"
+# Compare the incremental material/PST evaluation with the full one after every move (slow, debug only)
+VERIFY_EVAL = os.environ.get("ENGINE_VERIFY_EVAL") == "1"
 INF = 1e9
 MATE_SCORE = 32000
+MAX_PV = 10  # Most lines analyze_position may be asked for
+MULTIPV_WINDOW = 50.0  # Aspiration half-width around a line's previous score
+# Base score of a bitbase win: above any static eval, below every mate score
+BITBASE_WIN_SCORE = 10000
+# Endgame bitbases (see bitbase.py), memory-mapped once per process; None if not generated
+BITBASES = load_bitbases()
 MATERIAL = {
     PAWN: 100,
     KNIGHT: 320,
@@ -21,82 +47,209 @@ MATERIAL = {
     KING: 0
 }
 
-# Diagnostics
-nodes_searched = 0
-tt_hits = 0
-
 # -------------------------
 # Transposition table
 # -------------------------
-MAX_TT_SIZE = 500_000  # Limit TT size to prevent memory issues
-
-class TTEntry:
-    __slots__ = ("value", "depth", "flag", "best_move")
-    def __init__(self, value: float, depth: int, flag: str, best_move: bulletchess.Move):
-        self.value = value
-        self.depth = depth
-        self.flag = flag
-        self.best_move = best_move
-
-transposition_table: Dict[int, TTEntry] = {}  # Changed from str to int
-
-def simple_hash(state: bulletchess.Board) -> int:
-    """Fast hash for transposition table. Fallback to FEN hash if needed."""
-    try:
-        return hash(state)
-    except:
-        return hash(state.fen())
-
-def store_tt_entry(zob: int, entry: TTEntry):
-    """Store TT entry with depth-preferred replacement strategy."""
-    global transposition_table
-    
-    existing = transposition_table.get(zob)
-    
-    # Always replace if:
-    # 1. Slot is empty
-    # 2. New entry has higher/equal depth
-    # 3. New entry is exact score
-    if existing is None or \
-       entry.depth >= existing.depth or \
-       entry.flag == "EXACT":
-        transposition_table[zob] = entry
-    
-    # Only check size every N entries
-    if len(transposition_table) >= MAX_TT_SIZE and nodes_searched % 1000 == 0:
-        keys_to_remove = random.sample(list(transposition_table.keys()), MAX_TT_SIZE // 10)
-        for k in keys_to_remove:
-            del transposition_table[k]
-
-def clear_transposition_table():
-    global transposition_table, nodes_searched, tt_hits, HISTORY, KILLER
-    transposition_table.clear()
-    HISTORY.clear()
-    KILLER.clear()
-    nodes_searched = 0
-    tt_hits = 0
+TT_SIZE_MB = 32  # Fixed memory budget for the transposition table
+
+def store_tt_entry(ctx: "SearchContext", zob: int, value: float, depth: int, flag: str,
+                   best_move: Optional[bulletchess.Move]):
+    """Store TT entry; the table handles depth/age-preferred replacement."""
+    ctx.tt.store(zob, value, depth, flag, best_move)
+
+# -------------------------
+# Search context
+# -------------------------
+class SearchContext:
+    """
+    Everything a search reads and writes besides the board: transposition
+    table, move-ordering heuristics and diagnostics.
+
+    A context can be kept per game session or per worker so that its tables
+    stay warm between moves. Only one search may use a context at a time;
+    get_best_move_and_eval holds `lock` for the duration of the search.
+    """
+
+    def __init__(self, tt_size_mb: float = TT_SIZE_MB, tt: Optional[TranspositionTable] = None,
+                 eval_cache_entries: int = EVAL_CACHE_ENTRIES):
+        self.tt = tt if tt is not None else TranspositionTable(tt_size_mb)
+        self.history: Dict[Tuple[int, int], int] = {}
+        self.killers: Dict[int, List[bulletchess.Move]] = {}
+        # Static evals by position key and pawn-structure eval terms by pawn
+        # key (see eval_cache.py, pawn_hash.py)
+        self.eval_cache = EvalCache(eval_cache_entries)
+        self.pawn_table = PawnHashTable()
+        # Reentrant: callers may hold it around a whole job (see engine_pool.py)
+        self.lock = threading.RLock()
+        # Set by another thread/process to abort the search (Lazy SMP helpers,
+        # ponder, "play now"); anything with an is_set() method
+        self.stop_event = None
+        # Called with a progress dict after every completed iteration (see _search_root)
+        self.on_iteration: Optional[Callable[[Dict[str, Any]], None]] = None
+        # Limits of the running search, created by _search_root
+        self.time_manager: Optional[TimeManager] = None
+        # Largest random eval offset of the running search (skill levels), and
+        # the seed that makes the offsets differ from game to game
+        self.eval_noise = 0
+        self.noise_seed = random.getrandbits(64)
+        # Position keys, piece-on-square mailbox and the (opening, endgame,
+        # phase material) sums of material + PST (see eval.py), updated
+        # incrementally by make_move/unmake_move
+        self.key = 0
+        self.pawn_key = 0
+        self.castling = 0
+        self.ep = -1
+        self.mailbox: List[int] = [EMPTY] * 64
+        self.psqt: Tuple[int, int, int] = (0, 0, 0)
+        self.undo_stack: List[Tuple[int, int, int, int, List[int], Tuple[int, int, int]]] = []
+        # Keys of the positions before the current one, back to the last
+        # irreversible move of the game: the game's up to the root (the first
+        # game_length entries), then the search's line, pushed by make_move
+        self.key_history: List[int] = []
+        self.game_length = 0
+        self.verify_keys = VERIFY_KEYS
+        self.verify_eval = VERIFY_EVAL
+        # Diagnostics
+        self.nodes_searched = 0
+        self.tt_hits = 0
+        self.depth_reached = 0
+        self.picker_nodes = 0     # Nodes that ordered moves with staged_moves
+        self.moves_generated = 0  # Legal moves at those nodes
+        self.moves_scored = 0     # Moves those nodes actually had to score
+        # Telemetry of the last search (see search_stats.py)
+        self.stats = SearchStats()
+
+    def clear(self):
+        """Forget everything learned so far (e.g. when a new game starts)."""
+        self.tt.clear()
+        self.history.clear()
+        self.killers.clear()
+        self.eval_cache.clear()
+        self.pawn_table.clear()
+        self.nodes_searched = 0
+        self.tt_hits = 0
+        self.depth_reached = 0
+        self.picker_nodes = 0
+        self.moves_generated = 0
+        self.moves_scored = 0
+        self.stats = SearchStats()
+        self.noise_seed = random.getrandbits(64)
+
+    def set_root(self, state: bulletchess.Board):
+        """Compute the keys, mailbox and material/PST sums of the search root from scratch."""
+        self.key = compute_key(state)
+        self.pawn_key = compute_pawn_key(state)
+        self.castling = castling_mask(state)
+        self.ep = ep_file(state)
+        self.mailbox = build_mailbox(state)
+        self.psqt = compute_psqt(self.mailbox)
+        self.undo_stack = []
+        self.key_history = []
+        if state.halfmove_clock >= 4:
+            board = state.copy()
+            for _ in range(min(state.halfmove_clock, len(board.history))):
+                board.undo()
+                self.key_history.append(compute_key(board))
+            self.key_history.reverse()
+        self.game_length = len(self.key_history)
+
+    def is_repetition(self, halfmove_clock: int) -> bool:
+        """
+        Whether the current position occurred before since the last
+        irreversible move: once is enough inside the search, positions from
+        the game before the root must have occurred twice (threefold).
+        """
+        keys = self.key_history
+        n = len(keys)
+        # Same side to move (every second ply), at least 4 plies back
+        first = max(0, n - halfmove_clock)
+        first += (n - first) & 1
+        key = self.key
+        if key not in keys[first:n - 3:2]:
+            return False
+        seen = 0
+        for i in range(n - 4, first - 1, -2):
+            if keys[i] == key:
+                if i >= self.game_length:
+                    return True
+                seen += 1
+                if seen == 2:
+                    return True
+        return False
+
+    def make_move(self, state: bulletchess.Board, move: Optional[bulletchess.Move]):
+        """Apply `move` (None = null move) and update the keys, mailbox and eval sums incrementally."""
+        mailbox = self.mailbox
+        self.undo_stack.append((self.key, self.pawn_key, self.castling, self.ep, mailbox, self.psqt))
+        self.key_history.append(self.key)
+        if move is None:
+            self.key ^= null_move_delta(self.ep)
+            self.ep = -1
+        else:
+            self.psqt = update_psqt(self.psqt, mailbox, move)
+            # The mailbox before the move stays on the undo stack; play on a copy
+            self.mailbox = mailbox = mailbox[:]
+            key_delta, pawn_delta, self.castling, self.ep = move_delta(mailbox, move, self.castling, self.ep)
+            self.key ^= key_delta
+            self.pawn_key ^= pawn_delta
+        state.apply(move)
+        if self.verify_keys:
+            self._verify_keys(state, move)
+        if self.verify_eval:
+            self._verify_eval(state, move)
+
+    def unmake_move(self, state: bulletchess.Board):
+        state.undo()
+        self.key, self.pawn_key, self.castling, self.ep, self.mailbox, self.psqt = self.undo_stack.pop()
+        self.key_history.pop()
+
+    def _verify_keys(self, state: bulletchess.Board, move: Optional[bulletchess.Move]):
+        played = move.uci() if move is not None else "null"
+        if self.key != compute_key(state) or self.pawn_key != compute_pawn_key(state):
+            raise RuntimeError(f"Incremental Zobrist key mismatch after {played}: {state.fen()}")
+        if self.mailbox != build_mailbox(state):
+            raise RuntimeError(f"Mailbox mismatch after {played}: {state.fen()}")
+
+    def _verify_eval(self, state: bulletchess.Board, move: Optional[bulletchess.Move]):
+        played = move.uci() if move is not None else "null"
+        if self.psqt != compute_psqt(build_mailbox(state)):
+            raise RuntimeError(f"Material/PST sums mismatch after {played}: {state.fen()}")
+        incremental, _ = evaluate_lazy(state, self.psqt, pawn_structure(state))
+        full = evaluate_position(state)
+        if abs(incremental - full) > 1e-6:
+            raise RuntimeError(f"Incremental eval {incremental} != full eval {full} after {played}: {state.fen()}")
+
+# Used when the caller does not supply a context (scripts, single-user tools)
+_default_context: Optional[SearchContext] = None
+
+def default_context() -> SearchContext:
+    global _default_context
+    if _default_context is None:
+        _default_context = SearchContext()
+    return _default_context
 
 # -------------------------
 # MVV-LVA scoring
 # -------------------------
-def get_captured_piece(state: bulletchess.Board, move: bulletchess.Move) -> Optional[int]:
-    """Get the piece type at the destination square."""
-    if not move.is_capture(state):
-        return None
-    to_sq = move.destination
-    them = state.turn.opposite
-    for ptype in [PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING]:
-        if state[them, ptype] & to_sq.bb():
-            return ptype
-    return None
-
-def mvv_lva_score(state: bulletchess.Board, move: bulletchess.Move) -> int:
-    captured = get_captured_piece(state, move)
+def get_captured_piece(state: bulletchess.Board, move: bulletchess.Move,
+                       mailbox: Optional[List[int]] = None) -> Optional[PieceType]:
+    """Piece type on the destination square (None for quiet moves and en passant)."""
+    if mailbox is not None:
+        victim = mailbox[move.destination.index()]
+        return None if victim == EMPTY else PIECE_INDEX_TYPES[victim]
+    victim = state[move.destination]
+    return None if victim is None else victim.piece_type
+
+def mvv_lva_score(state: bulletchess.Board, move: bulletchess.Move,
+                  mailbox: Optional[List[int]] = None) -> int:
+    captured = get_captured_piece(state, move, mailbox)
     if captured is None:
         return 0
-    piece = state[move.origin]
-    attacker = piece.piece_type if piece else PAWN
-    
+    if mailbox is not None:
+        attacker = PIECE_INDEX_TYPES[mailbox[move.origin.index()]]
+    else:
+        attacker = state[move.origin].piece_type
+
     victim_value = MATERIAL.get(captured, 0)
     attacker_value = MATERIAL.get(attacker, 100)
     
@@ -105,110 +258,283 @@ def mvv_lva_score(state: bulletchess.Board, move: bulletchess.Move) -> int:
 # -------------------------
 # History & killers
 # -------------------------
-HISTORY: Dict[Tuple[int, int], int] = {}
-KILLER: Dict[int, List[bulletchess.Move]] = {}
-
-def history_score(move: bulletchess.Move) -> int:
+def history_score(ctx: SearchContext, move: bulletchess.Move) -> int:
     key = (move.origin.index(), move.destination.index())
-    return HISTORY.get(key, 0)
+    return ctx.history.get(key, 0)
 
-def add_history(move: bulletchess.Move, depth: int):
+def add_history(ctx: SearchContext, move: bulletchess.Move, depth: int):
     key = (move.origin.index(), move.destination.index())
     # Use depth squared for better scaling
-    HISTORY[key] = HISTORY.get(key, 0) + (depth * depth)
+    ctx.history[key] = ctx.history.get(key, 0) + (depth * depth)
 
-def add_killer(move: bulletchess.Move, ply: int):
-    if ply not in KILLER:
-        KILLER[ply] = []
-    if move not in KILLER[ply]:
-        KILLER[ply].insert(0, move)
-        if len(KILLER[ply]) > 2:
-            KILLER[ply].pop()
+def add_killer(ctx: SearchContext, move: bulletchess.Move, ply: int):
+    killers = ctx.killers
+    if ply not in killers:
+        killers[ply] = []
+    if move not in killers[ply]:
+        killers[ply].insert(0, move)
+        if len(killers[ply]) > 2:
+            killers[ply].pop()
 
-def is_killer(move: bulletchess.Move, ply: int) -> bool:
-    return move in KILLER.get(ply, [])
+def is_killer(ctx: SearchContext, move: bulletchess.Move, ply: int) -> bool:
+    return move in ctx.killers.get(ply, [])
 
 # -------------------------
-# Simple SEE
+# Staged move picker
 # -------------------------
-def simple_see_gain(state: bulletchess.Board, move: bulletchess.Move) -> int:
-    captured = get_captured_piece(state, move)
-    if captured is None:
-        return 0
-    piece = state[move.origin]
-    attacker = piece.piece_type if piece else PAWN
-    return MATERIAL[captured] - MATERIAL[attacker]
+def staged_moves(ctx: SearchContext, state: bulletchess.Board, moves: List[bulletchess.Move],
+                 tt_move: Optional[bulletchess.Move], ply: int):
+    """
+    Yield `moves` best-first in stages: TT move, good captures/promotions,
+    killers, quiet moves by history, bad captures.
+
+    Each stage is scored only when the search asks for its first move, so a
+    node that cuts off on the TT move or an early capture never scores the
+    quiet moves (or anything at all). ctx.moves_scored counts the moves that
+    were actually scored.
+    """
+    ctx.picker_nodes += 1
+    ctx.moves_generated += len(moves)
+
+    # Stage 1: TT move (only if legal here - the entry may come from a collision)
+    if tt_move is not None and tt_move in moves:
+        yield tt_move
+    else:
+        tt_move = None
+
+    tactical = []
+    quiets = []
+    for move in moves:
+        if move == tt_move:
+            continue
+        if move.is_capture(state) or move.is_promotion():
+            tactical.append(move)
+        else:
+            quiets.append(move)
+
+    # Stage 2: winning/equal captures and promotions
+    ctx.moves_scored += len(tactical)
+    mailbox = ctx.mailbox
+    good = []
+    bad = []
+    for move in tactical:
+        if move.is_capture(state):
+            score = mvv_lva_score(state, move, mailbox)
+            if move.is_promotion():
+                score += 80_000  # Promotion bonus on top of capture score
+            if see_ge(state, move, 0, mailbox):
+                good.append((100_000 + score, move))
+            else:
+                # Losing trades are searched after all quiet moves, smallest loss first
+                bad.append((see(state, move, mailbox), move))
+        else:
+            good.append((90_000, move))  # Promotion-only (not capture)
+    good.sort(key=lambda x: x[0], reverse=True)
+    for _, move in good:
+        yield move
+
+    # Stage 3: killers (quiet moves that caused a cutoff at this ply)
+    killers = [k for k in ctx.killers.get(ply, ()) if k != tt_move and k in quiets]
+    for move in killers:
+        yield move
+
+    # Stage 4: remaining quiet moves by history
+    ctx.moves_scored += len(quiets)
+    scored = []
+    for move in quiets:
+        if move in killers:
+            continue
+        score = history_score(ctx, move)
+        if is_pinned(state, move.origin):
+            score -= 1_000  # Lighter penalty for pinned quiet moves
+        scored.append((score, move))
+    scored.sort(key=lambda x: x[0], reverse=True)
+    for _, move in scored:
+        yield move
+
+    # Stage 5: losing captures
+    bad.sort(key=lambda x: x[0], reverse=True)
+    for _, move in bad:
+        yield move
+
+# -------------------------
+# Static evaluation
+# -------------------------
+def probe_pawns(ctx: SearchContext, state: bulletchess.Board) -> PawnStructure:
+    """Pawn-structure terms of the current position, from the pawn hash if possible."""
+    stats = ctx.stats
+    stats.pawn_probes += 1
+    pawns = ctx.pawn_table.probe(ctx.pawn_key)
+    if pawns is None:
+        pawns = pawn_structure(state)
+        ctx.pawn_table.store(ctx.pawn_key, pawns)
+    else:
+        stats.pawn_hits += 1
+    return pawns
+
+def evaluate(ctx: SearchContext, state: bulletchess.Board, lower: float = -INF, upper: float = INF) -> float:
+    """
+    evaluate_position of the current search position: from the eval cache if
+    possible, else lazily from the context's incremental state. A score
+    below `lower` or above `upper` may be a bound instead of the exact score
+    (see eval.evaluate_lazy).
+    """
+    stats = ctx.stats
+    stats.eval_probes += 1
+    key = ctx.key
+    score = ctx.eval_cache.probe(key, lower, upper)
+    if score is not None:
+        stats.eval_hits += 1
+        return score
+    score, stages = evaluate_lazy(state, ctx.psqt, probe_pawns(ctx, state), lower, upper)
+    if stages == EVAL_STAGES:
+        ctx.eval_cache.store(key, score)
+    else:
+        stats.minor_stage_skips += 1
+        if stages == 1:
+            stats.king_stage_skips += 1
+        ctx.eval_cache.store(key, score, EVAL_LOWER if score > upper else EVAL_UPPER)
+    return score
+
+# -------------------------
+# Endgame bitbases
+# -------------------------
+def probe_bitbase(ctx: SearchContext, state: bulletchess.Board) -> Optional[float]:
+    """
+    Exact result of a three-piece ending from the bitbases, or None. Wins are
+    scored BITBASE_WIN_SCORE plus the static eval so the search still makes
+    progress towards mate.
+    """
+    if BITBASES is None or ctx.castling:
+        return None
+    occupied = FULL & ~int(state[None])
+    if occupied.bit_count() != 3:
+        return None
+    result = BITBASES.probe_position(occupied, ctx.mailbox, state.turn == WHITE)
+    if result is None:
+        return None
+    if result != BITBASE_DRAW and state.halfmove_clock > BITBASE_MAX_HALFMOVE:
+        return None  # The fifty-move rule may draw before the win is converted
+    ctx.stats.bitbase_hits += 1
+    if result == BITBASE_DRAW:
+        return 0.0
+    score = evaluate(ctx, state)
+    return score + BITBASE_WIN_SCORE if result == BITBASE_WIN else score - BITBASE_WIN_SCORE
+
+# -------------------------
+# Draw rules
+# -------------------------
+def is_draw_by_rule(ctx: SearchContext, state: bulletchess.Board) -> bool:
+    """
+    Insufficient material, fifty-move rule or repetition, without generating
+    moves: repetitions come from the key stack (see SearchContext.is_repetition).
+    Checkmate and stalemate are left to the nodes, which see the move list.
+    The search inlines the first two tests, which settle most nodes.
+    """
+    if state in INSUFFICIENT_MATERIAL:
+        return True
+    halfmove_clock = state.halfmove_clock
+    if halfmove_clock < 4:
+        return False
+    if halfmove_clock >= 100:
+        return state not in CHECKMATE  # Mate on the hundredth ply still counts
+    return ctx.is_repetition(halfmove_clock)
 
 # -------------------------
 # Quiescence
 # -------------------------
-def quiescence(state: bulletchess.Board, alpha: float, beta: float, ply: int = 0) -> float:
-    global nodes_searched, tt_hits
-    nodes_searched += 1
+def quiescence(ctx: SearchContext, state: bulletchess.Board, alpha: float, beta: float, ply: int = 0,
+               moves: Optional[List[bulletchess.Move]] = None) -> float:
+    # Aborted searches return 0.0 here; callers check tm.aborted before using it.
+    # negamax passes the legal moves it already generated as `moves`
+    tm = ctx.time_manager
+    tm.poll_countdown -= 1
+    if tm.aborted or (tm.poll_countdown <= 0 and tm.poll(ctx.nodes_searched)):
+        return 0.0
+
+    ctx.nodes_searched += 1
+    stats = ctx.stats
+    stats.qnodes += 1
+    if ply > stats.seldepth:
+        stats.seldepth = ply
+    if state in INSUFFICIENT_MATERIAL or (state.halfmove_clock >= 4 and is_draw_by_rule(ctx, state)):
+        return 0.0
 
     # Check TT first
-    zob = simple_hash(state)
-    tt_entry = transposition_table.get(zob)
+    zob = ctx.key
+    tt_entry = ctx.tt.probe(zob)
+    stats.tt_probes += 1
     if tt_entry is not None:
-        tt_hits += 1
+        ctx.tt_hits += 1
         # In quiescence, accept any depth since positions are evaluated statically
         if tt_entry.flag == "EXACT":
+            stats.tt_cutoffs += 1
             return tt_entry.value
         elif tt_entry.flag == "LOWER" and tt_entry.value >= beta:
+            stats.tt_cutoffs += 1
             return beta
         elif tt_entry.flag == "UPPER" and tt_entry.value <= alpha:
+            stats.tt_cutoffs += 1
             return alpha
 
     alpha_orig = alpha
 
-    # Check terminal positions first
-    if state in CHECKMATE:
-        return -MATE_SCORE + ply
-    if state in DRAW:
-        return 0.0
+    # Checkmate and stalemate, before stand pat can cut with a bound
+    if moves is None:
+        moves = state.legal_moves()
+    if not moves:
+        return -MATE_SCORE + ply if state in CHECK else 0.0
+    exact = probe_bitbase(ctx, state)
+    if exact is not None:
+        return exact
 
-    stand_pat = evaluate_position(state)
+    # Only whether stand pat reaches beta or misses alpha by BIG_DELTA matters
+    # outside that window, so the evaluation may stop early there
+    BIG_DELTA = 975  # Queen value + margin
+    noise = eval_noise(zob, ctx.noise_seed, ctx.eval_noise) if ctx.eval_noise else 0
+    stand_pat = evaluate(ctx, state, alpha - BIG_DELTA - noise, beta - noise) + noise
     if stand_pat >= beta:
         # Store in TT before returning
-        store_tt_entry(zob, TTEntry(beta, 0, "LOWER", None))
+        store_tt_entry(ctx, zob, beta, 0, "LOWER", None)
         return beta
     
     # Delta pruning: if we can't reach alpha even with a queen capture
-    BIG_DELTA = 975  # Queen value + margin
     if stand_pat < alpha - BIG_DELTA:
         # Store in TT before returning
-        store_tt_entry(zob, TTEntry(alpha, 0, "UPPER", None))
+        store_tt_entry(ctx, zob, alpha, 0, "UPPER", None)
         return alpha
     
     if alpha < stand_pat:
         alpha = stand_pat
 
     # Collect captures and promotions (avoid expensive board copies)
-    captures = [m for m in state.legal_moves() if m.is_capture(state) or m.is_promotion()]
+    captures = [m for m in moves if m.is_capture(state) or m.is_promotion()]
 
     # Use TT move for ordering if available
     tt_move_q = tt_entry.best_move if tt_entry else None
     
-    # Sort captures: TT move first, then MVV-LVA + SEE
+    # Sort captures: TT move first, then MVV-LVA
+    mailbox = ctx.mailbox
     def capture_score(move):
         if tt_move_q and move == tt_move_q:
-            return (2, 0, 0)  # Highest priority
-        return (1, mvv_lva_score(state, move), simple_see_gain(state, move))
+            return (2, 0)  # Highest priority
+        return (1, mvv_lva_score(state, move, mailbox))
     
     captures.sort(key=capture_score, reverse=True)
 
     best_move_q = None
     for move in captures:
-        # SEE pruning: only skip obviously bad captures (losing major piece for pawn)
-        # Be conservative - simple_see_gain doesn't account for whether recapture exists
-        if simple_see_gain(state, move) < -400:  # Only prune if losing 400+ material
+        # SEE pruning: skip captures that lose material once all recaptures are played
+        if not see_ge(state, move, 0, mailbox):
             continue
-        state.apply(move)
-        score = -quiescence(state, -beta, -alpha, ply + 1)
-        state.undo()
+        ctx.make_move(state, move)
+        score = -quiescence(ctx, state, -beta, -alpha, ply + 1)
+        ctx.unmake_move(state)
+        if tm.aborted:
+            return 0.0
         if score >= beta:
             # Store in TT before returning
-            store_tt_entry(zob, TTEntry(beta, 0, "LOWER", move))
+            store_tt_entry(ctx, zob, beta, 0, "LOWER", move)
             return beta
         if score > alpha:
             alpha = score
@@ -219,140 +545,105 @@ def quiescence(state: bulletchess.Board, alpha: float, beta: float, ply: int = 0
         flag = "UPPER"
     else:
         flag = "EXACT"
-    store_tt_entry(zob, TTEntry(alpha, 0, flag, best_move_q))
+    store_tt_entry(ctx, zob, alpha, 0, flag, best_move_q)
     
     return alpha
 
 # -------------------------
 # Negamax (PVS + LMR + TT + Null-move)
 # -------------------------
-def negamax(state: bulletchess.Board, depth: int, alpha: float, beta: float, allow_null: bool,
-            start_time: float, time_limit: float, ply: int = 0) -> Tuple[float, bool]:
-    global nodes_searched, tt_hits
-
-    if time.time() - start_time >= time_limit:
+def negamax(ctx: SearchContext, state: bulletchess.Board, depth: int, alpha: float, beta: float, allow_null: bool,
+            ply: int = 0) -> Tuple[float, bool]:
+    # The clock and the stop event are only read when tm.poll_countdown runs out
+    tm = ctx.time_manager
+    tm.poll_countdown -= 1
+    if tm.aborted or (tm.poll_countdown <= 0 and tm.poll(ctx.nodes_searched)):
         return 0.0, True
 
-    nodes_searched += 1
+    ctx.nodes_searched += 1
+    stats = ctx.stats
+    if state in INSUFFICIENT_MATERIAL or (state.halfmove_clock >= 4 and is_draw_by_rule(ctx, state)):
+        return 0.0, False
     
     # Cache in_check to avoid multiple calls
     in_check = state in CHECK
     
-    zob = simple_hash(state)
-    tt_entry = transposition_table.get(zob)
+    zob = ctx.key
+    tt_entry = ctx.tt.probe(zob)
+    stats.tt_probes += 1
     alpha_orig = alpha
 
     # Use TT entry if available
     if tt_entry is not None:
         # Count as hit whenever we find an entry (for statistics)
-        tt_hits += 1
+        ctx.tt_hits += 1
         # Only trust the score if the entry is from equal or deeper search
         if tt_entry.depth >= depth:
             if tt_entry.flag == "EXACT":
+                stats.tt_cutoffs += 1
                 return tt_entry.value, False
             elif tt_entry.flag == "LOWER":
                 alpha = max(alpha, tt_entry.value)
             elif tt_entry.flag == "UPPER":
                 beta = min(beta, tt_entry.value)
             if alpha >= beta:
+                stats.tt_cutoffs += 1
                 return tt_entry.value, False
         # Even if depth is insufficient, we can use the best_move for ordering (see below)
 
-    if depth <= 0 or state in CHECKMATE or state in DRAW:
-        return quiescence(state, alpha, beta, ply), False
+    # Checkmate and stalemate, before quiescence or pruning can return a bound;
+    # the move loop and quiescence reuse the list
+    moves = list(state.legal_moves())
+    if not moves:
+        if in_check:
+            return -MATE_SCORE + ply, False
+        return 0.0, False
+    if depth <= 0:
+        score = quiescence(ctx, state, alpha, beta, ply, moves)
+        return score, tm.aborted
+    # Known endgame result: no need to search the subtree (mates are scored by the search)
+    exact = probe_bitbase(ctx, state) if not in_check else None
+    if exact is not None:
+        return exact, False
 
     # Futility pruning (reversed/razor)
     if depth <= 2 and not in_check:
-        static_eval = evaluate_position(state)
+        noise = eval_noise(zob, ctx.noise_seed, ctx.eval_noise) if ctx.eval_noise else 0
         margin = 200 * depth
+        # Only the side of alpha - margin matters, so the evaluation may stop early
+        static_eval = evaluate(ctx, state, alpha - margin - noise, alpha - margin - noise) + noise
         if static_eval + margin <= alpha:
+            stats.futility_prunes += 1
             return alpha, False
 
     if allow_null and depth >= 3 and not in_check:
-        state.apply(None)
-        score_null, time_ex = negamax(state, depth - 1 - 2, -beta, -beta + 1, False, start_time, time_limit, ply + 1)
-        state.undo()
+        ctx.make_move(state, None)
+        score_null, time_ex = negamax(ctx, state, depth - 1 - 2, -beta, -beta + 1, False, ply + 1)
+        ctx.unmake_move(state)
         if time_ex:
             return 0.0, True
         if -score_null >= beta:
+            stats.null_cutoffs += 1
             return beta, False
 
-    moves = list(state.legal_moves())
-    if not moves:
-        if in_check:
-            return -MATE_SCORE + ply, False
-        return 0.0, False
-
     tt_move = tt_entry.best_move if tt_entry else None
     
     # Internal Iterative Deepening: if no TT move, do shallow search to find one
     if depth >= 4 and tt_move is None and not in_check:
-        _, _ = negamax(state, depth - 2, alpha, beta, False, start_time, time_limit, ply)
+        _, _ = negamax(ctx, state, depth - 2, alpha, beta, False, ply)
         # Check TT again after shallow search
-        tt_entry = transposition_table.get(zob)
+        tt_entry = ctx.tt.probe(zob)
         tt_move = tt_entry.best_move if tt_entry else None
     
-    scored = []
-    for move in moves:
-        score = 0
-        if tt_move and move == tt_move:
-            score += 1_000_000
-        
-        is_capture = move.is_capture(state)
-        is_promo = move.is_promotion()
-        
-        if is_capture:
-            mvv_lva = mvv_lva_score(state, move)
-            see = simple_see_gain(state, move)
-            
-            # Separate good captures (SEE >= 0) from bad captures (SEE < 0)
-            if see >= 0:
-                # Good captures: winning or equal trades
-                score += 100_000 + mvv_lva + see
-            else:
-                # Bad captures: losing trades - order AFTER all quiet moves
-                # Negative base ensures even small losses sort below quiet moves (score >= 0)
-                # Typical SEE for bad capture: -200 to -800
-                score += see  # Just use SEE directly - will be negative
-        
-        if is_promo:
-            # Promotions are very strong - higher than bad captures
-            # If it's also a capture, this adds to the capture score
-            if not is_capture:
-                score += 90_000  # Promotion-only (not capture)
-            else:
-                score += 80_000  # Promotion bonus on top of capture score
-        
-        # Killer moves and history only for non-captures
-        if not is_capture:
-            # Enhanced killer scoring - differentiate primary and secondary killers
-            if ply in KILLER:
-                if len(KILLER[ply]) > 0 and move == KILLER[ply][0]:
-                    score += 9_000  # Primary killer
-                elif len(KILLER[ply]) > 1 and move == KILLER[ply][1]:
-                    score += 8_000  # Secondary killer
-            
-            if is_pinned(state, move.origin):
-                score -= 1_000  # Lighter penalty for pinned quiet moves
-            
-            score += history_score(move)
-        
-        scored.append((score, move))
-    scored.sort(key=lambda x: x[0], reverse=True)
-    ordered_moves = [m for _, m in scored]
-
     best_value = -INF
     best_move_local = None
 
-    for idx, move in enumerate(ordered_moves):
-        if time.time() - start_time >= time_limit:
-            return 0.0, True
-
+    for idx, move in enumerate(staged_moves(ctx, state, moves, tt_move, ply)):
         # Check move properties BEFORE applying
         is_capture = move.is_capture(state)
         is_promo = move.is_promotion()
         
-        state.apply(move)
+        ctx.make_move(state, move)
         extension = 1 if state in CHECK else 0
 
         child_score = None
@@ -368,19 +659,21 @@ def negamax(state: bulletchess.Board, depth: int, alpha: float, beta: float, all
                 r += 1  # Extra reduction at high depths
             
             # Don't reduce killers as much
-            if ply in KILLER and move in KILLER[ply]:
+            if is_killer(ctx, move, ply):
                 r = max(1, r - 1)
             
             reduced_depth = max(0, depth - 1 - r + extension)
-            score_red, time_ex = negamax(state, reduced_depth, -alpha - 1, -alpha, True, start_time, time_limit, ply + 1)
+            stats.lmr_reductions += 1
+            score_red, time_ex = negamax(ctx, state, reduced_depth, -alpha - 1, -alpha, True, ply + 1)
             if time_ex:
-                state.undo()
+                ctx.unmake_move(state)
                 return 0.0, True
             score_red = -score_red
             if score_red > alpha:
-                score_full, time_ex2 = negamax(state, depth - 1 + extension, -beta, -alpha, True, start_time, time_limit, ply + 1)
+                stats.lmr_researches += 1
+                score_full, time_ex2 = negamax(ctx, state, depth - 1 + extension, -beta, -alpha, True, ply + 1)
                 if time_ex2:
-                    state.undo()
+                    ctx.unmake_move(state)
                     return 0.0, True
                 child_score = -score_full
             else:
@@ -388,25 +681,25 @@ def negamax(state: bulletchess.Board, depth: int, alpha: float, beta: float, all
         else:
             # Principal Variation Search (PVS)
             if idx == 0:
-                score_c, time_ex = negamax(state, depth - 1 + extension, -beta, -alpha, True, start_time, time_limit, ply + 1)
+                score_c, time_ex = negamax(ctx, state, depth - 1 + extension, -beta, -alpha, True, ply + 1)
                 if time_ex:
-                    state.undo()
+                    ctx.unmake_move(state)
                     return 0.0, True
                 child_score = -score_c
             else:
-                score_z, time_ex = negamax(state, depth - 1 + extension, -alpha - 1, -alpha, True, start_time, time_limit, ply + 1)
+                score_z, time_ex = negamax(ctx, state, depth - 1 + extension, -alpha - 1, -alpha, True, ply + 1)
                 if time_ex:
-                    state.undo()
+                    ctx.unmake_move(state)
                     return 0.0, True
                 child_score = -score_z
                 if child_score > alpha:
-                    score_full, time_ex2 = negamax(state, depth - 1 + extension, -beta, -alpha, True, start_time, time_limit, ply + 1)
+                    score_full, time_ex2 = negamax(ctx, state, depth - 1 + extension, -beta, -alpha, True, ply + 1)
                     if time_ex2:
-                        state.undo()
+                        ctx.unmake_move(state)
                         return 0.0, True
                     child_score = -score_full
 
-        state.undo()
+        ctx.unmake_move(state)
         score = child_score if child_score is not None else -INF
 
         if score > best_value:
@@ -417,9 +710,12 @@ def negamax(state: bulletchess.Board, depth: int, alpha: float, beta: float, all
             alpha = score
 
         if alpha >= beta:
+            stats.beta_cutoffs += 1
+            if idx == 0:
+                stats.first_move_cutoffs += 1
             if not is_capture and not is_promo:
-                add_killer(move, ply)
-                add_history(move, depth)
+                add_killer(ctx, move, ply)
+                add_history(ctx, move, depth)
             break
 
     if best_value <= alpha_orig:
@@ -428,31 +724,91 @@ def negamax(state: bulletchess.Board, depth: int, alpha: float, beta: float, all
         flag = "LOWER"
     else:
         flag = "EXACT"
-    store_tt_entry(zob, TTEntry(best_value, depth, flag, best_move_local))
+    store_tt_entry(ctx, zob, best_value, depth, flag, best_move_local)
     return best_value, False
 
 # -------------------------
 # Iterative deepening with root move ordering
 # -------------------------
-def get_best_move_and_eval(state: bulletchess.Board, time_limit: float = 5.0, max_depth: int = 20) -> Tuple[Optional[str], float]:
-    global nodes_searched, tt_hits
-    nodes_searched = 0
-    tt_hits = 0
-    # Don't clear TT - keep info from previous searches
-    # clear_transposition_table()
+def get_best_move_and_eval(state: bulletchess.Board, time_limit: float = 5.0, max_depth: int = 20,
+                           ctx: Optional[SearchContext] = None, threads: int = 1,
+                           skill_level: Optional[int] = None) -> Tuple[Optional[str], float]:
+    """
+    Search `state` and return (best move in UCI, evaluation from the side to move).
+
+    Pass a SearchContext owned by the caller (per session or per worker) so
+    concurrent searches do not share tables; without one the module's default
+    context is used.
+
+    With threads > 1 the search runs in Lazy SMP mode (see smp.py): helper
+    processes search the same root and share a transposition table in shared
+    memory, which replaces ctx's own table for that search.
+
+    Per-iteration telemetry of the search is left in ctx.stats (a
+    SearchStats, see search_stats.py); call ctx.stats.to_dict() for JSON.
+
+    `skill_level` (see skill.py) weakens the search to that level's node
+    budget, depth cap and eval noise; such searches are single-threaded.
+    """
+    if ctx is None:
+        ctx = default_context()
+    skill = get_skill_level(skill_level) if skill_level is not None else None
+    with ctx.lock:
+        if skill is not None:
+            ctx.tt.new_search()
+            ctx.eval_noise = skill.eval_noise
+            try:
+                return _search_root(ctx, state, time_limit, min(max_depth, skill.max_depth),
+                                    max_nodes=skill.max_nodes)
+            finally:
+                ctx.eval_noise = 0
+        if threads > 1:
+            from smp import lazy_smp_search
+            return lazy_smp_search(ctx, state, time_limit, max_depth, threads)
+        ctx.tt.new_search()
+        return _search_root(ctx, state, time_limit, max_depth)
+
+def _search_root(ctx: SearchContext, state: bulletchess.Board, time_limit: float,
+                 max_depth: int, helper_id: int = 0,
+                 max_nodes: Optional[int] = None) -> Tuple[Optional[str], float]:
+    """
+    Iterative deepening at the root. Lazy SMP helpers pass helper_id > 0 so
+    they start at a staggered depth with a different root move order; they
+    only stop at the hard limit or when the main process stops them.
+    `max_nodes` replaces the time-based stopping rules with a node budget.
+    """
+    ctx.nodes_searched = 0
+    ctx.tt_hits = 0
+    ctx.depth_reached = 0
+    ctx.picker_nodes = 0
+    ctx.moves_generated = 0
+    ctx.moves_scored = 0
+    stats = ctx.stats = SearchStats()
+    # Don't clear TT - keep info from previous searches (the caller ages it)
+    ctx.set_root(state)
 
     root_moves = list(state.legal_moves())
     if not root_moves:
+        stats.finish(0, 0, "no_legal_moves")
         return None, evaluate_position(state)
 
-    start_time = time.time()
+    first_depth = 1
+    if helper_id:
+        first_depth += helper_id % 2
+        rest = root_moves[1:]
+        random.Random(helper_id).shuffle(rest)
+        root_moves[1:] = rest
+
+    tm = TimeManager(time_limit, stop_event=ctx.stop_event, flexible=not helper_id, max_nodes=max_nodes)
+    ctx.time_manager = tm
     best_move = None
     last_score = 0.0
     window = 50.0
 
-    for depth in range(1, max_depth + 1):
-        if time.time() - start_time >= time_limit:
+    for depth in range(first_depth, max_depth + 1):
+        if not tm.start_iteration(ctx.nodes_searched):
             break
+        stats.start_iteration(ctx.nodes_searched, ctx.tt_hits)
 
         # Move best move from previous depth to front for better ordering
         if best_move and best_move in root_moves:
@@ -468,19 +824,19 @@ def get_best_move_and_eval(state: bulletchess.Board, time_limit: float = 5.0, ma
         best_move_at_depth = None
 
         for i, move in enumerate(root_moves):
-            state.apply(move)
+            ctx.make_move(state, move)
             
             if i == 0:
                 # Full window for first move (expected PV)
-                score, time_ex = negamax(state, depth - 1, -beta, -alpha, True, start_time, time_limit, 1)
+                score, time_ex = negamax(ctx, state, depth - 1, -beta, -alpha, True, 1)
             else:
                 # Null window search
-                score, time_ex = negamax(state, depth - 1, -alpha - 1, -alpha, True, start_time, time_limit, 1)
+                score, time_ex = negamax(ctx, state, depth - 1, -alpha - 1, -alpha, True, 1)
                 if not time_ex and -score > alpha and -score < beta:
                     # Re-search with full window
-                    score, time_ex = negamax(state, depth - 1, -beta, -alpha, True, start_time, time_limit, 1)
+                    score, time_ex = negamax(ctx, state, depth - 1, -beta, -alpha, True, 1)
             
-            state.undo()
+            ctx.unmake_move(state)
             
             if time_ex:
                 break
@@ -503,22 +859,23 @@ def get_best_move_and_eval(state: bulletchess.Board, time_limit: float = 5.0, ma
         if not time_ex:
             if best_value <= last_score - window or best_value >= last_score + window:
                 # Failed low or high, re-search with full window
+                stats.aspiration_researches += 1
                 alpha = -INF
                 beta = INF
                 best_value = -INF
                 best_move_at_depth = None
                 
                 for i, move in enumerate(root_moves):
-                    state.apply(move)
+                    ctx.make_move(state, move)
                     
                     if i == 0:
-                        score, time_ex = negamax(state, depth - 1, -beta, -alpha, True, start_time, time_limit, 1)
+                        score, time_ex = negamax(ctx, state, depth - 1, -beta, -alpha, True, 1)
                     else:
-                        score, time_ex = negamax(state, depth - 1, -alpha - 1, -alpha, True, start_time, time_limit, 1)
+                        score, time_ex = negamax(ctx, state, depth - 1, -alpha - 1, -alpha, True, 1)
                         if not time_ex and -score > alpha:
-                            score, time_ex = negamax(state, depth - 1, -beta, -alpha, True, start_time, time_limit, 1)
+                            score, time_ex = negamax(ctx, state, depth - 1, -beta, -alpha, True, 1)
                     
-                    state.undo()
+                    ctx.unmake_move(state)
                     
                     if time_ex:
                         break
@@ -535,6 +892,14 @@ def get_best_move_and_eval(state: bulletchess.Board, time_limit: float = 5.0, ma
         if not time_ex and best_move_at_depth:
             best_move = best_move_at_depth
             last_score = best_value
+            ctx.depth_reached = depth
+            tm.end_iteration(depth, best_move)
+            stats.end_iteration(depth, best_move.uci(), last_score, ctx.nodes_searched, ctx.tt_hits)
+            if ctx.on_iteration is not None and not helper_id:
+                ctx.on_iteration(_progress(ctx, state, best_move, last_score, depth))
+            if abs(last_score) >= MATE_SCORE - depth:
+                tm.stop_reason = "mate_found"  # Deeper iterations cannot change a mate this short
+                break
             if alpha < best_value < beta:
                 window = max(20.0, window * 0.75)
             else:
@@ -542,5 +907,148 @@ def get_best_move_and_eval(state: bulletchess.Board, time_limit: float = 5.0, ma
         else:
             break
 
+    stats.finish(ctx.nodes_searched, ctx.tt_hits, tm.stop_reason)
     uci = best_move.uci() if best_move else None
-    return uci, last_score
\ No newline at end of file
+    return uci, last_score
+
+def _progress(ctx: SearchContext, state: bulletchess.Board, best_move: bulletchess.Move,
+              score: float, depth: int) -> Dict[str, Any]:
+    """What on_iteration receives after a completed iteration."""
+    elapsed = ctx.time_manager.elapsed()
+    return {
+        "depth": depth,
+        "seldepth": ctx.stats.iterations[-1]["seldepth"],
+        "score": score,
+        "best_move": best_move.uci(),
+        "pv": [m.uci() for m in principal_variation(ctx, state, best_move, depth)],
+        "nodes": ctx.nodes_searched,
+        "nps": ctx.nodes_searched / elapsed if elapsed else 0.0,
+        "time": elapsed,
+    }
+
+# -------------------------
+# Multi-PV analysis
+# -------------------------
+def analyze_position(state: bulletchess.Board, num_pv: int = 3, time_limit: float = 5.0,
+                     max_depth: int = 20, ctx: Optional[SearchContext] = None) -> Dict[str, Any]:
+    """
+    Rank the best `num_pv` root moves with exact scores in one search.
+
+    Returns {"lines": [{"move", "score", "pv", "nodes"}, ...] best first,
+    "depth", "nodes", "tt_hits", "stop_reason"}; "nodes" of a line is the
+    work spent on that move in the last completed iteration.
+    """
+    if ctx is None:
+        ctx = default_context()
+    with ctx.lock:
+        ctx.tt.new_search()
+        return _search_root_multipv(ctx, state, num_pv, time_limit, max_depth)
+
+def _search_root_multipv(ctx: SearchContext, state: bulletchess.Board, num_pv: int,
+                         time_limit: float, max_depth: int) -> Dict[str, Any]:
+    """
+    Iterative deepening where the first num_pv root moves are searched for an
+    exact score (aspiration window around their previous score, full window
+    if it fails) and every later move only with a null window at the
+    num_pv-th best score, re-searched when it beats it. Root moves and
+    iterations share ctx's table instead of starting K searches from scratch.
+    """
+    ctx.nodes_searched = 0
+    ctx.tt_hits = 0
+    ctx.depth_reached = 0
+    stats = ctx.stats = SearchStats()
+    ctx.set_root(state)
+
+    root_moves = list(state.legal_moves())
+    num_pv = max(1, min(num_pv, len(root_moves)))
+    tm = TimeManager(time_limit, stop_event=ctx.stop_event)
+    ctx.time_manager = tm
+    lines: List[Tuple[float, bulletchess.Move, int, List[bulletchess.Move]]] = []
+    previous_scores: Dict[bulletchess.Move, float] = {}
+
+    for depth in range(1, max_depth + 1):
+        if not root_moves or not tm.start_iteration():
+            break
+        stats.start_iteration(ctx.nodes_searched, ctx.tt_hits)
+        top = []  # Best num_pv lines so far (score, move, nodes, pv), exact scores
+        time_ex = False
+
+        for move in root_moves:
+            nodes_before = ctx.nodes_searched
+            ctx.make_move(state, move)
+            if len(top) < num_pv:
+                # Aspiration window around the move's previous score, full window if it fails
+                previous = previous_scores.get(move)
+                score = None
+                if previous is not None:
+                    alpha, beta = previous - MULTIPV_WINDOW, previous + MULTIPV_WINDOW
+                    score, time_ex = negamax(ctx, state, depth - 1, -beta, -alpha, True, 1)
+                    if not time_ex and not alpha < -score < beta:
+                        score = None
+                if score is None and not time_ex:
+                    score, time_ex = negamax(ctx, state, depth - 1, -INF, INF, True, 1)
+            else:
+                alpha = top[-1][0]
+                score, time_ex = negamax(ctx, state, depth - 1, -alpha - 1, -alpha, True, 1)
+                if not time_ex and -score > alpha:
+                    score, time_ex = negamax(ctx, state, depth - 1, -INF, -alpha, True, 1)
+            ctx.unmake_move(state)
+            if time_ex:
+                break
+
+            if len(top) < num_pv or -score > top[-1][0]:
+                # Read the PV now, before the next moves' searches overwrite its TT entries
+                line = (-score, move, ctx.nodes_searched - nodes_before, principal_variation(ctx, state, move, depth))
+                top.append(line)
+                top.sort(key=lambda l: -l[0])
+                del top[num_pv:]
+
+        if time_ex:
+            break
+        lines = top
+        ctx.depth_reached = depth
+        tm.end_iteration(depth, top[0][1])
+        stats.end_iteration(depth, top[0][1].uci(), top[0][0], ctx.nodes_searched, ctx.tt_hits)
+        previous_scores = {l[1]: l[0] for l in top}
+        # Next iteration: current lines first, then the rest in their previous order
+        root_moves = [l[1] for l in top] + [move for move in root_moves if move not in previous_scores]
+
+        if all(abs(l[0]) >= MATE_SCORE - depth for l in top):
+            tm.stop_reason = "mate_found"
+            break
+
+    stats.finish(ctx.nodes_searched, ctx.tt_hits, tm.stop_reason)
+    return {
+        "lines": [
+            {
+                "move": move.uci(),
+                "score": score,
+                "pv": [m.uci() for m in pv],
+                "nodes": nodes,
+            }
+            for score, move, nodes, pv in lines
+        ],
+        "depth": ctx.depth_reached,
+        "nodes": ctx.nodes_searched,
+        "tt_hits": ctx.tt_hits,
+        "stop_reason": tm.stop_reason,
+    }
+
+def principal_variation(ctx: SearchContext, state: bulletchess.Board, first_move: bulletchess.Move,
+                        max_length: int) -> List[bulletchess.Move]:
+    """`first_move` followed by the best moves stored in the TT, up to max_length moves."""
+    pv = [first_move]
+    ctx.make_move(state, first_move)
+    seen = {ctx.key}
+    while len(pv) < max_length:
+        entry = ctx.tt.probe(ctx.key)
+        if entry is None or entry.best_move is None or entry.best_move not in state.legal_moves():
+            break
+        pv.append(entry.best_move)
+        ctx.make_move(state, entry.best_move)
+        if ctx.key in seen:
+            break  # Repetition: the TT line would loop
+        seen.add(ctx.key)
+    for _ in pv:
+        ctx.unmake_move(state)
+    return pv
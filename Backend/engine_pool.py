@@ -0,0 +1,574 @@
+"""
+Pool of engine worker processes for the API server.
+
+A search is several seconds of pure Python, so running it inside a request
+handler holds the GIL against every other request. Searches are instead sent
+to long-lived worker processes as (start FEN, move list, limits) and the
+endpoint awaits the result.
+
+Workers stay warm between requests: each loads the opening book once and keeps
+a SearchContext per game session it serves. A session is always routed to the
+same worker so its transposition table is reused from move to move, while
+different sessions spread over all cores.
+
+Set ENGINE_WORKERS=0 to search in-process (on a thread) instead.
+
+Pondering: a job with "ponder" set lets the worker keep searching after it
+answered, while the player thinks. It searches the position after the reply
+the TT predicts for the player (or, without a prediction, the position the
+player faces, which only warms the table). If the player's actual move
+matches, the next job is a ponder hit: answered at once when the ponder
+search already used the job's time or finished by itself, otherwise searched
+for the remaining time from the warm table. A worker stops pondering as soon
+as it receives a search job or a reset/drop of the pondering session, and at
+most PONDER_SLOTS workers ponder at the same time.
+
+Progress and "play now": search() takes an on_progress callback, which is
+called on the event loop with depth, score, best move, PV, nodes and NPS
+after every completed iteration. stop_search() ends a session's running
+search early; it returns the best move of the last completed iteration as
+usual. Workers get the stop through a shared slot holding the request id
+to stop, so a stop never hits a different request queued on the worker.
+"""
+import asyncio
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import bulletchess
+
+ENGINE_WORKERS = int(os.environ.get("ENGINE_WORKERS", min(4, os.cpu_count() or 1)))
+MAX_CONTEXTS_PER_WORKER = 16  # Sessions whose tables a worker keeps warm (LRU)
+WORKER_POLL_SECONDS = 5.0  # How often an idle worker checks that the server is alive
+# Workers allowed to ponder at once (global CPU budget for pondering)
+PONDER_SLOTS = int(os.environ.get("ENGINE_PONDER_SLOTS", max(1, (os.cpu_count() or 1) // 2)))
+PONDER_MAX_SECONDS = 60.0  # A ponder search gives up after this long
+PONDER_MIN_SEARCH = 0.2  # Least time searched after a ponder hit that is not answered at once
+
+# -------------------------
+# Jobs
+# -------------------------
+def board_to_position(board: bulletchess.Board) -> Tuple[str, List[str]]:
+    """Start FEN and UCI moves played, so the game history survives pickling."""
+    moves = [m.uci() for m in board.history]
+    start = board.copy()
+    for _ in moves:
+        start.undo()
+    return start.fen(), moves
+
+def make_search_job(session_id: str, board: bulletchess.Board, time_limit: float,
+                    max_depth: int = 20, use_book: bool = True, threads: int = 1,
+                    ponder: bool = False, min_depth: Optional[int] = None,
+                    include_stats: bool = False, skill_level: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Describe a search as picklable data: start position plus moves played.
+
+    A stored analysis at least `min_depth` deep (default ANALYSIS_MIN_DEPTH)
+    answers the job without searching. With `include_stats` the result's
+    "stats" holds the search telemetry (None when nothing was searched).
+    A `skill_level` (see skill.py) search neither ponders nor reads or
+    writes the analysis store, which hold full-strength results.
+    """
+    start_fen, moves = board_to_position(board)
+    return {
+        "session_id": session_id,
+        "start_fen": start_fen,
+        "moves": moves,
+        "time_limit": time_limit,
+        "max_depth": max_depth,
+        "use_book": use_book,
+        "threads": threads,
+        "ponder": ponder and skill_level is None,
+        "min_depth": min_depth,
+        "include_stats": include_stats,
+        "skill_level": skill_level,
+    }
+
+def make_analysis_job(session_id: str, board: bulletchess.Board, time_limit: float,
+                      num_pv: int, max_depth: int = 20) -> Dict[str, Any]:
+    """A Multi-PV analysis of the session's position (see run_analysis)."""
+    start_fen, moves = board_to_position(board)
+    return {
+        "session_id": session_id,
+        "start_fen": start_fen,
+        "moves": moves,
+        "time_limit": time_limit,
+        "max_depth": max_depth,
+        "num_pv": num_pv,
+    }
+
+def board_from_job(job: Dict[str, Any]) -> bulletchess.Board:
+    board = bulletchess.Board.from_fen(job["start_fen"])
+    for uci in job["moves"]:
+        board.apply(bulletchess.Move.from_uci(uci))
+    return board
+
+def run_search(job: Dict[str, Any], ctx, ponder: Optional["Ponder"] = None) -> Dict[str, Any]:
+    """
+    Answer a job from the opening book or the engine. Runs inside a worker.
+
+    `ponder` is the session's stopped ponder search, if there was one.
+    """
+    if job.get("num_pv"):
+        return run_analysis(job, ctx)
+    from analysis_store import ANALYSIS_MIN_DEPTH, get_analysis_store, is_storable
+    from chess_engine import get_best_move_and_eval
+    from opening_book import get_opening_move
+    from zobrist import compute_key
+
+    board = board_from_job(job)
+    start = time.time()
+
+    if job.get("use_book", True):
+        book_move = get_opening_move(board, random_choice=True)
+        if book_move:
+            return {
+                "best_move": book_move,
+                "evaluation": 0.0,  # Book moves don't have evaluation
+                "from_book": True,
+                "from_store": False,
+                "nodes": 0,
+                "tt_hits": 0,
+                "depth": 0,
+                "time": time.time() - start,
+                "ponder": None,
+            }
+
+    skill_level = job.get("skill_level")
+    store = get_analysis_store() if skill_level is None and is_storable(board) else None
+    key = compute_key(board)
+    if store is not None:
+        entry = store.probe(key)
+        min_depth = job.get("min_depth") or ANALYSIS_MIN_DEPTH
+        if entry is not None and entry.depth >= min_depth and entry.best_move in board.legal_moves():
+            return {
+                "best_move": entry.best_move.uci(),
+                "evaluation": entry.score,
+                "from_book": False,
+                "from_store": True,
+                "nodes": entry.nodes,
+                "tt_hits": 0,
+                "depth": entry.depth,
+                "time": time.time() - start,
+                "ponder": None,
+            }
+
+    time_limit = job["time_limit"]
+    ponder_status = None
+    if ponder is not None:
+        ponder_status = "miss"
+        if ponder.position == (job["start_fen"], job["moves"]):
+            ponder_status = "hit"
+            if ponder.best_move and (ponder.finished or ponder.elapsed >= time_limit):
+                # The ponder search already did this job's work
+                return {
+                    "best_move": ponder.best_move,
+                    "evaluation": ponder.evaluation,
+                    "from_book": False,
+                    "from_store": False,
+                    "nodes": ctx.nodes_searched,
+                    "tt_hits": ctx.tt_hits,
+                    "tt_hashfull": ctx.tt.hashfull(),
+                    "depth": ctx.depth_reached,
+                    "time": time.time() - start,
+                    "ponder": ponder_status,
+                }
+            time_limit = max(PONDER_MIN_SEARCH, time_limit - ponder.elapsed)
+
+    best_move, evaluation = get_best_move_and_eval(
+        board, time_limit=time_limit, max_depth=job["max_depth"], ctx=ctx,
+        threads=job.get("threads", 1), skill_level=skill_level
+    )
+    if store is not None and best_move and ctx.depth_reached:
+        store.record(key, bulletchess.Move.from_uci(best_move), evaluation,
+                     ctx.depth_reached, ctx.nodes_searched)
+    result = {
+        "best_move": best_move,
+        "evaluation": evaluation,
+        "from_book": False,
+        "from_store": False,
+        "nodes": ctx.nodes_searched,
+        "tt_hits": ctx.tt_hits,
+        "tt_hashfull": ctx.tt.hashfull(),
+        "depth": ctx.depth_reached,
+        "time": time.time() - start,
+        "ponder": ponder_status,
+    }
+    if job.get("include_stats"):
+        result["stats"] = ctx.stats.to_dict()
+    return result
+
+def run_analysis(job: Dict[str, Any], ctx) -> Dict[str, Any]:
+    """Rank the job's best `num_pv` moves with one Multi-PV search. Runs inside a worker."""
+    from chess_engine import analyze_position
+
+    start = time.time()
+    result = analyze_position(board_from_job(job), num_pv=job["num_pv"], time_limit=job["time_limit"],
+                              max_depth=job["max_depth"], ctx=ctx)
+    result["time"] = time.time() - start
+    return result
+
+# -------------------------
+# Pondering
+# -------------------------
+class Ponder:
+    """A background search of one session's position on the player's time."""
+
+    def __init__(self, session_id: str, ctx, board: bulletchess.Board, max_depth: int):
+        self.session_id = session_id
+        self.ctx = ctx
+        self.position = board_to_position(board)
+        self.best_move: Optional[str] = None
+        self.evaluation = 0.0
+        self.finished = False  # Ended by itself rather than by stop()
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(board, max_depth), daemon=True)
+        self._thread.start()
+
+    def _run(self, board: bulletchess.Board, max_depth: int):
+        from analysis_store import get_analysis_store, is_storable
+        from chess_engine import get_best_move_and_eval
+        from zobrist import compute_key
+
+        start = time.monotonic()
+        self.ctx.stop_event = self._stop
+        try:
+            self.best_move, self.evaluation = get_best_move_and_eval(
+                board, time_limit=PONDER_MAX_SECONDS, max_depth=max_depth, ctx=self.ctx)
+            self.finished = not self._stop.is_set()
+            store = get_analysis_store()
+            if store is not None and self.best_move and self.ctx.depth_reached and is_storable(board):
+                store.record(compute_key(board), bulletchess.Move.from_uci(self.best_move), self.evaluation,
+                             self.ctx.depth_reached, self.ctx.nodes_searched)
+        finally:
+            self.ctx.stop_event = None
+            self.elapsed = time.monotonic() - start
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+def start_ponder(job: Dict[str, Any], result: Dict[str, Any], ctx) -> Optional[Ponder]:
+    """Ponder after answering `job` with `result`, if there is anything to ponder."""
+    from zobrist import compute_key
+
+    if result["from_book"] or not result["best_move"]:
+        return None
+    board = board_from_job(job)
+    board.apply(bulletchess.Move.from_uci(result["best_move"]))
+    replies = list(board.legal_moves())
+    if not replies:
+        return None
+    entry = ctx.tt.probe(compute_key(board))
+    if entry is not None and entry.best_move in replies:
+        board.apply(entry.best_move)  # Expected reply: a hit if the player plays it
+        if not any(True for _ in board.legal_moves()):
+            return None
+    return Ponder(job["session_id"], ctx, board, job["max_depth"])
+
+# -------------------------
+# Worker process
+# -------------------------
+class StopSignal:
+    """Stop event of one request: set once the pool writes its id into the worker's stop slot."""
+
+    def __init__(self, slot, req_id: int):
+        self.slot = slot
+        self.req_id = req_id
+
+    def is_set(self) -> bool:
+        return self.slot.value == self.req_id
+
+def _worker_main(inbox, outbox, parent_pid: int, stop_slot):
+    from analysis_store import get_analysis_store
+    from chess_engine import SearchContext
+    from engine_state import SESSION_TT_SIZE_MB
+    from opening_book import load_book
+
+    load_book()
+    store = get_analysis_store()
+    contexts: "OrderedDict[str, SearchContext]" = OrderedDict()
+
+    def context_for(session_id: str) -> SearchContext:
+        ctx = contexts.get(session_id)
+        if ctx is None:
+            if len(contexts) >= MAX_CONTEXTS_PER_WORKER:
+                contexts.popitem(last=False)
+            ctx = SearchContext(SESSION_TT_SIZE_MB)
+            contexts[session_id] = ctx
+        contexts.move_to_end(session_id)
+        return ctx
+
+    ponder: Optional[Ponder] = None
+    while True:
+        try:
+            msg = inbox.get(timeout=WORKER_POLL_SECONDS)
+        except queue.Empty:
+            # Workers are not daemonic (Lazy SMP helpers need a non-daemon
+            # parent), so exit by ourselves if the server went away
+            if os.getppid() != parent_pid:
+                if ponder is not None:
+                    ponder.stop()
+                break
+            if store is not None:
+                store.flush()
+            continue
+        kind = msg[0]
+        # Any search needs the CPU; a reset/drop only concerns its own session
+        previous = None
+        if ponder is not None and (kind in ("search", "quit")
+                                   or (kind in ("reset", "drop") and msg[1] == ponder.session_id)):
+            ponder.stop()
+            previous, ponder = ponder, None
+        if kind == "search":
+            _, req_id, job = msg
+            try:
+                ctx = context_for(job["session_id"])
+                same_session = previous is not None and previous.session_id == job["session_id"]
+                ctx.stop_event = StopSignal(stop_slot, req_id)
+                if job.get("stream"):
+                    ctx.on_iteration = lambda info: outbox.put(("progress", req_id, info))
+                try:
+                    result = run_search(job, ctx, previous if same_session else None)
+                finally:
+                    ctx.stop_event = None
+                    ctx.on_iteration = None
+                outbox.put(("result", req_id, result, None))
+                if job.get("ponder"):
+                    ponder = start_ponder(job, result, ctx)
+            except Exception as e:
+                outbox.put(("result", req_id, None, str(e)))
+        elif kind == "reset":
+            if msg[1] in contexts:
+                contexts[msg[1]].clear()
+        elif kind == "drop":
+            contexts.pop(msg[1], None)
+        elif kind == "quit":
+            if store is not None:
+                store.flush()
+            break
+
+# -------------------------
+# Pool (server side)
+# -------------------------
+class EngineError(RuntimeError):
+    pass
+
+class EnginePool:
+    """Routes search jobs to worker processes and resolves awaiting requests."""
+
+    def __init__(self, num_workers: int = ENGINE_WORKERS):
+        self.num_workers = num_workers
+        self._mp = mp.get_context("spawn")
+        self._workers: List[Any] = []
+        self._inboxes: List[Any] = []
+        # Per worker: id of the request it should stop (see StopSignal)
+        self._stop_slots: List[Any] = []
+        self._outbox = None
+        # Request id -> (loop, future, worker, session, progress callback)
+        self._pending: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Future, int, str,
+                                       Optional[Callable[[Dict[str, Any]], None]]]] = {}
+        # In-process mode: stop events of the running searches by session
+        self._local_stops: Dict[str, threading.Event] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._reader: Optional[threading.Thread] = None
+        self._running = False
+        # Workers allowed to ponder: worker -> (session, time by which it stops anyway)
+        self._pondering: Dict[int, Tuple[str, float]] = {}
+
+    def start(self):
+        if self._running or self.num_workers <= 0:
+            return
+        self._outbox = self._mp.Queue()
+        for _ in range(self.num_workers):
+            inbox = self._mp.Queue()
+            slot = self._mp.Value("q", -1, lock=False)
+            self._inboxes.append(inbox)
+            self._stop_slots.append(slot)
+            self._workers.append(self._spawn(inbox, slot))
+        self._running = True
+        self._reader = threading.Thread(target=self._read_results, daemon=True)
+        self._reader.start()
+
+    def _spawn(self, inbox, stop_slot):
+        proc = self._mp.Process(target=_worker_main, args=(inbox, self._outbox, os.getpid(), stop_slot))
+        proc.start()
+        return proc
+
+    def shutdown(self):
+        if not self._running:
+            return
+        self._running = False
+        for inbox in self._inboxes:
+            inbox.put(("quit",))
+        for proc in self._workers:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+        self._fail_pending(lambda worker: True, "Engine pool shut down")
+        self._pondering.clear()
+        self._workers.clear()
+        self._inboxes.clear()
+        self._stop_slots.clear()
+
+    def worker_for(self, session_id: str) -> int:
+        if self.num_workers <= 0:
+            return 0
+        return zlib.crc32(session_id.encode()) % self.num_workers
+
+    async def search(self, job: Dict[str, Any],
+                     on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Run a search job and return move, evaluation and search stats.
+        `on_progress` is called on the event loop after every completed iteration.
+        """
+        loop = asyncio.get_running_loop()
+        if not self._running:
+            return await self._search_in_process(job, loop, on_progress)
+
+        future = loop.create_future()
+        worker = self.worker_for(job["session_id"])
+        if on_progress is not None:
+            job = dict(job, stream=True)
+        with self._lock:
+            req_id = next(self._ids)
+            self._pending[req_id] = (loop, future, worker, job["session_id"], on_progress)
+            # The job stops whatever the worker was pondering
+            self._pondering.pop(worker, None)
+            if job.get("ponder"):
+                job = dict(job, ponder=self._grant_ponder(worker, job))
+        self._inboxes[worker].put(("search", req_id, job))
+        return await future
+
+    async def _search_in_process(self, job: Dict[str, Any], loop: asyncio.AbstractEventLoop,
+                                 on_progress: Optional[Callable[[Dict[str, Any]], None]]) -> Dict[str, Any]:
+        # In-process fallback: keep the event loop free by using a thread
+        from engine_state import get_search_context
+        ctx = get_search_context(job["session_id"])
+        stop = threading.Event()
+
+        def search() -> Dict[str, Any]:
+            # The stop signal and callback belong to the search holding the
+            # context, so a second search on the session cannot replace them
+            with ctx.lock:
+                self._local_stops[job["session_id"]] = stop
+                ctx.stop_event = stop
+                if on_progress is not None:
+                    ctx.on_iteration = lambda info: loop.call_soon_threadsafe(on_progress, info)
+                try:
+                    return run_search(job, ctx)
+                finally:
+                    ctx.stop_event = None
+                    ctx.on_iteration = None
+                    if self._local_stops.get(job["session_id"]) is stop:
+                        del self._local_stops[job["session_id"]]
+
+        return await asyncio.to_thread(search)
+
+    def stop_search(self, session_id: str) -> bool:
+        """
+        "Play now": make the session's running search return its best move so
+        far. False if the session has no search in progress.
+        """
+        if not self._running:
+            stop = self._local_stops.get(session_id)
+            if stop is None:
+                return False
+            stop.set()
+            return True
+        with self._lock:
+            running = [rid for rid, pending in self._pending.items() if pending[3] == session_id]
+        if not running:
+            return False
+        # The session's requests run in order on its worker: stop the oldest
+        self._stop_slots[self.worker_for(session_id)].value = min(running)
+        return True
+
+    def _grant_ponder(self, worker: int, job: Dict[str, Any]) -> bool:
+        """Take a ponder slot for `worker` if the budget allows (lock held)."""
+        now = time.monotonic()
+        for w, (_, until) in list(self._pondering.items()):
+            if until < now:
+                del self._pondering[w]
+        if len(self._pondering) >= PONDER_SLOTS:
+            return False
+        self._pondering[worker] = (job["session_id"], now + job["time_limit"] + PONDER_MAX_SECONDS)
+        return True
+
+    def _release_ponder(self, worker: int, session_id: str):
+        with self._lock:
+            if self._pondering.get(worker, ("",))[0] == session_id:
+                del self._pondering[worker]
+
+    def reset_session(self, session_id: str):
+        """A new game started: stop pondering it and clear the session's tables in its worker."""
+        if self._running:
+            worker = self.worker_for(session_id)
+            self._release_ponder(worker, session_id)
+            self._inboxes[worker].put(("reset", session_id))
+
+    def drop_session(self, session_id: str):
+        """The session is gone: stop pondering it and free its tables in its worker."""
+        if self._running:
+            worker = self.worker_for(session_id)
+            self._release_ponder(worker, session_id)
+            self._inboxes[worker].put(("drop", session_id))
+
+    def _read_results(self):
+        while self._running:
+            try:
+                msg = self._outbox.get(timeout=1.0)
+            except queue.Empty:
+                self._check_workers()
+                continue
+            except (EOFError, OSError):
+                break
+            if msg[0] == "progress":
+                _, req_id, info = msg
+                with self._lock:
+                    pending = self._pending.get(req_id)
+                if pending is not None and pending[4] is not None:
+                    pending[0].call_soon_threadsafe(pending[4], info)
+                continue
+            _, req_id, result, error = msg
+            with self._lock:
+                pending = self._pending.pop(req_id, None)
+            if pending is None:
+                continue
+            loop, future = pending[0], pending[1]
+            loop.call_soon_threadsafe(_resolve, future, result, error)
+
+    def _check_workers(self):
+        """Restart crashed workers and fail the requests they were serving."""
+        for i, proc in enumerate(self._workers):
+            if self._running and not proc.is_alive():
+                self._fail_pending(lambda worker: worker == i, "Engine worker crashed")
+                with self._lock:
+                    self._pondering.pop(i, None)
+                self._inboxes[i] = self._mp.Queue()
+                self._stop_slots[i] = self._mp.Value("q", -1, lock=False)
+                self._workers[i] = self._spawn(self._inboxes[i], self._stop_slots[i])
+
+    def _fail_pending(self, match, message: str):
+        with self._lock:
+            failed = [rid for rid, pending in self._pending.items() if match(pending[2])]
+            entries = [self._pending.pop(rid) for rid in failed]
+        for loop, future, *_ in entries:
+            loop.call_soon_threadsafe(_resolve, future, None, message)
+
+def _resolve(future: asyncio.Future, result, error):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(EngineError(error))
+    else:
+        future.set_result(result)
+
+engine_pool = EnginePool()
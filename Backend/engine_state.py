@@ -1,14 +1,23 @@
+from collections import OrderedDict
 from typing import Dict, Tuple, Optional
 from datetime import datetime, timedelta
 import bulletchess
-from chess_engine import clear_transposition_table
+from chess_engine import SearchContext
+from engine_pool import MAX_CONTEXTS_PER_WORKER
 
 # store all ongoing sessions with last access time
 # Key format: "sessionID_userID" -> (board, last_access_time, user_id)
 sessions: Dict[str, Tuple[bulletchess.Board, datetime, str]] = {}
 # Track resigned/manually ended games
 resigned_games: Dict[str, str] = {}  # session_id -> winner ('white' or 'black')
+# Bot strength chosen at /new_game (see skill.py); sessions without one play at full strength
+skill_levels: Dict[str, int] = {}
 SESSION_TTL = timedelta(hours=2)  # Sessions expire after 2 hours of inactivity
+# Per-session search state so concurrent games don't share TT/killers/history.
+# Only the in-process fallback searches here; like a worker it keeps the
+# tables of the MAX_CONTEXTS_PER_WORKER most recently searched sessions (LRU)
+search_contexts: "OrderedDict[str, SearchContext]" = OrderedDict()
+SESSION_TT_SIZE_MB = 8  # Transposition table budget per session
 
 def parse_session_id(session_id: str) -> Tuple[str, str]:
     """
@@ -30,6 +39,8 @@ def cleanup_old_sessions():
         # Also clean up resignation status for expired sessions
         if sid in resigned_games:
             del resigned_games[sid]
+        skill_levels.pop(sid, None)
+        search_contexts.pop(sid, None)
 
 def get_or_create_board(session_id: str) -> bulletchess.Board:
     # Periodically cleanup old sessions (every 100th call)
@@ -65,8 +76,20 @@ def reset_board(session_id: str):
     # Clear resignation status when starting new game
     if session_id in resigned_games:
         del resigned_games[session_id]
-    # Clear transposition table to avoid hash collisions from previous games
-    clear_transposition_table()
+    # Start the new game with fresh tables; other sessions keep theirs
+    if session_id in search_contexts:
+        search_contexts[session_id].clear()
+
+def get_search_context(session_id: str) -> SearchContext:
+    """Get (or lazily create) the search context belonging to a session."""
+    ctx = search_contexts.get(session_id)
+    if ctx is None:
+        if len(search_contexts) >= MAX_CONTEXTS_PER_WORKER:
+            search_contexts.popitem(last=False)  # Least recently searched session
+        ctx = SearchContext(SESSION_TT_SIZE_MB)
+        search_contexts[session_id] = ctx
+    search_contexts.move_to_end(session_id)
+    return ctx
 
 def get_fen(session_id: str) -> str:
     return get_or_create_board(session_id).fen()
@@ -75,6 +98,16 @@ def mark_game_resigned(session_id: str, winner: str):
     """Mark a game as resigned with the specified winner."""
     resigned_games[session_id] = winner
 
+def set_skill_level(session_id: str, level: Optional[int]):
+    """Set the session's bot strength; None for full strength."""
+    if level is None:
+        skill_levels.pop(session_id, None)
+    else:
+        skill_levels[session_id] = level
+
+def get_skill_level(session_id: str) -> Optional[int]:
+    return skill_levels.get(session_id)
+
 def is_game_resigned(session_id: str) -> Optional[str]:
     """Check if game is resigned. Returns winner ('white'/'black') or None."""
     return resigned_games.get(session_id)
\ No newline at end of file
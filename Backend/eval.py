@@ -1,6 +1,15 @@
+import math
 import bulletchess
 from bulletchess import *
 import bulletchess.utils as utils
+from bitboards import (
+    CENTER, EDGE_DISTANCE, KING_SHIELD, MANHATTAN_DISTANCE, PASSED_SPANS, RANK_MASKS, file_set, lsb
+)
+from typing import List, NamedTuple, Optional, Tuple
+from zobrist import (
+    EMPTY, PIECE_INDEX_TYPES, PIECE_TYPE_INDEX, WHITE_PAWN, BLACK_PAWN, WHITE_KING, BLACK_KING,
+    CASTLING_ROOK_MOVES, build_mailbox
+)
 
 # Constants
 MATERIAL = {
@@ -161,13 +170,84 @@ for ptype in [PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING]:
             for i in range(64)
         ])
 
-def count_bits(bb: bulletchess.Bitboard) -> int:
-    return sum(1 for _ in bb)
+# Incremental material + PST: the search keeps (opening sum, endgame sum,
+# phase material) up to date in make_move/unmake_move instead of scanning the
+# board at every evaluation; the two sums are blended once, in tapered_psqt.
+#
+# Piece index (see zobrist.py) -> square -> material + table value, signed
+# from white's point of view
+PSQT_OPENING = [[0] * 64 for _ in range(12)]
+PSQT_ENDGAME = [[0] * 64 for _ in range(12)]
+for piece_idx, ptype in enumerate(PIECE_INDEX_TYPES):
+    for sq_idx in range(64):
+        if piece_idx < 6:
+            PSQT_OPENING[piece_idx][sq_idx] = MATERIAL[ptype] + PST[ptype]['opening'][sq_idx ^ 56]
+            PSQT_ENDGAME[piece_idx][sq_idx] = MATERIAL[ptype] + PST[ptype]['endgame'][sq_idx ^ 56]
+        else:
+            PSQT_OPENING[piece_idx][sq_idx] = -(MATERIAL[ptype] + PST[ptype]['opening'][sq_idx])
+            PSQT_ENDGAME[piece_idx][sq_idx] = -(MATERIAL[ptype] + PST[ptype]['endgame'][sq_idx])
+
+PHASE_TOTAL = 24
+# Piece index -> weight in the game phase (see get_game_phase)
+PIECE_PHASE = [{KNIGHT: 1, BISHOP: 1, ROOK: 2, QUEEN: 4}.get(ptype, 0) for ptype in PIECE_INDEX_TYPES]
+
+def compute_psqt(mailbox: List[int]) -> Tuple[int, int, int]:
+    """(opening sum, endgame sum, phase material) of a mailbox, from scratch."""
+    opening = endgame = phase = 0
+    for sq_idx, piece in enumerate(mailbox):
+        if piece != EMPTY:
+            opening += PSQT_OPENING[piece][sq_idx]
+            endgame += PSQT_ENDGAME[piece][sq_idx]
+            phase += PIECE_PHASE[piece]
+    return opening, endgame, phase
+
+def update_psqt(psqt: Tuple[int, int, int], mailbox: List[int],
+                move: bulletchess.Move) -> Tuple[int, int, int]:
+    """
+    `psqt` after `move`, read from the mailbox before the move is played on
+    it (the same cases as zobrist.move_delta).
+    """
+    opening, endgame, phase = psqt
+    origin = move.origin.index()
+    dest = move.destination.index()
+    moving = mailbox[origin]
+    placed = moving
+    promotion = move.promotion
+    if promotion is not None:
+        placed = moving + PIECE_TYPE_INDEX[promotion]  # Same color, promoted type
+        phase += PIECE_PHASE[placed]
+    opening += PSQT_OPENING[placed][dest] - PSQT_OPENING[moving][origin]
+    endgame += PSQT_ENDGAME[placed][dest] - PSQT_ENDGAME[moving][origin]
+
+    victim = mailbox[dest]
+    if victim != EMPTY:
+        opening -= PSQT_OPENING[victim][dest]
+        endgame -= PSQT_ENDGAME[victim][dest]
+        phase -= PIECE_PHASE[victim]
+    elif (moving == WHITE_PAWN or moving == BLACK_PAWN) and (dest - origin) % 8 != 0:
+        # En passant: the captured pawn sits behind the destination square
+        victim = BLACK_PAWN if moving == WHITE_PAWN else WHITE_PAWN
+        victim_sq = dest - 8 if moving == WHITE_PAWN else dest + 8
+        opening -= PSQT_OPENING[victim][victim_sq]
+        endgame -= PSQT_ENDGAME[victim][victim_sq]
+    elif (moving == WHITE_KING or moving == BLACK_KING) and abs(dest - origin) == 2:
+        rook_from, rook_to = CASTLING_ROOK_MOVES[dest]
+        rook = moving - PIECE_TYPE_INDEX[KING] + PIECE_TYPE_INDEX[ROOK]
+        opening += PSQT_OPENING[rook][rook_to] - PSQT_OPENING[rook][rook_from]
+        endgame += PSQT_ENDGAME[rook][rook_to] - PSQT_ENDGAME[rook][rook_from]
+    return opening, endgame, phase
+
+def psqt_phase(phase_material: int) -> float:
+    """Game phase (0 = opening, 1 = endgame) from the phase material, as get_game_phase."""
+    return max(0, PHASE_TOTAL - phase_material) / PHASE_TOTAL
 
-def manhattan_distance(sq1: bulletchess.Square, sq2: bulletchess.Square) -> int:
-    file1, rank1 = sq1.index() % 8, sq1.index() // 8
-    file2, rank2 = sq2.index() % 8, sq2.index() // 8
-    return abs(file1 - file2) + abs(rank1 - rank2)
+def tapered_psqt(opening: int, endgame: int, phase: float) -> float:
+    """Material + PST blended for `phase`, in the same steps as interpolated_pst."""
+    step = int(phase * PHASE_STEPS)
+    return (opening * (PHASE_STEPS - step) + endgame * step) / PHASE_STEPS
+
+def count_bits(bb: bulletchess.Bitboard) -> int:
+    return len(bb)  # Native popcount
 
 def get_game_phase(state: bulletchess.Board) -> float:
     phase_total = 24
@@ -179,27 +259,21 @@ def get_game_phase(state: bulletchess.Board) -> float:
     phase = max(0, min(phase, phase_total))
     return phase / phase_total
 
-def compute_pst_and_material(state: bulletchess.Board, phase: float) -> float:
+def compute_pst_and_material(state: bulletchess.Board, phase: float, mailbox: List[int]) -> float:
     phase_idx = int(phase * PHASE_STEPS)
     score = 0.0
-    for color in [WHITE, BLACK]:
-        sign = 1 if color == WHITE else -1
-        for ptype in [PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING]:
-            bb = state[color, ptype]
-            value = MATERIAL[ptype]
-            table = interpolated_pst[ptype][phase_idx]
-            for sq in bb:
-                sq_idx = sq.index()
-                rank = sq_idx // 8
-                file = sq_idx % 8
-                # PST is from black's perspective (rank 8 at top)
-                # For white: flip rank only (e1 -> e8)
-                # For black: use direct index
-                if color == WHITE:
-                    idx = (7 - rank) * 8 + file
-                else:
-                    idx = sq_idx
-                score += sign * (value + table[idx])
+    for sq_idx, piece in enumerate(mailbox):
+        if piece == EMPTY:
+            continue
+        ptype = PIECE_INDEX_TYPES[piece]
+        table = interpolated_pst[ptype][phase_idx]
+        # PST is from black's perspective (rank 8 at top)
+        # For white: flip rank only (e1 -> e8)
+        # For black: use direct index
+        if piece < 6:
+            score += MATERIAL[ptype] + table[sq_idx ^ 56]
+        else:
+            score -= MATERIAL[ptype] + table[sq_idx]
     return score
 
 def king_safety(state: bulletchess.Board, color: bulletchess.Color, phase_weight: float) -> int:
@@ -208,112 +282,100 @@ def king_safety(state: bulletchess.Board, color: bulletchess.Color, phase_weight
     In endgame, king should be active and centralized.
     """
     sign = 1 if color == WHITE else -1
-    king_sq = utils.king_square(state, color)
     safety = 0
 
     if phase_weight < 0.3:
+        king_index = utils.king_square(state, color).index()
         # Pawn shield - more important in opening
-        if color == WHITE:
-            shield_sqs = [king_sq.north(), king_sq.nw(), king_sq.ne()]
-        else:
-            shield_sqs = [king_sq.south(), king_sq.sw(), king_sq.se()]
-        
-        shield = sum(19 for sq in shield_sqs if sq and state[color, PAWN] & sq.bb())
+        shield_mask = KING_SHIELD[0 if color == WHITE else 1][king_index]
+        shield = 19 * (shield_mask & int(state[color, PAWN])).bit_count()
         safety += int(shield * phase_weight)  # Scale with game phase
         
         # Penalty for king in center during opening/middlegame
-        king_file = king_sq.index() % 8
+        king_file = king_index % 8
         if king_file in [3, 4]:
             safety -= int(41 * phase_weight)  # Only penalize in opening
         
         # Bonus for castled king - only in opening/middlegame
-        king_rank = king_sq.index() // 8
+        king_rank = king_index // 8
         back_rank = 0 if color == WHITE else 7
         if king_rank == back_rank and king_file in [0, 1, 6, 7]:
             safety += int(20 * phase_weight)
     
     return sign * safety
 
-def passed_pawn_bonus(board, phase_weight):
+class PawnStructure(NamedTuple):
+    """
+    Evaluation data that depends on the pawns only, so the search can cache
+    it by pawn key (see pawn_hash.py).
+    """
+    white_passed: Tuple[int, ...]  # Advancement (0-6) of each white passed pawn
+    black_passed: Tuple[int, ...]  # Advancement (0-6) of each black passed pawn
+    isolated: int                  # White isolated pawns minus black ones
+    center: int                    # center_control score
+    white_files: int               # Bitboard of the files holding a white pawn
+    black_files: int               # Same for black
+
+def pawn_structure(state: bulletchess.Board) -> PawnStructure:
+    white_pawns = int(state[WHITE, PAWN])
+    black_pawns = int(state[BLACK, PAWN])
+    white_passed = []
+    black_passed = []
+    # Lowest square first, the order the pawns were always scored in
+    pawns = white_pawns
+    while pawns:
+        square_index = lsb(pawns)
+        pawns &= pawns - 1
+        if not PASSED_SPANS[0][square_index] & black_pawns:
+            # Scale by rank: more advanced = more valuable
+            # Ranks 1-7 (index 1-6 for white pawns)
+            white_passed.append(max(0, square_index // 8 - 1))  # 0 to 6
+    pawns = black_pawns
+    while pawns:
+        square_index = lsb(pawns)
+        pawns &= pawns - 1
+        if not PASSED_SPANS[1][square_index] & white_pawns:
+            black_passed.append(max(0, 6 - square_index // 8))  # Inverted for black (0 to 6)
+    isolated = len(utils.isolated_pawns(state, WHITE)) - len(utils.isolated_pawns(state, BLACK))
+    return PawnStructure(tuple(white_passed), tuple(black_passed), isolated,
+                         center_control(state),
+                         file_set(white_pawns) * 0x0101010101010101,  # Spread the file set to all ranks
+                         file_set(black_pawns) * 0x0101010101010101)
+
+def passed_pawn_bonus(pawns: PawnStructure, phase_weight: float) -> float:
     """Award bonus for passed pawns, scaled by advancement and phase"""
     bonus = 0
     
     # Endgame: passed pawns more valuable
     base_value = 20 if phase_weight < 0.5 else 37
     
-    white_pawns = board[WHITE, PAWN]
-    black_pawns = board[BLACK, PAWN]
+    for advancement_multiplier in pawns.white_passed:
+        # In endgame, advanced pawns are MUCH more valuable
+        if phase_weight > 0.5:  # Endgame
+            # Exponential scaling: 40, 80, 138, 208, 290, 382
+            bonus += base_value * (1 + advancement_multiplier ** 1.15)
+        else:  # Opening/Middlegame
+            bonus += base_value * (1 + advancement_multiplier * 0.3)
     
-    # Check white pawns
-    for sq in white_pawns:
-        square_index = sq.index()
-        rank = square_index // 8
-        
-        if _is_passed_pawn(board, square_index, True):
-            # Scale by rank: more advanced = more valuable
-            # Ranks 1-7 (index 1-6 for white pawns)
-            advancement_multiplier = max(0, rank - 1)  # 0 to 6
-            
-            # In endgame, advanced pawns are MUCH more valuable
-            if phase_weight > 0.5:  # Endgame
-                # Exponential scaling: 40, 80, 138, 208, 290, 382
-                bonus += base_value * (1 + advancement_multiplier ** 1.15)
-            else:  # Opening/Middlegame
-                bonus += base_value * (1 + advancement_multiplier * 0.3)
-    
-    # Check black pawns
-    for sq in black_pawns:
-        square_index = sq.index()
-        rank = square_index // 8
-        
-        if _is_passed_pawn(board, square_index, False):
-            advancement_multiplier = max(0, 6 - rank)  # Inverted for black (0 to 6)
-            if phase_weight > 0.5:  # Endgame
-                bonus -= base_value * (1 + advancement_multiplier ** 1.15)
-            else:  # Opening/Middlegame
-                bonus -= base_value * (1 + advancement_multiplier * 0.3)
+    for advancement_multiplier in pawns.black_passed:
+        if phase_weight > 0.5:  # Endgame
+            bonus -= base_value * (1 + advancement_multiplier ** 1.15)
+        else:  # Opening/Middlegame
+            bonus -= base_value * (1 + advancement_multiplier * 0.3)
     
     return bonus
 
-def _is_passed_pawn(board, square_index, is_white):
-    """Check if pawn is passed (no enemy pawns ahead) - optimized version"""
-    rank = square_index // 8
-    file_idx = square_index % 8
-    
-    enemy_pawns = board[BLACK, PAWN] if is_white else board[WHITE, PAWN]
-    
-    # Create set of enemy pawn indices for O(1) lookup
-    enemy_indices = set(sq.index() for sq in enemy_pawns)
-    
-    # Check file and adjacent files
-    for check_file in [file_idx - 1, file_idx, file_idx + 1]:
-        if check_file < 0 or check_file >= 8:
-            continue
-        
-        # Check ranks ahead
-        if is_white:
-            check_ranks = range(rank + 1, 8)
-        else:
-            check_ranks = range(0, rank)
-        
-        for check_rank in check_ranks:
-            # O(1) check if enemy pawn exists at this square
-            if check_rank * 8 + check_file in enemy_indices:
-                return False
-    
-    return True
-
-def isolated_pawn_penalty(state: bulletchess.Board, phase_weight: float) -> float:
+def isolated_pawn_penalty(pawns: PawnStructure, phase_weight: float) -> float:
     penalty = 8 if phase_weight > 0.5 else 11
-    return (count_bits(utils.isolated_pawns(state, WHITE)) - count_bits(utils.isolated_pawns(state, BLACK))) * -penalty
+    return pawns.isolated * -penalty
 
 def mop_up_eval(state: bulletchess.Board, phase_weight: float) -> float:
     # Only apply in endgame (phase > 0.5) when material advantage is LARGE (500+)
     if phase_weight <= 0.5:
         return 0
     
-    white_king = utils.king_square(state, WHITE)
-    black_king = utils.king_square(state, BLACK)
+    white_king = utils.king_square(state, WHITE).index()
+    black_king = utils.king_square(state, BLACK).index()
     
     # Calculate who's winning by material
     white_material = sum(count_bits(state[WHITE, pt]) * MATERIAL[pt] for pt in [PAWN, KNIGHT, BISHOP, ROOK, QUEEN])
@@ -324,23 +386,19 @@ def mop_up_eval(state: bulletchess.Board, phase_weight: float) -> float:
     # Only apply mop-up when winning by a FULL PIECE or more (500+ material)
     # 223 material difference is not enough to apply mop-up
     if material_diff > 500:  # White winning by a lot
-        distance = manhattan_distance(white_king, black_king)
+        distance = MANHATTAN_DISTANCE[white_king][black_king]
         score = (14 - distance) * 5  # Reward closer kings (reduced from 8)
         
         # Drive black king to edge
-        black_file, black_rank = black_king.index() % 8, black_king.index() // 8
-        black_edge_dist = min(black_file, 7 - black_file, black_rank, 7 - black_rank)
-        score += (3 - black_edge_dist) * 7  # Reduced from 11
+        score += (3 - EDGE_DISTANCE[black_king]) * 7  # Reduced from 11
         return score  # Removed * 3 multiplier - was way too strong!
         
     elif material_diff < -500:  # Black winning by a lot
-        distance = manhattan_distance(white_king, black_king)
+        distance = MANHATTAN_DISTANCE[white_king][black_king]
         score = -(14 - distance) * 5  # Reduced from 10
         
         # Drive white king to edge
-        white_file, white_rank = white_king.index() % 8, white_king.index() // 8
-        white_edge_dist = min(white_file, 7 - white_file, white_rank, 7 - white_rank)
-        score -= (3 - white_edge_dist) * 7  # Reduced from 20
+        score -= (3 - EDGE_DISTANCE[white_king]) * 7  # Reduced from 20
         return score  # Removed * 3 multiplier
     
     return 0
@@ -357,23 +415,11 @@ def piece_mobility(state: bulletchess.Board, color: bulletchess.Color) -> int:
     # This is expensive, so we'll use a simplified heuristic
     # Just count pieces that are well-placed (not on back rank for minors)
     sign = 1 if color == WHITE else -1
-    mobility = 0
+    back_rank = RANK_MASKS[0 if color == WHITE else 7]
     
-    # Knights off back rank
-    knights = state[color, KNIGHT]
-    for sq in knights:
-        rank = sq.index() // 8
-        back_rank = 0 if color == WHITE else 7
-        if rank != back_rank:
-            mobility += 2  # Knight developed
-    
-    # Bishops off back rank
-    bishops = state[color, BISHOP]
-    for sq in bishops:
-        rank = sq.index() // 8
-        back_rank = 0 if color == WHITE else 7
-        if rank != back_rank:
-            mobility += 2  # Bishop developed
+    # Knights and bishops off back rank
+    minors = int(state[color, KNIGHT] | state[color, BISHOP])
+    mobility = 2 * (minors & ~back_rank).bit_count()  # Minor piece developed
     
     return sign * mobility
 
@@ -385,25 +431,13 @@ def piece_development(state: bulletchess.Board, phase_weight: float) -> int:
     if phase_weight > 0.3:
         return 0
     
-    score = 0
-    
     # White development - penalize minor pieces on back rank (rank 0)
-    for sq in state[WHITE, KNIGHT]:
-        if sq.index() // 8 == 0:  # On rank 1 (index 0-7)
-            score -= 9
-    
-    for sq in state[WHITE, BISHOP]:
-        if sq.index() // 8 == 0:
-            score -= 9
+    white_minors = int(state[WHITE, KNIGHT] | state[WHITE, BISHOP])
+    score = -9 * (white_minors & RANK_MASKS[0]).bit_count()
     
     # Black development - penalize minor pieces on back rank (rank 7)
-    for sq in state[BLACK, KNIGHT]:
-        if sq.index() // 8 == 7:  # On rank 8 (index 56-63)
-            score += 9  # Penalty for black
-    
-    for sq in state[BLACK, BISHOP]:
-        if sq.index() // 8 == 7:
-            score += 9
+    black_minors = int(state[BLACK, KNIGHT] | state[BLACK, BISHOP])
+    score += 9 * (black_minors & RANK_MASKS[7]).bit_count()  # Penalty for black
     
     # Scale with phase
     return int(score * phase_weight)
@@ -413,65 +447,131 @@ def center_control(state: bulletchess.Board) -> int:
     Reward control of central squares (d4, e4, d5, e5).
     This encourages better positional play.
     """
-    # We'll check if pawns are in center by checking the bitboards
-    score = 0
-    
-    # Just reward having more pawns advanced
-    white_pawns = state[WHITE, PAWN]
-    black_pawns = state[BLACK, PAWN]
-    
-    for sq in white_pawns:
-        rank = sq.index() // 8
-        file = sq.index() % 8
-        # Pawns on files d,e (3,4) and ranks 4-5 (3-4)
-        if file in [3, 4] and rank in [3, 4]:
-            score += 10  # Central pawn
-    
-    for sq in black_pawns:
-        rank = sq.index() // 8
-        file = sq.index() % 8
-        if file in [3, 4] and rank in [3, 4]:
-            score -= 10  # Black central pawn
-    
-    return score
+    # Just reward having more pawns advanced: pawns on files d,e and ranks 4-5
+    white_center = (int(state[WHITE, PAWN]) & CENTER).bit_count()
+    black_center = (int(state[BLACK, PAWN]) & CENTER).bit_count()
+    return 10 * (white_center - black_center)
 
-def rook_on_open_file(state: bulletchess.Board, color: bulletchess.Color) -> int:
+def rook_on_open_file(state: bulletchess.Board, color: bulletchess.Color, pawns: PawnStructure) -> int:
     """
     Reward rooks on open or semi-open files.
     """
     sign = 1 if color == WHITE else -1
-    bonus = 0
+    if color == WHITE:
+        own_files, enemy_files = pawns.white_files, pawns.black_files
+    else:
+        own_files, enemy_files = pawns.black_files, pawns.white_files
     
-    rooks = state[color, ROOK]
-    for rook_sq in rooks:
-        file = rook_sq.index() % 8
-        
-        # Check if file is open (no pawns)
-        has_own_pawn = False
-        has_enemy_pawn = False
-        
-        # Check all pawns to see if any are on this file
-        for pawn_sq in state[color, PAWN]:
-            if pawn_sq.index() % 8 == file:
-                has_own_pawn = True
-                break
-        
-        for pawn_sq in state[color.opposite, PAWN]:
-            if pawn_sq.index() % 8 == file:
-                has_enemy_pawn = True
-                break
-        
-        if not has_own_pawn and not has_enemy_pawn:
-            bonus += 35  # Open file
-        elif not has_own_pawn and has_enemy_pawn:
-            bonus += 20  # Semi-open file
+    rooks = int(state[color, ROOK])
+    if not rooks:
+        return 0
+    rooks &= ~own_files
+    bonus = 35 * (rooks & ~enemy_files).bit_count()  # Open file
+    bonus += 20 * (rooks & enemy_files).bit_count()  # Semi-open file
     
     return sign * bonus
 
-def evaluate_position(state: bulletchess.Board) -> float:
-    phase_weight = get_game_phase(state)
+# Lazy evaluation: the search gets evaluate_position's score in three stages,
+# cheapest first. Stage 1 reads incremental sums and the pawn hash (material,
+# PST, tempo, pawn structure, rook files); stage 2 adds king safety and
+# mop-up, stage 3 the minor-piece terms. What stages 2 and 3 can add is
+# bounded, so when the score so far is outside the caller's window by more
+# than that, they are skipped.
+EVAL_STAGES = 3
+
+def _king_stage_bound(phase_weight: float) -> int:
+    """Largest |king safety + mop-up| at this phase."""
+    bound = 0
+    if phase_weight < 0.3:
+        # Per king: full pawn shield + castled bonus, or the center penalty
+        bound += int(57 * phase_weight) + int(20 * phase_weight) + int(41 * phase_weight)
+    if phase_weight > 0.5:
+        bound += (14 - 1) * 5 + 3 * 7  # Kings adjacent, losing king on the edge
+    return bound
+
+def _minor_stage_bound(state: bulletchess.Board, phase_weight: float) -> int:
+    """Largest |mobility + development| for the minor pieces on the board."""
+    if phase_weight > 0.7:
+        return 0
+    minors = len(state[WHITE, KNIGHT] | state[WHITE, BISHOP] | state[BLACK, KNIGHT] | state[BLACK, BISHOP])
+    bound = 2 * minors
+    if phase_weight <= 0.3:
+        bound += int(9 * minors * phase_weight)
+    return bound
+
+def evaluate_lazy(state: bulletchess.Board, psqt: Tuple[int, int, int], pawns: PawnStructure,
+                  lower: float = -math.inf, upper: float = math.inf) -> Tuple[float, int]:
+    """
+    evaluate_position from the search's incremental sums and pawn structure,
+    computed in stages. Once the score so far is certainly below `lower` or
+    above `upper` whatever the remaining stages add, that bound is returned
+    instead of the exact score (the exact score is on the same side of the
+    window). Returns (score, stages computed); the score is exact when all
+    EVAL_STAGES were computed.
+    """
+    phase_weight = psqt_phase(psqt[2])
+    side = 1 if state.turn == WHITE else -1
+    positional = phase_weight <= 0.7
+
+    # Stage 1
+    material = tapered_psqt(psqt[0], psqt[1], phase_weight)
+    tempo_bonus = tempo(state, phase_weight)
+    passed = passed_pawn_bonus(pawns, phase_weight)
+    isolated = isolated_pawn_penalty(pawns, phase_weight)
+    center = rooks_white = rooks_black = 0
+    if positional:
+        center = pawns.center
+        rooks_white = rook_on_open_file(state, WHITE, pawns)
+        rooks_black = rook_on_open_file(state, BLACK, pawns)
+    partial = side * (material + tempo_bonus + passed + isolated + center + rooks_white + rooks_black)
+    minor_bound = _minor_stage_bound(state, phase_weight)
+    bound = _king_stage_bound(phase_weight) + minor_bound
+    if partial - bound > upper:
+        return partial - bound, 1
+    if partial + bound < lower:
+        return partial + bound, 1
+
+    # Stage 2
+    king_white = king_safety(state, WHITE, phase_weight)
+    king_black = king_safety(state, BLACK, phase_weight)
+    mop_up = mop_up_eval(state, phase_weight)
+    partial += side * (king_white + king_black + mop_up)
+    if partial - minor_bound > upper:
+        return partial - minor_bound, 2
+    if partial + minor_bound < lower:
+        return partial + minor_bound, 2
+
+    # Stage 3, then the exact score summed in evaluate_position's order
+    score = material + tempo_bonus + king_white + king_black + passed + isolated + mop_up
+    if positional:
+        score += piece_mobility(state, WHITE) - piece_mobility(state, BLACK)
+        score += piece_development(state, phase_weight)
+        score += center
+        score += rooks_white
+        score += rooks_black
+    return side * score, EVAL_STAGES
+
+def evaluate_position(state: bulletchess.Board, mailbox: Optional[List[int]] = None,
+                      psqt: Optional[Tuple[int, int, int]] = None,
+                      pawns: Optional[PawnStructure] = None) -> float:
+    """
+    Static evaluation from the side to move's point of view. `mailbox` is the
+    search's piece-on-square list (see zobrist.py); it is built here if omitted.
+    `psqt` is the search's incremental (opening, endgame, phase material)
+    accumulator; without it material and PST are summed over the board.
+    `pawns` is the position's PawnStructure, e.g. from the pawn hash.
+    """
+    if mailbox is None:
+        mailbox = build_mailbox(state)
+    if pawns is None:
+        pawns = pawn_structure(state)
     # Core evaluation
-    score = compute_pst_and_material(state, phase_weight)
+    if psqt is not None:
+        phase_weight = psqt_phase(psqt[2])
+        score = tapered_psqt(psqt[0], psqt[1], phase_weight)
+    else:
+        phase_weight = get_game_phase(state)
+        score = compute_pst_and_material(state, phase_weight, mailbox)
 
     # Tempo bonus
     score += tempo(state, phase_weight)
@@ -481,8 +581,8 @@ def evaluate_position(state: bulletchess.Board) -> float:
     score += king_safety(state, BLACK, phase_weight)
     
     # Pawn structure
-    score += passed_pawn_bonus(state, phase_weight)
-    score += isolated_pawn_penalty(state, phase_weight)
+    score += passed_pawn_bonus(pawns, phase_weight)
+    score += isolated_pawn_penalty(pawns, phase_weight)
     
     # Endgame specific
     score += mop_up_eval(state, phase_weight)
@@ -491,8 +591,8 @@ def evaluate_position(state: bulletchess.Board) -> float:
     if phase_weight <= 0.7:  # Opening/Middlegame
         score += piece_mobility(state, WHITE) - piece_mobility(state, BLACK)
         score += piece_development(state, phase_weight)
-        score += center_control(state)
-        score += rook_on_open_file(state, WHITE)
-        score += rook_on_open_file(state, BLACK)
+        score += pawns.center
+        score += rook_on_open_file(state, WHITE, pawns)
+        score += rook_on_open_file(state, BLACK, pawns)
     
     return score if state.turn == WHITE else -score
\ No newline at end of file
@@ -0,0 +1,60 @@
+"""
+Static evaluation cache for the search.
+
+The search evaluates the same position several times: quiescence stand pat,
+the futility check of shallow negamax nodes, and again whenever the
+transposition table did not keep the node. The cache remembers
+evaluate_position's result by position key (zobrist.py), so a repeated
+evaluation costs a lookup.
+
+Like the pawn hash (pawn_hash.py) the cache is direct-mapped with a fixed
+number of slots and keeps the full key per slot; a new position replaces
+whatever was in its slot. Cached values are the plain evaluation: skill
+noise is added by the search afterwards.
+
+A lazy evaluation that stopped early (eval.evaluate_lazy) only gives a bound
+on the score. Bounds are cached as well, flagged like transposition table
+entries, and answer a later probe whose window they are still outside of.
+"""
+import math
+import os
+from typing import List, Optional
+
+EVAL_CACHE_ENTRIES = int(os.environ.get("ENGINE_EVAL_CACHE_ENTRIES", 1 << 15))  # Slots per search context
+
+EMPTY_KEY = -1  # Position keys are unsigned, so no real key matches an empty slot
+
+# What a cached value is: the score, or a bound the score is at least/at most
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class EvalCache:
+    def __init__(self, entries: int = EVAL_CACHE_ENTRIES):
+        size = 1 << max(0, entries - 1).bit_length()  # Round up to a power of two
+        self.mask = size - 1
+        self.keys: List[int] = [EMPTY_KEY] * size
+        self.values: List[float] = [0.0] * size
+        self.flags: List[int] = [EXACT] * size
+
+    def probe(self, key: int, lower: float = -math.inf, upper: float = math.inf) -> Optional[float]:
+        """The cached score, or a cached bound that is below `lower` or above `upper`."""
+        index = key & self.mask
+        if self.keys[index] != key:
+            return None
+        value = self.values[index]
+        flag = self.flags[index]
+        if flag == EXACT or (flag == LOWER and value > upper) or (flag == UPPER and value < lower):
+            return value
+        return None
+
+    def store(self, key: int, value: float, flag: int = EXACT):
+        index = key & self.mask
+        self.keys[index] = key
+        self.values[index] = value
+        self.flags[index] = flag
+
+    def clear(self):
+        size = self.mask + 1
+        self.keys = [EMPTY_KEY] * size
+        self.values = [0.0] * size
+        self.flags = [EXACT] * size
@@ -1,25 +1,40 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Callable, Optional, Dict, Any
+from contextlib import asynccontextmanager
 import bulletchess
 from bulletchess import CHECKMATE, DRAW, CHECK, INSUFFICIENT_MATERIAL, FIFTY_MOVE_TIMEOUT, THREEFOLD_REPETITION
-from chess_engine import get_best_move_and_eval
 from engine_state import (
     apply_move, get_or_create_board, reset_board, sessions,
-    mark_game_resigned, is_game_resigned
+    mark_game_resigned, is_game_resigned, get_skill_level, set_skill_level
 )
-from opening_book import get_opening_move, load_book
+from engine_pool import engine_pool, make_analysis_job, make_search_job
+from analysis_store import MAX_STORED_DEPTH
+from opening_book import load_book
+from smp import MAX_SEARCH_THREADS
+from chess_engine import MAX_PV
+from skill import MAX_SKILL_LEVEL
 from puzzle_manager import (
     load_puzzles, create_puzzle_session, get_session as get_puzzle_session,
     delete_session as delete_puzzle_session
 )
+import asyncio
+import json
 import uuid
 
 # Load opening book and puzzles at startup
 load_book()
 load_puzzles()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Engine workers load the book once and keep their tables between requests
+    engine_pool.start()
+    yield
+    engine_pool.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 # ============================================================================
 # HELPER FUNCTIONS
@@ -91,6 +106,31 @@ def check_game_status(board: bulletchess.Board, session_id: str) -> Dict[str, An
     # Game is still ongoing
     return status
 
+async def compute_bot_move(session_id: str, board: bulletchess.Board, time_limit: float,
+                           threads: int = 1, ponder: bool = False,
+                           min_depth: Optional[int] = None, include_stats: bool = False,
+                           on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Ask the engine pool for the bot's move (opening book first, then search).
+
+    The board is not touched while the engine thinks; if another request
+    changes the game in the meantime the result is stale and rejected.
+    With `ponder` the engine keeps thinking on the player's time afterwards.
+    A stored analysis at least `min_depth` deep is returned without searching.
+    With `include_stats` the result carries the search telemetry in "stats".
+    `on_progress` receives the search's progress after every iteration.
+    The session's skill level, if set at /new_game, limits the search.
+    """
+    plies = len(board.history)
+    result = await engine_pool.search(
+        make_search_job(session_id, board, time_limit, threads=threads, ponder=ponder,
+                        min_depth=min_depth, include_stats=include_stats,
+                        skill_level=get_skill_level(session_id)),
+        on_progress)
+    if get_or_create_board(session_id) is not board or len(board.history) != plies:
+        raise HTTPException(status_code=409, detail="Position changed while the engine was thinking")
+    return result
+
 class MoveRequest(BaseModel):
     session_id: str
     move_uci: str
@@ -98,90 +138,211 @@ class MoveRequest(BaseModel):
     auto_bot_response: bool = False
     # Time limit (seconds) to use for the bot move when auto_bot_response is true
     bot_time_limit: float = 5.0
+    # Lazy SMP search processes to use for the bot move when auto_bot_response is true
+    bot_threads: int = 1
+    # Let the engine think on the player's time after the bot move
+    bot_ponder: bool = False
+    # Depth a stored analysis needs to answer the bot move without searching
+    bot_min_depth: Optional[int] = None
+    # Return the bot search's per-iteration statistics
+    bot_include_stats: bool = False
 
 class NewGameRequest(BaseModel):
     session_id: str
     bot_first: bool = False
+    # Bot strength 1..MAX_SKILL_LEVEL for the whole game (see skill.py); None = full strength
+    skill_level: Optional[int] = None
 
 class BotMoveRequest(BaseModel):
     session_id: str
     time_limit: float = 5.0
+    # Number of Lazy SMP search processes (1 = single-threaded search)
+    threads: int = 1
+    # Keep searching on the player's time, so the next reply can come at once
+    ponder: bool = False
+    # Depth a stored analysis needs to be returned without searching
+    # (default: the server's ANALYSIS_MIN_DEPTH)
+    min_depth: Optional[int] = None
+    # Return per-iteration search statistics (nodes, cutoffs, prunes, ...)
+    include_stats: bool = False
+
+class AnalyzeRequest(BaseModel):
+    session_id: str
+    # Number of best moves to rank
+    num_pv: int = 3
+    time_limit: float = 5.0
 
 class HistoryRequest(BaseModel):
     session_id: str
 
+MAX_TIME_LIMIT = 60  # Seconds a single search request may take
+
+def validate_time_limit(time_limit: float, name: str = "time_limit"):
+    if time_limit <= 0:
+        raise HTTPException(status_code=400, detail=f"{name} must be positive")
+    if time_limit > MAX_TIME_LIMIT:
+        raise HTTPException(status_code=400, detail=f"{name} cannot exceed {MAX_TIME_LIMIT} seconds")
+
+def validate_bot_move_request(req: BotMoveRequest):
+    validate_time_limit(req.time_limit)
+    if not 1 <= req.threads <= MAX_SEARCH_THREADS:
+        raise HTTPException(status_code=400, detail=f"threads must be between 1 and {MAX_SEARCH_THREADS}")
+    if req.min_depth is not None and not 1 <= req.min_depth <= MAX_STORED_DEPTH:
+        raise HTTPException(status_code=400, detail=f"min_depth must be between 1 and {MAX_STORED_DEPTH}")
+
+def game_over_response(board: bulletchess.Board, session_id: str) -> Optional[Dict[str, Any]]:
+    """The reply to a bot move request when the game has already ended, else None."""
+    status = check_game_status(board, session_id)
+    if not status["game_over"]:
+        return None
+    return {
+        "error": "Game is already over",
+        "game_status": status,
+        "fen": board.fen(),
+        "session_id": session_id,
+    }
+
+def bot_move_response(req: BotMoveRequest, board: bulletchess.Board, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply the engine's move to the board and describe the outcome."""
+    best_move_uci = result["best_move"]
+    eval_score = result["evaluation"]
+    from_book = result["from_book"]
+    
+    if not best_move_uci:
+        # No legal moves - game is over
+        status = check_game_status(board, req.session_id)
+        return {
+            "error": "No legal moves available",
+            "game_status": status,
+            "fen": board.fen(),
+            "session_id": req.session_id,
+        }
+    
+    move = bulletchess.Move.from_uci(best_move_uci)
+    board.apply(move)
+    
+    # Check game status after bot's move
+    status = check_game_status(board, req.session_id)
+    
+    response = {
+        "best_move": best_move_uci,
+        "evaluation": eval_score,
+        "from_book": from_book,
+        "ponder": result.get("ponder"),
+        "from_store": result.get("from_store", False),
+        "fen": board.fen(),
+        "game_status": status,
+        "session_id": req.session_id,
+    }
+    if req.include_stats:
+        response["stats"] = result.get("stats")
+    
+    # Add user-friendly message if game ended
+    if status["game_over"]:
+        if status["reason"] == "checkmate":
+            response["message"] = f"Checkmate! {status['winner'].capitalize()} wins!"
+        elif status["reason"] == "stalemate":
+            response["message"] = "Draw by stalemate"
+        else:
+            response["message"] = f"Draw by {status['reason'].replace('_', ' ')}"
+    
+    return response
+
 @app.post("/bot_move")
-def bot_move(req: BotMoveRequest):
+async def bot_move(req: BotMoveRequest):
     try:
-        # Validate time_limit
-        if req.time_limit <= 0:
-            raise HTTPException(status_code=400, detail="time_limit must be positive")
-        if req.time_limit > 60:
-            raise HTTPException(status_code=400, detail="time_limit cannot exceed 60 seconds")
-        
+        validate_bot_move_request(req)
         board = get_or_create_board(req.session_id)
         
         # Check if game is already over
-        status = check_game_status(board, req.session_id)
-        if status["game_over"]:
-            return {
-                "error": "Game is already over",
-                "game_status": status,
-                "fen": board.fen(),
-                "session_id": req.session_id,
-            }
-        
-        # Try to get move from opening book first
-        book_move = get_opening_move(board, random_choice=True)
-        
-        if book_move:
-            # Use book move
-            best_move_uci = book_move
-            eval_score = 0.0  # Book moves don't have evaluation
-            from_book = True
-        else:
-            # No book move, use engine
-            best_move_uci, eval_score = get_best_move_and_eval(board, time_limit=req.time_limit)
-            from_book = False
-        
-        if not best_move_uci:
-            # No legal moves - game is over
-            status = check_game_status(board, req.session_id)
-            return {
-                "error": "No legal moves available",
-                "game_status": status,
-                "fen": board.fen(),
-                "session_id": req.session_id,
-            }
-        
-        move = bulletchess.Move.from_uci(best_move_uci)
-        board.apply(move)
-        
-        # Check game status after bot's move
-        status = check_game_status(board, req.session_id)
-        
-        response = {
-            "best_move": best_move_uci,
-            "evaluation": eval_score,
-            "from_book": from_book,
+        over = game_over_response(board, req.session_id)
+        if over:
+            return over
+        
+        # Opening book first, engine search otherwise (both in the engine pool)
+        result = await compute_bot_move(req.session_id, board, req.time_limit, req.threads, req.ponder,
+                                        req.min_depth, req.include_stats)
+        return bot_move_response(req, board, result)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/bot_move/stream")
+async def bot_move_stream(req: BotMoveRequest):
+    """
+    Like /bot_move, as Server-Sent Events: a "progress" event (depth, score,
+    best move, PV, nodes, NPS) after every search iteration, then one
+    "result" event with the /bot_move response, or an "error" event.
+    POST /bot_move/stop/{session_id} makes the engine play its best move so far.
+    """
+    validate_bot_move_request(req)
+    board = get_or_create_board(req.session_id)
+
+    async def events():
+        over = game_over_response(board, req.session_id)
+        if over:
+            yield sse_event("result", over)
+            return
+        progress: asyncio.Queue = asyncio.Queue()
+        search = asyncio.create_task(compute_bot_move(
+            req.session_id, board, req.time_limit, req.threads, req.ponder, req.min_depth,
+            req.include_stats, on_progress=progress.put_nowait))
+        search.add_done_callback(lambda _: progress.put_nowait(None))
+        try:
+            while True:
+                info = await progress.get()
+                if info is None:
+                    break
+                yield sse_event("progress", info)
+            yield sse_event("result", bot_move_response(req, board, search.result()))
+        except HTTPException as e:
+            yield sse_event("error", {"status_code": e.status_code, "detail": e.detail})
+        except Exception as e:
+            yield sse_event("error", {"status_code": 500, "detail": str(e)})
+        finally:
+            if not search.done():
+                # The client went away: don't keep searching for nobody
+                engine_pool.stop_search(req.session_id)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+@app.post("/bot_move/stop/{session_id}")
+def stop_bot_move(session_id: str):
+    """Play it now: the session's running bot search returns its best move so far."""
+    return {
+        "stopped": engine_pool.stop_search(session_id),
+        "session_id": session_id,
+    }
+
+@app.post("/analyze")
+async def analyze(req: AnalyzeRequest):
+    """Top `num_pv` moves of the session's position, with scores and PV lines (the board is not changed)."""
+    try:
+        validate_time_limit(req.time_limit)
+        if not 1 <= req.num_pv <= MAX_PV:
+            raise HTTPException(status_code=400, detail=f"num_pv must be between 1 and {MAX_PV}")
+
+        board = get_or_create_board(req.session_id)
+        result = await engine_pool.search(make_analysis_job(req.session_id, board, req.time_limit, req.num_pv))
+        return {
+            "lines": result["lines"],
+            "depth": result["depth"],
+            "nodes": result["nodes"],
+            "time": result["time"],
             "fen": board.fen(),
-            "game_status": status,
+            "game_status": check_game_status(board, req.session_id),
             "session_id": req.session_id,
         }
-        
-        # Add user-friendly message if game ended
-        if status["game_over"]:
-            if status["reason"] == "checkmate":
-                response["message"] = f"Checkmate! {status['winner'].capitalize()} wins!"
-            elif status["reason"] == "stalemate":
-                response["message"] = "Draw by stalemate"
-            else:
-                response["message"] = f"Draw by {status['reason'].replace('_', ' ')}"
-        
-        return response
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    
+
 @app.post("/get_history")
 def get_history(req: HistoryRequest):
     try:
@@ -195,24 +356,22 @@ def get_history(req: HistoryRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/new_game")
-def new_game(req: NewGameRequest):
+async def new_game(req: NewGameRequest):
     try:
+        if req.skill_level is not None and not 1 <= req.skill_level <= MAX_SKILL_LEVEL:
+            raise HTTPException(status_code=400, detail=f"skill_level must be between 1 and {MAX_SKILL_LEVEL}")
         reset_board(req.session_id)
+        set_skill_level(req.session_id, req.skill_level)
+        engine_pool.reset_session(req.session_id)
         board = get_or_create_board(req.session_id)
 
         best_move_uci, eval_score, from_book = None, None, False
         if req.bot_first:
-            # Bot goes first - try opening book with random choice
-            book_move = get_opening_move(board, random_choice=True)
-            
-            if book_move:
-                best_move_uci = book_move
-                eval_score = 0.0
-                from_book = True
-            else:
-                # Fallback to engine if no book move
-                best_move_uci, eval_score = get_best_move_and_eval(board, time_limit=5.0)
-                from_book = False
+            # Bot goes first - opening book with random choice, engine as fallback
+            result = await compute_bot_move(req.session_id, board, 5.0)
+            best_move_uci = result["best_move"]
+            eval_score = result["evaluation"]
+            from_book = result["from_book"]
             
             if best_move_uci:
                 move = bulletchess.Move.from_uci(best_move_uci)
@@ -224,13 +383,16 @@ def new_game(req: NewGameRequest):
             "best_move": best_move_uci,
             "evaluation": eval_score,
             "from_book": from_book,
+            "skill_level": req.skill_level,
             "session_id": req.session_id,
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/move")
-def player_move(req: MoveRequest):
+async def player_move(req: MoveRequest):
     try:
         board = get_or_create_board(req.session_id)
         
@@ -270,21 +432,18 @@ def player_move(req: MoveRequest):
         # If requested, compute and apply the bot's reply immediately
         if req.auto_bot_response:
             # Validate time limit for bot move
-            if req.bot_time_limit <= 0:
-                raise HTTPException(status_code=400, detail="bot_time_limit must be positive")
-            if req.bot_time_limit > 60:
-                raise HTTPException(status_code=400, detail="bot_time_limit cannot exceed 60 seconds")
-
-            # Try opening book first
-            book_move = get_opening_move(board, random_choice=True)
-
-            if book_move:
-                bot_move_uci = book_move
-                bot_eval = 0.0
-                bot_from_book = True
-            else:
-                bot_move_uci, bot_eval = get_best_move_and_eval(board, time_limit=req.bot_time_limit)
-                bot_from_book = False
+            validate_time_limit(req.bot_time_limit, "bot_time_limit")
+            if not 1 <= req.bot_threads <= MAX_SEARCH_THREADS:
+                raise HTTPException(status_code=400, detail=f"bot_threads must be between 1 and {MAX_SEARCH_THREADS}")
+            if req.bot_min_depth is not None and not 1 <= req.bot_min_depth <= MAX_STORED_DEPTH:
+                raise HTTPException(status_code=400, detail=f"bot_min_depth must be between 1 and {MAX_STORED_DEPTH}")
+
+            # Opening book first, engine search otherwise
+            result = await compute_bot_move(req.session_id, board, req.bot_time_limit, req.bot_threads,
+                                            req.bot_ponder, req.bot_min_depth, req.bot_include_stats)
+            bot_move_uci = result["best_move"]
+            bot_eval = result["evaluation"]
+            bot_from_book = result["from_book"]
 
             if not bot_move_uci:
                 # No legal bot move available (game may be over)
@@ -308,9 +467,13 @@ def player_move(req: MoveRequest):
                 "bot_move": bot_move_uci,
                 "bot_evaluation": bot_eval,
                 "bot_from_book": bot_from_book,
+                "bot_ponder": result.get("ponder"),
+                "bot_from_store": result.get("from_store", False),
                 "fen": board.fen(),
                 "game_status": status_after_bot,
             })
+            if req.bot_include_stats:
+                response["bot_stats"] = result.get("stats")
 
             # Friendly end-game message if bot ended the game
             if status_after_bot["game_over"]:
@@ -324,19 +487,25 @@ def player_move(req: MoveRequest):
         return response
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/session/{session_id}")
 def delete_session(session_id: str):
     """Delete a session to free up memory."""
-    from engine_state import resigned_games
+    from engine_state import resigned_games, search_contexts, skill_levels
     
     if session_id in sessions:
         del sessions[session_id]
         # Also clean up resignation status if exists
         if session_id in resigned_games:
             del resigned_games[session_id]
+        # A reused session id starts at full strength again
+        skill_levels.pop(session_id, None)
+        search_contexts.pop(session_id, None)
+        engine_pool.drop_session(session_id)
         return {"message": f"Session {session_id} deleted"}
     raise HTTPException(status_code=404, detail="Session not found")
 
@@ -475,7 +644,7 @@ def new_puzzle(req: NewPuzzleRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/puzzle/move")
-def puzzle_move(req: PuzzleMoveRequest):
+async def puzzle_move(req: PuzzleMoveRequest):
     """
     Make a move in the current puzzle.
     
@@ -491,7 +660,8 @@ def puzzle_move(req: PuzzleMoveRequest):
         if session is None:
             raise HTTPException(status_code=404, detail="No active puzzle session. Start a new puzzle first.")
         
-        result = session.make_move(req.move_uci)
+        # A wrong-looking move in a mating puzzle runs the mate solver; keep the event loop free
+        result = await asyncio.to_thread(session.make_move, req.move_uci)
         result['session_id'] = req.session_id
         
         return result
@@ -0,0 +1,315 @@
+"""
+Mate solver: proof-number search for forced mates.
+
+Answers "can the side to move force mate within N moves?" without
+evaluating anything, which is much cheaper than running negamax to a mate
+score. The search tree is grown best-first: every node carries a proof
+number (how many leaves still have to be shown to be mates to prove it) and
+a disproof number (the same for escapes), and each step expands the leaf
+that most cheaply settles the root. Attacker nodes (OR) need one mating
+move, defender nodes (AND) need every reply to lose.
+
+A leaf at the end of the move budget that is not checkmate counts as an
+escape, as do stalemate and draws. Defender leaves start with their number
+of legal replies as proof number, so forcing moves (checks) are tried first.
+
+Every search runs under a node and time budget; when it is used up the
+answer is "unknown".
+
+Usage (from the Backend directory):
+    python mate_solver.py solve FEN --moves N [--nodes N] [--time S]
+    python mate_solver.py validate [--csv PATH] [--nodes N] [--time S] [--engine]
+"""
+import argparse
+import csv
+import time
+from typing import Dict, List, Optional, Tuple
+import bulletchess
+from bulletchess import CHECKMATE, DRAW
+
+MATE_NODE_BUDGET = 200000  # Nodes per position
+MATE_TIME_LIMIT = 2.0      # Seconds per position
+PN_INF = 10 ** 9
+
+# -------------------------
+# Proof-number search
+# -------------------------
+class _Node:
+    __slots__ = ("move", "pn", "dn", "children")
+
+    def __init__(self, move: Optional[bulletchess.Move], pn: int, dn: int):
+        self.move = move
+        self.pn = pn
+        self.dn = dn
+        self.children: Optional[List["_Node"]] = None
+
+def _leaf_numbers(board: bulletchess.Board, plies_left: int) -> Tuple[int, int]:
+    """Proof and disproof numbers of a new leaf; the attacker moves when plies_left is odd."""
+    attacker_to_move = plies_left & 1
+    if board in CHECKMATE:
+        return (PN_INF, 0) if attacker_to_move else (0, PN_INF)
+    if plies_left == 0 or board in DRAW:
+        return PN_INF, 0
+    if attacker_to_move:
+        return 1, 1
+    return len(board.legal_moves()), 1
+
+class ProofNumberSearch:
+    """
+    One search from `board` with `plies` plies left; the side to move is the
+    attacker if `plies` is odd (mate in N = 2N - 1 plies) and the defender if
+    it is even. The board is restored when run() returns.
+    """
+
+    def __init__(self, board: bulletchess.Board, plies: int, max_nodes: int = MATE_NODE_BUDGET,
+                 time_limit: float = MATE_TIME_LIMIT):
+        self.board = board
+        self.plies = plies
+        self.max_nodes = max_nodes
+        self.deadline = time.monotonic() + time_limit
+        self.nodes = 1
+        self.root = _Node(None, *_leaf_numbers(board, plies))
+
+    def run(self) -> Optional[bool]:
+        """True if mate is forced, False if it is not, None if the budget ran out."""
+        root, board = self.root, self.board
+        iterations = 0
+        while root.pn and root.dn:
+            iterations += 1
+            if self.nodes >= self.max_nodes or (iterations & 63 == 0 and time.monotonic() > self.deadline):
+                return None
+            # Descend to the most-proving leaf
+            path = [root]
+            node = root
+            plies = self.plies
+            while node.children is not None:
+                if plies & 1:
+                    node = min(node.children, key=lambda child: child.pn)
+                else:
+                    node = min(node.children, key=lambda child: child.dn)
+                board.apply(node.move)
+                plies -= 1
+                path.append(node)
+            self._expand(node, plies)
+            # Back the numbers up to the root
+            for i in range(len(path) - 1, -1, -1):
+                node = path[i]
+                if (self.plies - i) & 1:
+                    node.pn = min(child.pn for child in node.children)
+                    node.dn = min(PN_INF, sum(child.dn for child in node.children))
+                else:
+                    node.pn = min(PN_INF, sum(child.pn for child in node.children))
+                    node.dn = min(child.dn for child in node.children)
+                if i:
+                    board.undo()
+        return root.pn == 0
+
+    def _expand(self, node: _Node, plies_left: int):
+        board = self.board
+        children = []
+        for move in board.legal_moves():
+            board.apply(move)
+            children.append(_Node(move, *_leaf_numbers(board, plies_left - 1)))
+            board.undo()
+        node.children = children
+        self.nodes += len(children)
+
+    def proof_line(self) -> List[str]:
+        """
+        Moves of a proven root down to mate: any mating move for the
+        attacker, and the reply with the largest proof tree (the most
+        stubborn defence) for the defender.
+        """
+        line = []
+        node = self.root
+        plies = self.plies
+        while node.children:
+            if plies & 1:
+                node = next(child for child in node.children if child.pn == 0)
+            else:
+                node = max(node.children, key=_tree_size)
+            line.append(node.move.uci())
+            plies -= 1
+        return line
+
+def _tree_size(node: _Node) -> int:
+    if not node.children:
+        return 1
+    return 1 + sum(_tree_size(child) for child in node.children)
+
+def _status(proven: Optional[bool]) -> str:
+    return {True: "mate", False: "no_mate", None: "unknown"}[proven]
+
+# -------------------------
+# Queries
+# -------------------------
+def solve_mate(board: bulletchess.Board, max_moves: int, max_nodes: int = MATE_NODE_BUDGET,
+               time_limit: float = MATE_TIME_LIMIT) -> Dict:
+    """
+    Shortest forced mate for the side to move in at most `max_moves` moves.
+
+    Returns status ("mate", "no_mate" or "unknown" when the budget ran out),
+    mate_in, the first move, the proof line as pv, nodes and time.
+    """
+    start = time.monotonic()
+    nodes = 0
+    status, mate_in, pv = "no_mate", None, []
+    for moves in range(1, max_moves + 1):
+        search = ProofNumberSearch(board, 2 * moves - 1, max_nodes - nodes,
+                                   time_limit - (time.monotonic() - start))
+        proven = search.run()
+        nodes += search.nodes
+        if proven is not False:
+            status = _status(proven)
+            if proven:
+                mate_in, pv = moves, search.proof_line()
+            break
+    return {
+        "status": status,
+        "mate_in": mate_in,
+        "move": pv[0] if pv else None,
+        "pv": pv,
+        "nodes": nodes,
+        "time": time.monotonic() - start,
+    }
+
+def check_mating_move(board: bulletchess.Board, move_uci: str, moves_left: int,
+                      max_nodes: int = MATE_NODE_BUDGET, time_limit: float = MATE_TIME_LIMIT) -> Dict:
+    """
+    Whether playing `move_uci` still forces mate within `moves_left` moves
+    (this one included). Returns status like solve_mate and, when it does,
+    the rest of a mating line after the move as pv (empty if the move mates).
+    """
+    start = time.monotonic()
+    result = {"status": "no_mate", "pv": [], "nodes": 0, "time": 0.0}
+    try:
+        move = bulletchess.Move.from_uci(move_uci)
+    except Exception:
+        return result
+    if move not in board.legal_moves():
+        return result
+    board.apply(move)
+    try:
+        if board in CHECKMATE:
+            result["status"] = "mate"
+        elif moves_left > 1:
+            search = ProofNumberSearch(board, 2 * (moves_left - 1), max_nodes, time_limit)
+            proven = search.run()
+            result.update(status=_status(proven), nodes=search.nodes)
+            if proven:
+                result["pv"] = search.proof_line()
+    finally:
+        board.undo()
+    result["time"] = time.monotonic() - start
+    return result
+
+# -------------------------
+# Puzzle validation
+# -------------------------
+def mating_puzzles(csv_path: str) -> List[Dict]:
+    """
+    Puzzles whose solution line ends in checkmate, set up after the
+    opponent's first move, with the number of moves the solver has.
+    """
+    puzzles = []
+    with open(csv_path, newline="") as f:
+        for row in csv.DictReader(f):
+            moves = row["Moves"].split()
+            board = bulletchess.Board.from_fen(row["FEN"])
+            for uci in moves:
+                board.apply(bulletchess.Move.from_uci(uci))
+            if board not in CHECKMATE:
+                continue
+            board = bulletchess.Board.from_fen(row["FEN"])
+            board.apply(bulletchess.Move.from_uci(moves[0]))
+            puzzles.append({
+                "puzzle_id": row["PuzzleId"],
+                "fen": board.fen(),
+                "solution": moves[1:],
+                "mate_in": len(moves) // 2,
+            })
+    return puzzles
+
+def _engine_time_to_mate(fen: str, mate_in: int, time_limit: float) -> Optional[float]:
+    """Seconds negamax needs to report the mate, or None if it did not within `time_limit`."""
+    from chess_engine import MATE_SCORE, SearchContext, _search_root
+    ctx = SearchContext(tt_size_mb=16)
+    start = time.monotonic()
+    _, score = _search_root(ctx, bulletchess.Board.from_fen(fen), time_limit, 2 * mate_in - 1)
+    elapsed = time.monotonic() - start
+    return elapsed if score >= MATE_SCORE - 2 * mate_in else None
+
+def validate_puzzles(csv_path: str, max_nodes: int = MATE_NODE_BUDGET, time_limit: float = MATE_TIME_LIMIT,
+                     engine: bool = False) -> List[Dict]:
+    """Solve every mating puzzle in `csv_path` and compare with its stored line."""
+    rows = []
+    for puzzle in mating_puzzles(csv_path):
+        board = bulletchess.Board.from_fen(puzzle["fen"])
+        result = solve_mate(board, puzzle["mate_in"], max_nodes, time_limit)
+        row = dict(result, puzzle_id=puzzle["puzzle_id"], expected_mate_in=puzzle["mate_in"],
+                   expected_move=puzzle["solution"][0])
+        if result["status"] == "mate":
+            # Other first moves that mate as fast are accepted as well
+            row["alternatives"] = [
+                move.uci() for move in board.legal_moves()
+                if move.uci() != puzzle["solution"][0]
+                and check_mating_move(board, move.uci(), result["mate_in"], max_nodes, time_limit)["status"] == "mate"
+            ]
+        if engine:
+            row["engine_time"] = _engine_time_to_mate(puzzle["fen"], puzzle["mate_in"], 10 * time_limit)
+        rows.append(row)
+    return rows
+
+# -------------------------
+# CLI
+# -------------------------
+def _print_validation(rows: List[Dict], engine: bool) -> bool:
+    header = f"{'puzzle':<8} {'mate':>4} {'found':>5} {'nodes':>8} {'ms':>8}  {'line':<6} alternatives"
+    print(header + ("  engine" if engine else ""))
+    ok = True
+    for row in rows:
+        found = row["mate_in"] if row["status"] == "mate" else row["status"]
+        ok &= row["status"] == "mate" and row["mate_in"] <= row["expected_mate_in"]
+        line = (f"{row['puzzle_id']:<8} {row['expected_mate_in']:>4} {found!s:>5} {row['nodes']:>8} "
+                f"{row['time'] * 1000:>8.1f}  {row['expected_move']:<6} {' '.join(row.get('alternatives', [])) or '-'}")
+        if engine:
+            line += f"  {row['engine_time']:.3f}s" if row["engine_time"] is not None else "  not found"
+        print(line)
+    solved = sum(row["status"] == "mate" for row in rows)
+    print(f"{solved}/{len(rows)} proven, {sum(row['nodes'] for row in rows)} nodes, "
+          f"{sum(row['time'] for row in rows):.2f} s")
+    return ok
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def budget(p):
+        p.add_argument("--nodes", type=int, default=MATE_NODE_BUDGET, help="Node budget per position")
+        p.add_argument("--time", type=float, default=MATE_TIME_LIMIT, help="Time budget per position (s)")
+
+    p = sub.add_parser("solve", help="Shortest forced mate from one position")
+    p.add_argument("fen")
+    p.add_argument("--moves", type=int, default=3, help="Longest mate to look for")
+    budget(p)
+
+    p = sub.add_parser("validate", help="Check every mating puzzle of the puzzle set")
+    p.add_argument("--csv", default="data/chess_puzzle.csv")
+    p.add_argument("--engine", action="store_true", help="Also time negamax on each puzzle")
+    budget(p)
+
+    args = parser.parse_args(argv)
+    if args.command == "solve":
+        result = solve_mate(bulletchess.Board.from_fen(args.fen), args.moves, args.nodes, args.time)
+        print(f"status:  {result['status']}")
+        if result["mate_in"]:
+            print(f"mate in: {result['mate_in']}")
+            print(f"pv:      {' '.join(result['pv'])}")
+        print(f"nodes:   {result['nodes']}")
+        print(f"time:    {result['time']:.3f} s")
+    elif args.command == "validate":
+        if not _print_validation(validate_puzzles(args.csv, args.nodes, args.time, args.engine), args.engine):
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,503 @@
+"""
+Micro-benchmarks for engine internals.
+
+Usage (from the Backend directory):
+    python microbench.py smp [--max-threads N] [--time-limit S]
+    python microbench.py zobrist
+    python microbench.py movepick [--depth D]
+    python microbench.py see
+    python microbench.py nps [--depth D]
+    python microbench.py timeman [--time-limit S]
+    python microbench.py multipv [--depth D] [--lines K]
+    python microbench.py status [--depth D]
+    python microbench.py eval
+    python microbench.py eval-terms
+
+Each subcommand prints a small table; numbers are only comparable between
+runs on the same machine. Correctness checks live in tests/ (python -m pytest tests).
+"""
+import argparse
+import time
+from typing import Callable, Dict, List
+import bulletchess
+
+# Middlegame positions with plenty of play, used by several benchmarks
+BENCH_FENS = [
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP1QBPPP/R3KB1R w KQ - 0 8",
+    "r2q1rk1/1b1nbppp/p2ppn2/1p6/3NP3/1BN1BP2/PPPQ2PP/2KR3R w - - 0 12",
+    "2r2rk1/pp1bqppp/2n1pn2/3p4/3P4/2PBPN2/P1Q2PPP/R1B2RK1 w - - 0 13",
+]
+# Positions with one obvious move (recapture, forced mate, lone king defence)
+EASY_FENS = [
+    "rnbqkbnr/ppp2ppp/8/3pp3/4P3/5Q2/PPPP1PPP/RNB1KBNR b KQkq - 1 3",
+    "4k3/8/8/8/8/8/3q4/R3K3 w Q - 0 1",
+    "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1",
+]
+
+# -------------------------
+# Lazy SMP scaling
+# -------------------------
+def bench_smp(max_threads: int, time_limit: float) -> List[Dict]:
+    from chess_engine import SearchContext, get_best_move_and_eval
+    import smp
+
+    rows = []
+    for threads in range(1, max_threads + 1):
+        depths, nodes, elapsed = [], 0, 0.0
+        for fen in BENCH_FENS:
+            ctx = SearchContext()
+            board = bulletchess.Board.from_fen(fen)
+            if threads > 1:
+                smp.get_lazy_smp().tt.clear()
+            start = time.perf_counter()
+            get_best_move_and_eval(board, time_limit=time_limit, ctx=ctx, threads=threads)
+            elapsed += time.perf_counter() - start
+            depths.append(ctx.depth_reached)
+            nodes += ctx.nodes_searched
+        rows.append({
+            "threads": threads,
+            "avg_depth": sum(depths) / len(depths),
+            "nodes": nodes,
+            "nps": nodes / elapsed if elapsed else 0.0,
+        })
+    return rows
+
+def _print_smp(rows: List[Dict]):
+    base_nps = rows[0]["nps"] or 1.0
+    print(f"{'threads':>7} {'avg depth':>9} {'nodes':>10} {'nps':>10} {'speedup':>7}")
+    for row in rows:
+        print(f"{row['threads']:>7} {row['avg_depth']:>9.2f} {row['nodes']:>10} "
+              f"{row['nps']:>10.0f} {row['nps'] / base_nps:>6.2f}x")
+
+# -------------------------
+# Position hashing
+# -------------------------
+def _timed(fn: Callable[[], None], repeat: int) -> float:
+    """Best-of-three wall time of `repeat` calls, in seconds per call."""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return best / repeat
+
+def bench_zobrist(repeat: int = 200) -> Dict[str, float]:
+    """
+    Hashing cost per node: hash(board) on every child (the old simple_hash)
+    versus the incremental Zobrist update done while making the move.
+    """
+    from chess_engine import SearchContext
+
+    boards = [bulletchess.Board.from_fen(fen) for fen in BENCH_FENS]
+    ctx = SearchContext(tt_size_mb=1)
+
+    def apply_undo():
+        for board in boards:
+            for move in board.legal_moves():
+                board.apply(move)
+                board.undo()
+
+    def full_hash():
+        for board in boards:
+            for move in board.legal_moves():
+                board.apply(move)
+                hash(board)
+                board.undo()
+
+    def incremental():
+        for board in boards:
+            ctx.set_root(board)
+            for move in board.legal_moves():
+                ctx.make_move(board, move)
+                ctx.unmake_move(board)
+
+    nodes = sum(len(list(board.legal_moves())) for board in boards)
+    base = _timed(apply_undo, repeat)
+    return {
+        "nodes": nodes,
+        "hash_ns": (_timed(full_hash, repeat) - base) / nodes * 1e9,
+        "zobrist_ns": (_timed(incremental, repeat) - base) / nodes * 1e9,
+    }
+
+def _print_zobrist(result: Dict[str, float]):
+    print(f"children per round: {result['nodes']}")
+    print(f"hash(board) per node:          {result['hash_ns']:8.0f} ns")
+    print(f"incremental Zobrist per node:  {result['zobrist_ns']:8.0f} ns")
+
+# -------------------------
+# Staged move ordering
+# -------------------------
+def bench_movepick(depth: int) -> Dict[str, float]:
+    """Moves scored per node by the staged picker vs. moves generated there."""
+    from chess_engine import SearchContext, get_best_move_and_eval
+
+    nodes = generated = scored = 0
+    start = time.perf_counter()
+    for fen in BENCH_FENS:
+        ctx = SearchContext(tt_size_mb=16)
+        get_best_move_and_eval(bulletchess.Board.from_fen(fen), time_limit=float("inf"),
+                               max_depth=depth, ctx=ctx)
+        nodes += ctx.picker_nodes
+        generated += ctx.moves_generated
+        scored += ctx.moves_scored
+    return {
+        "nodes": nodes,
+        "generated_per_node": generated / nodes,
+        "scored_per_node": scored / nodes,
+        "time": time.perf_counter() - start,
+    }
+
+def _print_movepick(result: Dict[str, float]):
+    saved = 1 - result["scored_per_node"] / result["generated_per_node"]
+    print(f"nodes ordering moves:   {result['nodes']}")
+    print(f"legal moves per node:   {result['generated_per_node']:.1f} (all scored before)")
+    print(f"moves scored per node:  {result['scored_per_node']:.1f} ({saved:.0%} not scored)")
+    print(f"time:                   {result['time']:.2f} s")
+
+# -------------------------
+# Static exchange evaluation
+# -------------------------
+def bench_see(repeat: int = 200) -> Dict[str, float]:
+    """Per-call cost of see(), see_ge() and MVV-LVA on every capture of BENCH_FENS."""
+    from chess_engine import mvv_lva_score
+    from see import see, see_ge
+
+    pairs = []
+    for fen in BENCH_FENS:
+        board = bulletchess.Board.from_fen(fen)
+        pairs += [(board, move) for move in board.legal_moves() if move.is_capture(board)]
+
+    def run(fn):
+        return _timed(lambda: [fn(board, move) for board, move in pairs], repeat) / len(pairs) * 1e6
+
+    return {
+        "captures": len(pairs),
+        "mvv_lva_us": run(mvv_lva_score),
+        "see_us": run(see),
+        "see_ge_us": run(lambda board, move: see_ge(board, move, 0)),
+    }
+
+def _print_see(result: Dict[str, float]):
+    print(f"captures timed:     {result['captures']}")
+    print(f"mvv_lva per call:   {result['mvv_lva_us']:6.2f} us")
+    print(f"see per call:       {result['see_us']:6.2f} us")
+    print(f"see_ge per call:    {result['see_ge_us']:6.2f} us")
+
+# -------------------------
+# Search speed
+# -------------------------
+def bench_nps(depth: int) -> Dict[str, float]:
+    """Fixed-depth search of BENCH_FENS from a fresh context each."""
+    from chess_engine import SearchContext, get_best_move_and_eval
+
+    nodes, elapsed = 0, 0.0
+    for fen in BENCH_FENS:
+        ctx = SearchContext(tt_size_mb=16)
+        board = bulletchess.Board.from_fen(fen)
+        start = time.perf_counter()
+        get_best_move_and_eval(board, time_limit=float("inf"), max_depth=depth, ctx=ctx)
+        elapsed += time.perf_counter() - start
+        nodes += ctx.nodes_searched
+    return {"nodes": nodes, "time": elapsed, "nps": nodes / elapsed if elapsed else 0.0}
+
+def _print_nps(result: Dict[str, float]):
+    print(f"nodes: {result['nodes']}")
+    print(f"time:  {result['time']:.2f} s")
+    print(f"nps:   {result['nps']:.0f}")
+
+# -------------------------
+# Time management
+# -------------------------
+def bench_timeman(time_limit: float) -> List[Dict]:
+    """Time used, depth reached and why the search stopped, per position."""
+    from chess_engine import SearchContext, get_best_move_and_eval
+
+    rows = []
+    for fen in BENCH_FENS + EASY_FENS:
+        ctx = SearchContext(tt_size_mb=16)
+        start = time.perf_counter()
+        move, score = get_best_move_and_eval(bulletchess.Board.from_fen(fen), time_limit=time_limit, ctx=ctx)
+        rows.append({
+            "fen": fen,
+            "move": move,
+            "score": score,
+            "depth": ctx.depth_reached,
+            "time": time.perf_counter() - start,
+            "reason": ctx.time_manager.stop_reason or "max_depth",
+        })
+    return rows
+
+def _print_timeman(rows: List[Dict], time_limit: float):
+    print(f"{'time':>6} {'depth':>5} {'move':>6} {'reason':<22} fen")
+    for row in rows:
+        print(f"{row['time']:>6.2f} {row['depth']:>5} {row['move'] or '-':>6} {row['reason']:<22} {row['fen']}")
+    total = sum(row["time"] for row in rows)
+    print(f"total {total:.2f} s of {time_limit * len(rows):.2f} s budget")
+
+# -------------------------
+# Multi-PV
+# -------------------------
+def bench_multipv(depth: int, num_pv: int) -> Dict[str, float]:
+    """
+    Cost of ranking the top `num_pv` moves of BENCH_FENS with one Multi-PV
+    search against separate searches: one for the best move, then one per
+    other line, each of the position after that line's move at depth - 1.
+    The separate searches get the candidate moves for free, which flatters them.
+    """
+    from chess_engine import SearchContext, analyze_position, get_best_move_and_eval
+
+    result = {"multipv_nodes": 0, "multipv_time": 0.0, "separate_nodes": 0, "separate_time": 0.0}
+    for fen in BENCH_FENS:
+        board = bulletchess.Board.from_fen(fen)
+        ctx = SearchContext(tt_size_mb=16)
+        start = time.perf_counter()
+        analysis = analyze_position(board, num_pv, time_limit=float("inf"), max_depth=depth, ctx=ctx)
+        result["multipv_time"] += time.perf_counter() - start
+        result["multipv_nodes"] += analysis["nodes"]
+
+        ctx = SearchContext(tt_size_mb=16)
+        start = time.perf_counter()
+        get_best_move_and_eval(board, time_limit=float("inf"), max_depth=depth, ctx=ctx)
+        nodes = ctx.nodes_searched
+        for line in analysis["lines"][1:]:
+            ctx = SearchContext(tt_size_mb=16)
+            board.apply(bulletchess.Move.from_uci(line["move"]))
+            get_best_move_and_eval(board, time_limit=float("inf"), max_depth=depth - 1, ctx=ctx)
+            board.undo()
+            nodes += ctx.nodes_searched
+        result["separate_time"] += time.perf_counter() - start
+        result["separate_nodes"] += nodes
+    return result
+
+def _print_multipv(result: Dict[str, float], num_pv: int):
+    print(f"{'':<14} {'nodes':>9} {'time':>8}")
+    print(f"{'multi-pv':<14} {result['multipv_nodes']:>9} {result['multipv_time']:>7.2f}s")
+    print(f"{f'{num_pv} searches':<14} {result['separate_nodes']:>9} {result['separate_time']:>7.2f}s")
+    if result["multipv_time"]:
+        print(f"speedup: {result['separate_time'] / result['multipv_time']:.2f}x")
+
+# -------------------------
+# Game status checks
+# -------------------------
+def bench_status(depth: int, repeat: int = 200) -> Dict[str, float]:
+    """
+    Per-node cost of detecting game ends: bulletchess's `state in CHECKMATE
+    or state in DRAW` (what every node used to run) against the draw-rule
+    tests plus the in-check test that replaced it, on the children of BENCH_FENS
+    after a few reversible moves of game history. The share of search time
+    uses the node time of a fixed-depth search.
+    """
+    import random
+    from bulletchess import CHECK, CHECKMATE, DRAW, INSUFFICIENT_MATERIAL
+    from chess_engine import SearchContext, is_draw_by_rule
+
+    rng = random.Random(7)
+    boards = []
+    for fen in BENCH_FENS:
+        board = bulletchess.Board.from_fen(fen)
+        for _ in range(12):
+            quiet = [m for m in board.legal_moves()
+                     if not m.is_capture(board) and board[m.origin].piece_type != bulletchess.PAWN]
+            if not quiet:
+                break
+            board.apply(rng.choice(quiet))
+        boards.append(board)
+    contexts = [SearchContext(tt_size_mb=1) for _ in boards]
+    for ctx, board in zip(contexts, boards):
+        ctx.set_root(board)
+
+    def walk(check):
+        for ctx, board in zip(contexts, boards):
+            for move in board.legal_moves():
+                ctx.make_move(board, move)
+                check(ctx, board)
+                ctx.unmake_move(board)
+
+    def old(ctx, board):
+        return board in CHECKMATE or board in DRAW
+
+    def new(ctx, board):
+        # As inlined in negamax/quiescence, plus quiescence's in-check test
+        return (board in INSUFFICIENT_MATERIAL or (board.halfmove_clock >= 4 and is_draw_by_rule(ctx, board))
+                or board in CHECK)
+
+    nodes = sum(len(board.legal_moves()) for board in boards)
+    base = _timed(lambda: walk(lambda ctx, board: None), repeat)
+    node_ns = 1e9 / bench_nps(depth)["nps"]
+    old_ns = (_timed(lambda: walk(old), repeat) - base) / nodes * 1e9
+    new_ns = (_timed(lambda: walk(new), repeat) - base) / nodes * 1e9
+    return {"nodes": nodes, "node_ns": node_ns, "old_ns": old_ns, "new_ns": new_ns}
+
+def _print_status(result: Dict[str, float]):
+    print(f"children per round: {result['nodes']}")
+    print(f"search time per node:            {result['node_ns']:8.0f} ns")
+    for label, key in (("CHECKMATE/DRAW status", "old_ns"), ("key stack + in-check", "new_ns")):
+        share = result[key] / result["node_ns"] * 100
+        print(f"{label + ' per node:':<33}{result[key]:8.0f} ns  ({share:.1f}% of search time)")
+
+# -------------------------
+# Incremental evaluation
+# -------------------------
+def bench_eval(repeat: int = 100) -> Dict[str, float]:
+    """
+    Evaluations per second on the children of BENCH_FENS: evaluate_position
+    summing material + PST over the board versus reading the search's
+    incremental sums, then also taking pawn terms from the pawn hash, and
+    finally a hit in the eval cache (every child is cached after the first
+    round); plus what keeping the sums costs per make_move.
+    """
+    from chess_engine import SearchContext, evaluate, probe_pawns
+    from eval import evaluate_position, update_psqt
+
+    boards = [bulletchess.Board.from_fen(fen) for fen in BENCH_FENS]
+    contexts = [SearchContext(tt_size_mb=1) for _ in boards]
+    for ctx, board in zip(contexts, boards):
+        ctx.set_root(board)
+
+    def walk(evaluate):
+        for ctx, board in zip(contexts, boards):
+            for move in board.legal_moves():
+                ctx.make_move(board, move)
+                evaluate(ctx, board)
+                ctx.unmake_move(board)
+
+    def updates():
+        for ctx, board in zip(contexts, boards):
+            for move in board.legal_moves():
+                update_psqt(ctx.psqt, ctx.mailbox, move)
+
+    def moves_only():
+        for board in boards:
+            for move in board.legal_moves():
+                pass
+
+    nodes = sum(len(board.legal_moves()) for board in boards)
+    base = _timed(lambda: walk(lambda ctx, board: None), repeat)
+    full = (_timed(lambda: walk(lambda ctx, board: evaluate_position(board, ctx.mailbox)), repeat) - base) / nodes
+    incremental = (_timed(lambda: walk(lambda ctx, board: evaluate_position(board, ctx.mailbox, ctx.psqt)),
+                          repeat) - base) / nodes
+    pawns = (_timed(lambda: walk(lambda ctx, board: evaluate_position(board, ctx.mailbox, ctx.psqt,
+                                                                     probe_pawns(ctx, board))),
+                    repeat) - base) / nodes
+    cached = (_timed(lambda: walk(evaluate), repeat) - base) / nodes
+    update = (_timed(updates, repeat) - _timed(moves_only, repeat)) / nodes
+    return {"nodes": nodes, "full_eps": 1 / full, "incremental_eps": 1 / incremental,
+            "pawns_eps": 1 / pawns, "cached_eps": 1 / cached, "update_ns": update * 1e9}
+
+def _print_eval(result: Dict[str, float]):
+    print(f"children per round: {result['nodes']}")
+    print(f"full material/PST scan:      {result['full_eps']:10.0f} evals/s")
+    print(f"incremental material/PST:    {result['incremental_eps']:10.0f} evals/s"
+          f"  ({result['incremental_eps'] / result['full_eps']:.2f}x)")
+    print(f"incremental + pawn hash:     {result['pawns_eps']:10.0f} evals/s"
+          f"  ({result['pawns_eps'] / result['full_eps']:.2f}x)")
+    print(f"eval cache hit:              {result['cached_eps']:10.0f} evals/s"
+          f"  ({result['cached_eps'] / result['full_eps']:.2f}x)")
+    print(f"accumulator update per move: {result['update_ns']:10.0f} ns")
+
+# -------------------------
+# Evaluation terms
+# -------------------------
+def bench_eval_terms(repeat: int = 20) -> List[Dict]:
+    """
+    Per-call cost of each eval term on BENCH_FENS, EASY_FENS and their
+    children. Pawn structure and mailbox are precomputed, as the search
+    passes them in.
+    """
+    from bulletchess import BLACK, PAWN, WHITE
+    import eval as ev
+
+    boards = []
+    for fen in BENCH_FENS + EASY_FENS:
+        board = bulletchess.Board.from_fen(fen)
+        boards.append(board)
+        for move in board.legal_moves():
+            child = board.copy()
+            child.apply(move)
+            boards.append(child)
+    positions = [(board, ev.pawn_structure(board)) for board in boards]
+
+    # name -> term, called with (board, pawns)
+    terms = {
+        "count_bits": lambda b, p: ev.count_bits(b[WHITE, PAWN]),
+        "king safety": lambda b, p: ev.king_safety(b, WHITE, 0.2) + ev.king_safety(b, BLACK, 0.2),
+        "pawn structure": lambda b, p: ev.pawn_structure(b),
+        "mop-up": lambda b, p: ev.mop_up_eval(b, 1.0),
+        "minor pieces": lambda b, p: (ev.piece_mobility(b, WHITE) - ev.piece_mobility(b, BLACK)
+                                      + ev.piece_development(b, 0.2)),
+        "center pawns": lambda b, p: ev.center_control(b),
+        "rook files": lambda b, p: ev.rook_on_open_file(b, WHITE, p) + ev.rook_on_open_file(b, BLACK, p),
+    }
+    rows = []
+    for name, term in terms.items():
+        seconds = _timed(lambda: [term(*position) for position in positions], repeat) / len(positions)
+        rows.append({"term": name, "ns": seconds * 1e9})
+    return rows
+
+def _print_eval_terms(rows: List[Dict]):
+    print(f"{'term':<15} {'per call':>9}")
+    for row in rows:
+        print(f"{row['term']:<15} {row['ns']:>7.0f}ns")
+
+# -------------------------
+# CLI
+# -------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("smp", help="Depth and NPS scaling of Lazy SMP from 1 to N processes")
+    p.add_argument("--max-threads", type=int, default=None)
+    p.add_argument("--time-limit", type=float, default=5.0)
+
+    sub.add_parser("zobrist", help="Hashing cost per node: hash(board) vs incremental Zobrist")
+
+    p = sub.add_parser("movepick", help="Moves scored per node by the staged move picker")
+    p.add_argument("--depth", type=int, default=4)
+
+    sub.add_parser("see", help="Time see()/see_ge() against MVV-LVA on every capture")
+
+    p = sub.add_parser("nps", help="Nodes per second of a fixed-depth search over BENCH_FENS")
+    p.add_argument("--depth", type=int, default=5)
+
+    p = sub.add_parser("timeman", help="Time used and stop reason of timed searches")
+    p.add_argument("--time-limit", type=float, default=5.0)
+
+    p = sub.add_parser("multipv", help="One Multi-PV search vs separate searches for the top K moves")
+    p.add_argument("--depth", type=int, default=5)
+    p.add_argument("--lines", type=int, default=3)
+
+    p = sub.add_parser("status", help="Cost of game-end detection per node, old vs key stack")
+    p.add_argument("--depth", type=int, default=4)
+
+    sub.add_parser("eval-terms", help="Per-call cost of each eval term")
+
+    sub.add_parser("eval", help="Evaluations per second: full scan, incremental sums, pawn hash, eval cache")
+
+    args = parser.parse_args()
+    if args.command == "smp":
+        from smp import MAX_SEARCH_THREADS
+        _print_smp(bench_smp(args.max_threads or MAX_SEARCH_THREADS, args.time_limit))
+    elif args.command == "zobrist":
+        _print_zobrist(bench_zobrist())
+    elif args.command == "movepick":
+        _print_movepick(bench_movepick(args.depth))
+    elif args.command == "see":
+        _print_see(bench_see())
+    elif args.command == "nps":
+        _print_nps(bench_nps(args.depth))
+    elif args.command == "timeman":
+        _print_timeman(bench_timeman(args.time_limit), args.time_limit)
+    elif args.command == "multipv":
+        _print_multipv(bench_multipv(args.depth, args.lines), args.lines)
+    elif args.command == "status":
+        _print_status(bench_status(args.depth))
+    elif args.command == "eval":
+        _print_eval(bench_eval())
+    elif args.command == "eval-terms":
+        _print_eval_terms(bench_eval_terms())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Pawn hash table for the evaluation.
+
+Passed and isolated pawns, central pawns and the files holding pawns
+(eval.PawnStructure) depend on the pawns alone, and most moves in a search
+do not move or capture a pawn. The search looks these terms up by the pawn
+key (zobrist.py) and only computes them for pawn structures it has not seen.
+
+The table is direct-mapped with a fixed number of slots, so it never grows:
+a new structure replaces whatever was in its slot. Each slot keeps the full
+pawn key, so two structures sharing a slot are never confused.
+"""
+from typing import List, Optional
+from eval import PawnStructure
+
+PAWN_HASH_ENTRIES = 1 << 14  # Slots per table; a few MB of cached structures at most
+
+EMPTY_KEY = -1  # Pawn keys are unsigned, so no real key matches an empty slot
+
+
+class PawnHashTable:
+    def __init__(self, entries: int = PAWN_HASH_ENTRIES):
+        size = 1 << max(0, entries - 1).bit_length()  # Round up to a power of two
+        self.mask = size - 1
+        self.keys: List[int] = [EMPTY_KEY] * size
+        self.entries: List[Optional[PawnStructure]] = [None] * size
+
+    def probe(self, pawn_key: int) -> Optional[PawnStructure]:
+        index = pawn_key & self.mask
+        if self.keys[index] == pawn_key:
+            return self.entries[index]
+        return None
+
+    def store(self, pawn_key: int, entry: PawnStructure):
+        index = pawn_key & self.mask
+        self.keys[index] = pawn_key
+        self.entries[index] = entry
+
+    def clear(self):
+        size = self.mask + 1
+        self.keys = [EMPTY_KEY] * size
+        self.entries = [None] * size
@@ -0,0 +1,197 @@
+"""
+Perft: count the leaf nodes of the legal move tree to a fixed depth.
+
+Checks move generation against known node counts and measures how fast the
+board operations the search is built on run from Python: legal_moves(),
+apply() and undo(), optionally through SearchContext.make_move/unmake_move
+(Zobrist keys and mailbox included) exactly as negamax uses them.
+
+Usage (from the Backend directory):
+    python perft.py run DEPTH [--fen FEN] [--workers N] [--full] [--engine]
+    python perft.py divide DEPTH [--fen FEN] [--full] [--engine]
+    python perft.py suite [--max-nodes N] [--full] [--engine]
+
+Counting is in bulk by default: at depth 1 the legal moves are counted
+instead of played. --full plays and takes back every leaf move too, which
+is what the search does. --workers splits the root moves over processes.
+"""
+import argparse
+import multiprocessing as mp
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+import bulletchess
+from bulletchess.utils import perft as native_perft
+
+STARTPOS = bulletchess.Board().fen()
+
+# (name, FEN, known node counts for depth 1, 2, ...)
+PERFT_POSITIONS: List[Tuple[str, str, List[int]]] = [
+    ("startpos", STARTPOS,
+     [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603]),
+    ("rook endgame", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     [14, 191, 2812, 43238, 674624]),
+    ("promotions", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333]),
+    ("discovered check", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     [44, 1486, 62379, 2103487]),
+    ("middlegame", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+# -------------------------
+# Counting
+# -------------------------
+def perft(board: bulletchess.Board, depth: int, bulk: bool = True) -> int:
+    """Leaf nodes `depth` plies below `board`, using apply/undo."""
+    if depth == 0:
+        return 1
+    moves = board.legal_moves()
+    if depth == 1 and bulk:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        board.apply(move)
+        nodes += perft(board, depth - 1, bulk)
+        board.undo()
+    return nodes
+
+def perft_engine(ctx, board: bulletchess.Board, depth: int, bulk: bool = True) -> int:
+    """Like perft(), but through ctx.make_move/unmake_move (ctx.set_root must have been called)."""
+    if depth == 0:
+        return 1
+    moves = board.legal_moves()
+    if depth == 1 and bulk:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        ctx.make_move(board, move)
+        nodes += perft_engine(ctx, board, depth - 1, bulk)
+        ctx.unmake_move(board)
+    return nodes
+
+def _count(board: bulletchess.Board, depth: int, bulk: bool, engine: bool) -> int:
+    if not engine:
+        return perft(board, depth, bulk)
+    from chess_engine import SearchContext
+    ctx = SearchContext(tt_size_mb=1)
+    ctx.set_root(board)
+    return perft_engine(ctx, board, depth, bulk)
+
+def divide(board: bulletchess.Board, depth: int, bulk: bool = True, engine: bool = False) -> Dict[str, int]:
+    """Leaf nodes below each root move (depth >= 1), for diffing against another engine."""
+    result = {}
+    for move in board.legal_moves():
+        board.apply(move)
+        result[move.uci()] = _count(board, depth - 1, bulk, engine)
+        board.undo()
+    return result
+
+def _split_task(args: Tuple[str, str, int, bool, bool]) -> int:
+    fen, uci, depth, bulk, engine = args
+    board = bulletchess.Board.from_fen(fen)
+    board.apply(bulletchess.Move.from_uci(uci))
+    return _count(board, depth - 1, bulk, engine)
+
+def split_perft(fen: str, depth: int, workers: int, bulk: bool = True, engine: bool = False) -> int:
+    """perft with the root moves spread over `workers` processes."""
+    board = bulletchess.Board.from_fen(fen)
+    if depth <= 1:
+        return _count(board, depth, bulk, engine)
+    tasks = [(fen, move.uci(), depth, bulk, engine) for move in board.legal_moves()]
+    with mp.get_context("spawn").Pool(workers) as pool:
+        return sum(pool.imap_unordered(_split_task, tasks))
+
+def timed_perft(fen: str, depth: int, workers: int = 1, bulk: bool = True,
+                engine: bool = False) -> Dict[str, float]:
+    """Nodes, seconds and nodes per second of one perft run."""
+    start = time.perf_counter()
+    if workers > 1:
+        nodes = split_perft(fen, depth, workers, bulk, engine)
+    else:
+        nodes = _count(bulletchess.Board.from_fen(fen), depth, bulk, engine)
+    elapsed = time.perf_counter() - start
+    return {"nodes": nodes, "time": elapsed, "nps": nodes / elapsed if elapsed else 0.0}
+
+def run_suite(max_nodes: int, bulk: bool = True, engine: bool = False) -> List[Dict]:
+    """
+    Every PERFT_POSITIONS entry at the deepest depth whose known count is at
+    most `max_nodes`, compared against the known count and timed against
+    bulletchess's native perft.
+    """
+    rows = []
+    for name, fen, counts in PERFT_POSITIONS:
+        depth = max([d for d, n in enumerate(counts, 1) if n <= max_nodes] or [1])
+        result = timed_perft(fen, depth, bulk=bulk, engine=engine)
+        start = time.perf_counter()
+        native_perft(bulletchess.Board.from_fen(fen), depth)
+        native_time = time.perf_counter() - start
+        rows.append(dict(result, name=name, depth=depth, expected=counts[depth - 1],
+                         native_nps=counts[depth - 1] / native_time if native_time else 0.0))
+    return rows
+
+# -------------------------
+# CLI
+# -------------------------
+def _print_result(result: Dict[str, float]):
+    print(f"nodes: {result['nodes']}")
+    print(f"time:  {result['time']:.2f} s")
+    print(f"nps:   {result['nps']:.0f}")
+
+def _print_suite(rows: List[Dict]) -> bool:
+    print(f"{'position':<17} {'depth':>5} {'nodes':>9} {'nps':>9} {'native nps':>11}  result")
+    ok = True
+    for row in rows:
+        passed = row["nodes"] == row["expected"]
+        ok &= passed
+        status = "ok" if passed else f"FAIL (expected {row['expected']})"
+        print(f"{row['name']:<17} {row['depth']:>5} {row['nodes']:>9} {row['nps']:>9.0f} "
+              f"{row['native_nps']:>11.0f}  {status}")
+    nodes = sum(row["nodes"] for row in rows)
+    elapsed = sum(row["time"] for row in rows)
+    print(f"total {nodes} nodes in {elapsed:.2f} s, {nodes / elapsed if elapsed else 0:.0f} nps")
+    return ok
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def common(p):
+        p.add_argument("--full", action="store_true", help="Play leaf moves instead of counting them in bulk")
+        p.add_argument("--engine", action="store_true", help="Use SearchContext.make_move/unmake_move")
+
+    p = sub.add_parser("run", help="Count and time one position")
+    p.add_argument("depth", type=int)
+    p.add_argument("--fen", default=STARTPOS)
+    p.add_argument("--workers", type=int, default=1, help="Split the root moves over this many processes")
+    common(p)
+
+    p = sub.add_parser("divide", help="Node count per root move")
+    p.add_argument("depth", type=int)
+    p.add_argument("--fen", default=STARTPOS)
+    common(p)
+
+    p = sub.add_parser("suite", help="Standard positions against their known counts")
+    p.add_argument("--max-nodes", type=int, default=200000, help="Deepest known count to run per position")
+    common(p)
+
+    args = parser.parse_args(argv)
+    if args.command in ("run", "divide") and args.depth < 1:
+        parser.error("depth must be at least 1")
+    bulk = not args.full
+    if args.command == "run":
+        _print_result(timed_perft(args.fen, args.depth, args.workers, bulk, args.engine))
+    elif args.command == "divide":
+        counts = divide(bulletchess.Board.from_fen(args.fen), args.depth, bulk, args.engine)
+        for uci, nodes in sorted(counts.items()):
+            print(f"{uci}: {nodes}")
+        print(f"\nmoves: {len(counts)}")
+        print(f"nodes: {sum(counts.values())}")
+    elif args.command == "suite":
+        if not _print_suite(run_suite(args.max_nodes, bulk, args.engine)):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,10 @@ import random
 import xml.etree.ElementTree as ET
 from typing import Dict, List, Optional, Tuple
 import bulletchess
+from mate_solver import check_mating_move
+
+# Seconds the mate solver may spend on a move while the player waits for the answer
+ALTERNATIVE_MATE_TIME_LIMIT = 0.5
 
 # Load puzzles at startup
 puzzles_df = None
@@ -148,7 +152,8 @@ class PuzzleSession:
         self.puzzle_id = puzzle_data['puzzle_id']
         self.initial_fen = puzzle_data['fen']
         self.board = bulletchess.Board.from_fen(puzzle_data['fen'])
-        self.solution_moves = puzzle_data['moves']
+        self.solution_moves = list(puzzle_data['moves'])
+        self.original_moves = list(puzzle_data['moves'])
         self.rating = puzzle_data['rating']
         self.themes = puzzle_data.get('themes', '')
         self.theme_description = puzzle_data.get('theme_description', '')
@@ -167,7 +172,32 @@ class PuzzleSession:
             
         self.completed = False
         self.failed = False
+        # Mating puzzles also accept any other move that still forces mate in time
+        self.mate_puzzle = self._line_ends_in_mate()
     
+    def _line_ends_in_mate(self) -> bool:
+        board = bulletchess.Board.from_fen(self.initial_fen)
+        try:
+            for uci in self.solution_moves:
+                board.apply(bulletchess.Move.from_uci(uci))
+        except Exception:
+            return False
+        return board in bulletchess.CHECKMATE
+
+    def _accept_alternative_mate(self, move_uci: str) -> bool:
+        """
+        If `move_uci` still forces mate within the player's remaining moves,
+        replace the rest of the solution with a mating line that starts with it.
+        """
+        if not self.mate_puzzle:
+            return False
+        moves_left = len(range(self.current_move_index, len(self.solution_moves), 2))
+        result = check_mating_move(self.board, move_uci, moves_left, time_limit=ALTERNATIVE_MATE_TIME_LIMIT)
+        if result['status'] != 'mate':
+            return False
+        self.solution_moves = self.solution_moves[:self.current_move_index] + [move_uci] + result['pv']
+        return True
+
     def get_current_fen(self) -> str:
         """Get current board position."""
         return self.board.fen()
@@ -195,7 +225,7 @@ class PuzzleSession:
         expected_move = self.solution_moves[self.current_move_index]
         
         # Check if move is correct
-        if move_uci != expected_move:
+        if move_uci != expected_move and not self._accept_alternative_mate(move_uci):
             self.failed = True
             return {
                 'status': 'wrong',
@@ -280,6 +310,7 @@ class PuzzleSession:
     def reset(self):
         """Reset puzzle to initial position."""
         self.board = bulletchess.Board.from_fen(self.initial_fen)
+        self.solution_moves = list(self.original_moves)
         # Re-apply opponent's blunder
         if len(self.solution_moves) > 0:
             try:
@@ -0,0 +1,117 @@
+"""
+Search statistics.
+
+Every search fills a fresh SearchStats (ctx.stats). The search bumps plain
+int counters on it as it goes; at the end of each completed iteration the
+root loop records what that iteration added, so a search can be broken
+down by depth. Nodes and TT hits are taken from the context's own counters
+(ctx.nodes_searched, ctx.tt_hits) rather than counted twice.
+
+Counters:
+    qnodes                  quiescence nodes (included in nodes)
+    tt_probes / tt_cutoffs  TT lookups, and those whose score ended the node
+    beta_cutoffs            negamax nodes that failed high on a move...
+    first_move_cutoffs      ...on the first move searched (move ordering quality)
+    null_cutoffs            null-move prunes
+    futility_prunes         nodes cut by the futility margin
+    lmr_reductions          moves searched at reduced depth...
+    lmr_researches          ...and re-searched at full depth after beating alpha
+    aspiration_researches   root iterations re-searched with a full window
+    bitbase_hits            nodes scored exactly from the endgame bitbases
+    eval_probes / eval_hits static evals, and those answered by the eval cache
+    pawn_probes / pawn_hits evals computed, and those whose pawn terms came from the pawn hash
+    king_stage_skips        lazy evals that stopped before king safety/mop-up (eval.py)...
+    minor_stage_skips       ...or at least before the minor-piece terms
+    seldepth                deepest ply reached, quiescence included
+"""
+import time
+from typing import Any, Dict, List, Optional
+
+COUNTERS = (
+    "qnodes", "tt_probes", "tt_cutoffs", "beta_cutoffs", "first_move_cutoffs", "null_cutoffs",
+    "futility_prunes", "lmr_reductions", "lmr_researches", "aspiration_researches",
+    "bitbase_hits", "eval_probes", "eval_hits", "pawn_probes", "pawn_hits",
+    "king_stage_skips", "minor_stage_skips",
+)
+
+
+class SearchStats:
+    """Counters of one search plus a per-iteration breakdown."""
+
+    __slots__ = COUNTERS + ("seldepth", "iterations", "stop_reason", "nodes", "tt_hits", "time",
+                            "_start", "_iteration_start", "_totals_at_start")
+
+    def __init__(self):
+        for name in COUNTERS:
+            setattr(self, name, 0)
+        self.seldepth = 0
+        self.nodes = 0
+        self.tt_hits = 0
+        self.time = 0.0
+        self.stop_reason: Optional[str] = None
+        self.iterations: List[Dict[str, Any]] = []
+        self._start = time.monotonic()
+        self._iteration_start = self._start
+        self._totals_at_start = self._totals(0, 0)
+
+    def _totals(self, nodes: int, tt_hits: int) -> Dict[str, int]:
+        totals = {name: getattr(self, name) for name in COUNTERS}
+        totals["nodes"] = nodes
+        totals["tt_hits"] = tt_hits
+        return totals
+
+    def start_iteration(self, nodes: int, tt_hits: int):
+        self._iteration_start = time.monotonic()
+        self._totals_at_start = self._totals(nodes, tt_hits)
+        self.seldepth = 0
+
+    def end_iteration(self, depth: int, best_move: Optional[str], score: float, nodes: int, tt_hits: int):
+        """Record a completed iteration from the counters' growth since start_iteration."""
+        now = time.monotonic()
+        totals = self._totals(nodes, tt_hits)
+        row = {name: totals[name] - self._totals_at_start[name] for name in totals}
+        previous_nodes = self.iterations[-1]["nodes"] if self.iterations else 0
+        row.update(
+            depth=depth,
+            seldepth=self.seldepth,
+            best_move=best_move,
+            score=score,
+            time=now - self._iteration_start,
+            elapsed=now - self._start,
+            first_move_cutoff_rate=_ratio(row["first_move_cutoffs"], row["beta_cutoffs"]),
+            tt_hit_rate=_ratio(row["tt_hits"], row["tt_probes"]),
+            eval_hit_rate=_ratio(row["eval_hits"], row["eval_probes"]),
+            pawn_hit_rate=_ratio(row["pawn_hits"], row["pawn_probes"]),
+            ebf=_ratio(row["nodes"], previous_nodes),
+        )
+        self.iterations.append(row)
+
+    def finish(self, nodes: int, tt_hits: int, stop_reason: Optional[str]):
+        """Final totals, including the iteration that was aborted, if any."""
+        self.nodes = nodes
+        self.tt_hits = tt_hits
+        self.stop_reason = stop_reason
+        self.time = time.monotonic() - self._start
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready summary: totals over the whole search plus `iterations`."""
+        depth = self.iterations[-1]["depth"] if self.iterations else 0
+        result = {name: getattr(self, name) for name in COUNTERS}
+        result.update(
+            nodes=self.nodes,
+            tt_hits=self.tt_hits,
+            depth=depth,
+            seldepth=max([row["seldepth"] for row in self.iterations] + [self.seldepth]),
+            time=self.time,
+            first_move_cutoff_rate=_ratio(self.first_move_cutoffs, self.beta_cutoffs),
+            tt_hit_rate=_ratio(self.tt_hits, self.tt_probes),
+            eval_hit_rate=_ratio(self.eval_hits, self.eval_probes),
+            pawn_hit_rate=_ratio(self.pawn_hits, self.pawn_probes),
+            ebf=self.nodes ** (1 / depth) if depth else 0.0,
+            stop_reason=self.stop_reason,
+            iterations=self.iterations,
+        )
+        return result
+
+def _ratio(a: float, b: float) -> float:
+    return a / b if b else 0.0
@@ -0,0 +1,148 @@
+"""
+Static exchange evaluation.
+
+see(board, move) plays out every capture on the destination square of `move`,
+each side always recapturing with its least valuable attacker, and returns
+the material balance for the side making `move` when both sides stop at the
+best moment. Attackers are found with bitboards, so sliders lined up behind
+another attacker (x-rays: doubled rooks, queen behind bishop) join the
+exchange as soon as the piece in front of them has captured.
+
+Pins and checks are ignored, as usual for SEE. Both functions take the
+search's mailbox (see zobrist.py) when there is one, to look up the moving
+and captured pieces without asking the board.
+"""
+from typing import List, Optional
+import bulletchess
+from bulletchess import WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
+from bitboards import (
+    FULL, KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, bishop_attacks, rook_attacks,
+)
+
+SEE_VALUES = {
+    PAWN: 100,
+    KNIGHT: 320,
+    BISHOP: 330,
+    ROOK: 500,
+    QUEEN: 900,
+    KING: 20000,
+}
+# Attackers are tried in this order (least valuable first)
+SEE_ORDER = (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING)
+_ORDER_VALUES = [SEE_VALUES[ptype] for ptype in SEE_ORDER]
+PROMOTION_RANKS = 0xFF000000000000FF
+# Mailbox piece index -> value (white pawn..king, black pawn..king)
+_INDEX_VALUES = _ORDER_VALUES * 2
+_PAWN_INDICES = (0, 6)
+
+def _piece_boards(board: bulletchess.Board):
+    """Per-color lists of piece bitboards in SEE_ORDER."""
+    return ([int(board[WHITE, ptype]) for ptype in SEE_ORDER],
+            [int(board[BLACK, ptype]) for ptype in SEE_ORDER])
+
+def attackers_to(sq: int, occupied: int, white, black) -> int:
+    """All pieces of both colors attacking `sq` given the occupancy."""
+    diagonal = white[2] | white[4] | black[2] | black[4]
+    straight = white[3] | white[4] | black[3] | black[4]
+    return ((PAWN_ATTACKS[1][sq] & white[0])
+            | (PAWN_ATTACKS[0][sq] & black[0])
+            | (KNIGHT_ATTACKS[sq] & (white[1] | black[1]))
+            | (KING_ATTACKS[sq] & (white[5] | black[5]))
+            | (bishop_attacks(sq, occupied) & diagonal)
+            | (rook_attacks(sq, occupied) & straight))
+
+def _first_exchange(board: bulletchess.Board, move: bulletchess.Move,
+                    mailbox: Optional[List[int]]):
+    """
+    (material won by `move` itself, value of the piece left on the square,
+    whether the move is an en passant capture).
+    """
+    origin = move.origin.index()
+    dest = move.destination.index()
+    if mailbox is not None:
+        moving = mailbox[origin]
+        victim = mailbox[dest]
+        won = _INDEX_VALUES[victim] if victim >= 0 else 0
+        on_square = _INDEX_VALUES[moving]
+        is_pawn = moving in _PAWN_INDICES
+        empty = victim < 0
+    else:
+        piece = board[move.origin]
+        victim = board[move.destination]
+        won = SEE_VALUES[victim.piece_type] if victim is not None else 0
+        on_square = SEE_VALUES[piece.piece_type]
+        is_pawn = piece.piece_type == PAWN
+        empty = victim is None
+    en_passant = is_pawn and empty and (dest - origin) % 8 != 0
+    if en_passant:
+        won = SEE_VALUES[PAWN]
+    if move.promotion is not None:
+        won += SEE_VALUES[move.promotion] - SEE_VALUES[PAWN]
+        on_square = SEE_VALUES[move.promotion]
+    return won, on_square, en_passant
+
+def see(board: bulletchess.Board, move: bulletchess.Move,
+        mailbox: Optional[List[int]] = None) -> int:
+    """Material balance of the exchange started by `move`, in centipawns."""
+    origin = move.origin.index()
+    dest = move.destination.index()
+    gain0, on_square, en_passant = _first_exchange(board, move, mailbox)
+    gain = [gain0]
+
+    white, black = _piece_boards(board)
+    sides = (white, black) if board.turn == WHITE else (black, white)
+    occupied = ~int(board[None]) & FULL
+    occupied ^= 1 << origin
+    if en_passant:
+        occupied ^= 1 << (dest - 8 if board.turn == WHITE else dest + 8)
+
+    diagonal = white[2] | white[4] | black[2] | black[4]
+    straight = white[3] | white[4] | black[3] | black[4]
+    attackers = attackers_to(dest, occupied, white, black) & occupied
+    promotes = (1 << dest) & PROMOTION_RANKS
+
+    side = 1
+    while True:
+        boards = sides[side]
+        for i in range(6):
+            candidates = attackers & boards[i]
+            if candidates:
+                break
+        else:
+            break
+        if i == 5:
+            other = sides[side ^ 1]
+            if attackers & (other[0] | other[1] | other[2] | other[3] | other[4] | other[5]):
+                break  # The king cannot capture onto a defended square
+        gain.append(on_square - gain[-1])
+        on_square = _ORDER_VALUES[i]
+        if i == 0 and promotes:
+            gain[-1] += SEE_VALUES[QUEEN] - SEE_VALUES[PAWN]
+            on_square = SEE_VALUES[QUEEN]
+
+        occupied ^= candidates & -candidates
+        # Sliders behind the piece that just captured can now see the square
+        if i == 0 or i == 2 or i == 4:
+            attackers |= bishop_attacks(dest, occupied) & diagonal
+        if i == 3 or i == 4:
+            attackers |= rook_attacks(dest, occupied) & straight
+        attackers &= occupied
+        side ^= 1
+
+    # Each side may stop capturing whenever continuing would lose material
+    for d in range(len(gain) - 1, 0, -1):
+        gain[d - 1] = -max(-gain[d - 1], gain[d])
+    return gain[0]
+
+def see_ge(board: bulletchess.Board, move: bulletchess.Move, threshold: int = 0,
+           mailbox: Optional[List[int]] = None) -> bool:
+    """
+    True if see(board, move) >= threshold. Cheaper than see(): most captures
+    are decided from the two pieces involved without looking at attackers.
+    """
+    won, on_square, _ = _first_exchange(board, move, mailbox)
+    if won < threshold:
+        return False  # Even an unanswered capture falls short
+    if won - on_square >= threshold and not (1 << move.destination.index()) & PROMOTION_RANKS:
+        return True  # Still enough after losing the capturing piece
+    return see(board, move, mailbox) >= threshold
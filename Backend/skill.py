@@ -0,0 +1,42 @@
+"""
+Bot strength levels.
+
+A level limits how much the bot searches (a node budget and a depth cap)
+and how exactly it evaluates (random noise added to every static eval),
+instead of how long it may think. Nodes and depth do not depend on the
+machine or its load, so a level plays the same everywhere, and weak levels
+answer in milliseconds. The request's time limit only remains as a cap.
+
+The noise is a hash of the position key and a per-game seed: the same
+position always gets the same offset within a game (so the transposition
+table stays consistent), but different games go wrong in different places.
+"""
+from typing import Dict, NamedTuple, Optional
+
+class SkillLevel(NamedTuple):
+    max_nodes: Optional[int]  # Node budget per move, None for no budget
+    max_depth: int            # Deepest iteration
+    eval_noise: int           # Largest eval offset in centipawns, 0 for none
+
+# Level -> limits; the top level is the full-strength engine
+SKILL_LEVELS: Dict[int, SkillLevel] = {
+    1: SkillLevel(max_nodes=500, max_depth=1, eval_noise=300),
+    2: SkillLevel(max_nodes=1000, max_depth=2, eval_noise=200),
+    3: SkillLevel(max_nodes=3000, max_depth=2, eval_noise=120),
+    4: SkillLevel(max_nodes=8000, max_depth=3, eval_noise=80),
+    5: SkillLevel(max_nodes=15000, max_depth=4, eval_noise=50),
+    6: SkillLevel(max_nodes=30000, max_depth=5, eval_noise=25),
+    7: SkillLevel(max_nodes=60000, max_depth=6, eval_noise=10),
+    8: SkillLevel(max_nodes=None, max_depth=20, eval_noise=0),
+}
+MAX_SKILL_LEVEL = max(SKILL_LEVELS)
+
+def get_skill_level(level: int) -> SkillLevel:
+    if level not in SKILL_LEVELS:
+        raise ValueError(f"Skill level must be between 1 and {MAX_SKILL_LEVEL}")
+    return SKILL_LEVELS[level]
+
+def eval_noise(key: int, seed: int, amplitude: int) -> int:
+    """Offset in [-amplitude, amplitude], fixed for a position key and seed."""
+    h = ((key ^ seed) * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    return (h >> 32) % (2 * amplitude + 1) - amplitude
@@ -0,0 +1,208 @@
+"""
+Lazy SMP parallel search.
+
+The calling process and N-1 helper processes search the same root position
+at the same time. Nothing is exchanged between them except a transposition
+table in multiprocessing.shared_memory: helpers start at staggered depths with
+a different root move order, and the entries they store let the main search
+skip work and reach deeper within the same time limit. Only the main
+process's result is reported.
+
+The shared table is written without locks; every slot is XOR-verified (see
+transposition.py) so a torn write from another process reads as a miss.
+
+Each process has one group. Its helpers are started on first use, up to
+the largest thread count requested so far (at most MAX_SEARCH_THREADS - 1),
+and reused: a search with fewer threads only sends its job to the first
+`threads - 1` of them. Helpers keep their own killers/history warm between
+searches; the main search uses the group's SearchContext, not the caller's.
+"""
+import atexit
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+import bulletchess
+from chess_engine import SearchContext, _search_root
+from engine_pool import board_to_position, board_from_job
+from transposition import TranspositionTable
+
+MAX_SEARCH_THREADS = int(os.environ.get("MAX_SEARCH_THREADS", os.cpu_count() or 1))
+SMP_TT_SIZE_MB = 64  # Shared table budget for each Lazy SMP group
+HELPER_STOP_TIMEOUT = 2.0  # Seconds to wait for helpers after the main search ends
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """Transposition table whose entries live in a named shared memory block."""
+
+    def __init__(self, size_mb: float, name: Optional[str] = None):
+        self.owner = name is None
+        if self.owner:
+            # New blocks are zero-filled, i.e. an empty table
+            self.shm = shared_memory.SharedMemory(
+                create=True, size=TranspositionTable.bytes_needed(size_mb))
+        else:
+            self.shm = shared_memory.SharedMemory(name=name, track=False)
+        super().__init__(size_mb, buffer=self.shm.buf)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def close(self):
+        self.table.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _helper_main(helper_id: int, shm_name: str, tt_size_mb: float, inbox, outbox, stop_event):
+    tt = SharedTranspositionTable(tt_size_mb, name=shm_name)
+    ctx = SearchContext(tt=tt)
+    ctx.stop_event = stop_event
+    try:
+        while True:
+            job = inbox.get()
+            if job is None:
+                break
+            tt.generation = job["generation"]
+            board = board_from_job(job)
+            remaining = job["deadline"] - time.time()
+            if remaining > 0 and not stop_event.is_set():
+                _search_root(ctx, board, remaining, job["max_depth"], helper_id=helper_id)
+            outbox.put((job["search_id"], helper_id, ctx.nodes_searched, ctx.depth_reached))
+    finally:
+        tt.close()
+
+
+class LazySMP:
+    """A main search context plus helper processes sharing one table."""
+
+    def __init__(self, tt_size_mb: float = SMP_TT_SIZE_MB):
+        self.tt_size_mb = tt_size_mb
+        self.tt = SharedTranspositionTable(tt_size_mb)
+        self.ctx = SearchContext(tt=self.tt)
+        # Reentrant: lazy_smp_search holds it around search() and its diagnostics
+        self.lock = threading.RLock()
+        self.mpctx = mp.get_context("spawn")
+        self.stop_event = self.mpctx.Event()
+        self.results = self.mpctx.Queue()
+        self.helpers = []
+        self.search_id = 0
+        self.active_helpers = 0
+        # Diagnostics of the last search, summed over all processes
+        self.last_nodes = 0
+        self.last_helper_depths: Dict[int, int] = {}
+
+    def _start_helpers(self, count: int):
+        while len(self.helpers) < count:
+            helper_id = len(self.helpers) + 1
+            inbox = self.mpctx.Queue()
+            proc = self.mpctx.Process(
+                target=_helper_main,
+                args=(helper_id, self.tt.name, self.tt_size_mb, inbox, self.results, self.stop_event),
+                daemon=True,
+            )
+            proc.start()
+            self.helpers.append((proc, inbox))
+
+    def search(self, state: bulletchess.Board, time_limit: float, max_depth: int, threads: int,
+               stop_event=None, on_iteration=None) -> Tuple[Optional[str], float]:
+        """
+        Search with `threads` processes. The main search reports progress to
+        `on_iteration` and obeys `stop_event`; both are only set while the
+        lock is held, so concurrent callers cannot swap them.
+        """
+        threads = max(1, min(threads, MAX_SEARCH_THREADS))
+        with self.lock:
+            self._start_helpers(threads - 1)
+            self.active_helpers = threads - 1
+            self.ctx.stop_event = stop_event
+            self.ctx.on_iteration = on_iteration
+            self.tt.new_search()
+            self.search_id += 1
+            start_fen, moves = board_to_position(state)
+            job = {
+                "search_id": self.search_id,
+                "start_fen": start_fen,
+                "moves": moves,
+                "deadline": time.time() + time_limit,
+                "max_depth": max_depth,
+                "generation": self.tt.generation,
+            }
+            self.stop_event.clear()
+            for _, inbox in self.helpers[:self.active_helpers]:
+                inbox.put(job)
+            try:
+                result = _search_root(self.ctx, state, time_limit, max_depth)
+            finally:
+                self.stop_event.set()
+                self.ctx.stop_event = None
+                self.ctx.on_iteration = None
+                self._collect_helpers()
+            return result
+
+    def _collect_helpers(self):
+        self.last_nodes = self.ctx.nodes_searched
+        self.last_helper_depths = {}
+        deadline = time.time() + HELPER_STOP_TIMEOUT
+        while len(self.last_helper_depths) < self.active_helpers:
+            try:
+                search_id, helper_id, nodes, depth = self.results.get(
+                    timeout=max(0.0, deadline - time.time()))
+            except queue.Empty:
+                break
+            if search_id != self.search_id:
+                continue  # A straggler from an earlier search
+            self.last_nodes += nodes
+            self.last_helper_depths[helper_id] = depth
+
+    def close(self):
+        for proc, inbox in self.helpers:
+            inbox.put(None)
+        for proc, _ in self.helpers:
+            proc.join(timeout=HELPER_STOP_TIMEOUT)
+            if proc.is_alive():
+                proc.terminate()
+        self.helpers = []
+        self.tt.close()
+
+
+# One group per process, started on first use
+_group: Optional[LazySMP] = None
+_group_lock = threading.Lock()
+
+def get_lazy_smp() -> LazySMP:
+    global _group
+    with _group_lock:
+        if _group is None:
+            _group = LazySMP()
+        return _group
+
+def lazy_smp_search(ctx: SearchContext, state: bulletchess.Board, time_limit: float,
+                    max_depth: int, threads: int) -> Tuple[Optional[str], float]:
+    """
+    Run a Lazy SMP search and copy its diagnostics into the caller's context
+    (nodes are summed over all processes).
+    """
+    group = get_lazy_smp()
+    # Held until the diagnostics are copied, so another search cannot replace them
+    with group.lock:
+        # The main search process reports progress and obeys the caller's stop signal
+        result = group.search(state, time_limit, max_depth, threads,
+                              stop_event=ctx.stop_event, on_iteration=ctx.on_iteration)
+        ctx.nodes_searched = group.last_nodes
+        ctx.tt_hits = group.ctx.tt_hits
+        ctx.depth_reached = group.ctx.depth_reached
+        ctx.stats = group.ctx.stats  # The main search process's telemetry only
+    return result
+
+@atexit.register
+def _close_group():
+    global _group
+    if _group is not None:
+        _group.close()
+        _group = None
@@ -0,0 +1,13 @@
+"""
+Test setup: the engine modules are flat files in Backend/, so make them
+importable and run from Backend/ so relative data paths (data/...) resolve.
+
+Run from the Backend directory:
+    python -m pytest tests
+"""
+import os
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+os.chdir(BACKEND)
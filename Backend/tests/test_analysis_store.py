@@ -0,0 +1,63 @@
+"""
+Persistent analysis store (analysis_store.py): recording and probing,
+replacing unusable files, offline compaction and which positions it serves.
+"""
+import os
+import bulletchess
+import pytest
+from analysis_store import AnalysisStore, compact, is_storable
+
+E2E4 = bulletchess.Move.from_uci("e2e4")
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "analysis.bin")
+
+def test_record_and_probe(path):
+    store = AnalysisStore(path, 1)
+    store.record(123, E2E4, 12.5, 8, 1000)
+    entry = store.probe(123)
+    assert (entry.best_move, entry.score, entry.depth, entry.nodes) == (E2E4, 12.5, 8, 1000)
+    store.record(123, bulletchess.Move.from_uci("d2d4"), 3.0, 6, 500)  # Shallower: ignored
+    assert store.probe(123).depth == 8
+    assert store.probe(456) is None
+    store.close()
+
+def test_unusable_file_is_replaced_not_truncated(path):
+    old = AnalysisStore(path, 1)
+    old.record(123, E2E4, 12.5, 8, 1000)
+    inode = os.stat(path).st_ino
+    with open(path, "r+b") as f:
+        f.write(b"XXXXXXXX")  # Another format
+    new = AnalysisStore(path, 1)
+    assert os.stat(path).st_ino != inode
+    assert new.probe(123) is None
+    assert old.probe(123) is not None  # The old mapping is still intact
+    old.close()
+    new.close()
+
+def test_compact_refuses_while_open(path):
+    store = AnalysisStore(path, 1)
+    store.record(123, E2E4, 12.5, 8, 1000)
+    store.record(456, E2E4, 1.0, 2, 10)
+    store.flush()
+    with pytest.raises(RuntimeError):
+        compact(path, 1)
+    store.close()
+    assert compact(path, 1, min_depth=4) == (1, 1)
+    store = AnalysisStore(path, 1)
+    assert store.probe(123) is not None and store.probe(456) is None
+    store.close()
+
+def _play(*ucis) -> bulletchess.Board:
+    board = bulletchess.Board()
+    for uci in ucis:
+        board.apply(bulletchess.Move.from_uci(uci))
+    return board
+
+def test_is_storable():
+    assert is_storable(bulletchess.Board())
+    assert is_storable(_play("g1f3", "g8f6", "b1c3", "b8c6"))
+    assert not is_storable(_play("g1f3", "g8f6", "f3g1", "f6g8"))  # Start position repeated
+    assert is_storable(_play("g1f3", "g8f6", "f3g1", "f6g8", "e2e4"))  # Pawn move resets
+    assert not is_storable(bulletchess.Board.from_fen("8/8/8/4k3/8/8/8/R3K3 w - - 40 80"))
@@ -0,0 +1,72 @@
+"""
+Endgame bitbases (bitbase.py) as the search probes them, and the checks
+that keep a stale file from being probed.
+"""
+import bulletchess
+import pytest
+import chess_engine
+from bitbase import BITBASE_MAX_HALFMOVE, BITBASE_PATH, HEADER, load_bitbases
+from chess_engine import SearchContext, probe_bitbase
+
+pytestmark = pytest.mark.skipif(chess_engine.BITBASES is None,
+                                reason="bitbases not generated (python bitbase.py generate)")
+
+@pytest.mark.parametrize("fen, result", [
+    ("4k3/8/8/8/8/8/3Q4/4K3 w - - 0 1", 1),       # KQK
+    ("8/8/8/8/8/8/3kQ3/7K b - - 0 1", 0),         # KQK, the queen hangs
+    ("8/8/8/4k3/8/8/8/R3K3 b - - 0 1", -1),       # KRK, weak side to move
+    ("4k3/8/4K3/4P3/8/8/8/8 b - - 0 1", -1),      # KPK, king in front on the sixth
+    ("k7/8/8/8/8/8/P7/K7 w - - 0 1", 0),          # KPK, rook pawn
+    ("4K3/8/8/8/8/4k3/4p3/8 b - - 0 1", 1),       # KPK for black (mirrored)
+])
+def test_probe(fen, result):
+    board = bulletchess.Board.from_fen(fen)
+    ctx = SearchContext(tt_size_mb=1)
+    ctx.set_root(board)
+    score = probe_bitbase(ctx, board)
+    if result == 0:
+        assert score == 0.0
+    else:
+        assert score * result > chess_engine.BITBASE_WIN_SCORE / 2
+
+def test_no_win_near_the_fifty_move_rule():
+    fen = f"8/8/8/4k3/8/8/8/R3K3 w - - {BITBASE_MAX_HALFMOVE + 1} 80"
+    board = bulletchess.Board.from_fen(fen)
+    ctx = SearchContext(tt_size_mb=1)
+    ctx.set_root(board)
+    assert probe_bitbase(ctx, board) is None
+
+def test_not_a_bitbase_position():
+    board = bulletchess.Board()
+    ctx = SearchContext(tt_size_mb=1)
+    ctx.set_root(board)
+    assert probe_bitbase(ctx, board) is None
+
+def _damaged_copy(tmp_path, damage) -> str:
+    with open(BITBASE_PATH, "rb") as f:
+        data = bytearray(f.read())
+    damage(data)
+    path = tmp_path / "bitbases.bin"
+    path.write_bytes(bytes(data))
+    return str(path)
+
+def _set_header_field(field, value):
+    def damage(data):
+        header = list(HEADER.unpack_from(data, 0))
+        header[field] = value
+        HEADER.pack_into(data, 0, *header)
+    return damage
+
+def _flip_table_byte(data):
+    data[HEADER.size + 1000] ^= 0x10
+
+@pytest.mark.parametrize("damage", [
+    _set_header_field(2, 0),  # Another generator version
+    _set_header_field(3, 0),  # Wrong checksum
+    _flip_table_byte,         # Damaged table
+])
+def test_stale_file_is_not_loaded(tmp_path, damage):
+    assert load_bitbases(_damaged_copy(tmp_path, damage)) is None
+
+def test_current_file_loads():
+    assert load_bitbases(BITBASE_PATH) is not None
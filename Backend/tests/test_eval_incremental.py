@@ -0,0 +1,40 @@
+"""
+The search's incremental material/PST sums (eval.update_psqt in
+SearchContext.make_move) and the evaluation built on them, against
+evaluating every position from scratch.
+"""
+import bulletchess
+import pytest
+from chess_engine import SearchContext
+from eval import compute_psqt, evaluate_position
+from perft import PERFT_POSITIONS
+from zobrist import build_mailbox
+
+FENS = [fen for _, fen, _ in PERFT_POSITIONS] + [
+    "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3",  # En passant capture available
+    "8/8/8/4k3/8/8/3q4/R3K3 w Q - 0 1",  # Endgame phase: mop-up, no positional terms
+]
+
+def _walk(ctx: SearchContext, board: bulletchess.Board, depth: int):
+    if depth == 0:
+        return
+    for move in board.legal_moves():
+        ctx.make_move(board, move)  # Raises if the sums or the evaluation are off
+        _walk(ctx, board, depth - 1)
+        ctx.unmake_move(board)
+
+@pytest.mark.parametrize("fen", FENS)
+def test_incremental_eval(fen):
+    board = bulletchess.Board.from_fen(fen)
+    ctx = SearchContext(tt_size_mb=1)
+    ctx.verify_eval = True
+    ctx.set_root(board)
+    _walk(ctx, board, 2)
+    assert ctx.psqt == compute_psqt(build_mailbox(board))
+
+@pytest.mark.parametrize("fen", FENS)
+def test_root_eval(fen):
+    board = bulletchess.Board.from_fen(fen)
+    mailbox = build_mailbox(board)
+    score = evaluate_position(board, mailbox, compute_psqt(mailbox))
+    assert score == pytest.approx(evaluate_position(board), abs=1e-6)
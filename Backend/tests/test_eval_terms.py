@@ -0,0 +1,175 @@
+"""
+The bitboard eval terms (eval.py with the bitboards.py masks) against the
+square-by-square loops they replaced, on middlegame and endgame positions
+and all their children.
+"""
+import bulletchess
+import bulletchess.utils as utils
+import pytest
+from bulletchess import BISHOP, BLACK, KNIGHT, PAWN, QUEEN, ROOK, WHITE
+import eval as ev
+from eval import MATERIAL
+from zobrist import BLACK_PAWN, WHITE_PAWN, build_mailbox
+
+FENS = [
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP1QBPPP/R3KB1R w KQ - 0 8",
+    "r2q1rk1/1b1nbppp/p2ppn2/1p6/3NP3/1BN1BP2/PPPQ2PP/2KR3R w - - 0 12",
+    "2r2rk1/pp1bqppp/2n1pn2/3p4/3P4/2PBPN2/P1Q2PPP/R1B2RK1 w - - 0 13",
+    "rnbqkbnr/ppp2ppp/8/3pp3/4P3/5Q2/PPPP1PPP/RNB1KBNR b KQkq - 1 3",
+    "4k3/8/8/8/8/8/3q4/R3K3 w Q - 0 1",
+    "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+]
+
+def _positions():
+    boards = []
+    for fen in FENS:
+        board = bulletchess.Board.from_fen(fen)
+        boards.append(board)
+        for move in board.legal_moves():
+            child = board.copy()
+            child.apply(move)
+            boards.append(child)
+    return [(board, build_mailbox(board), ev.pawn_structure(board)) for board in boards]
+
+POSITIONS = _positions()
+
+# -------------------------
+# Square-loop versions
+# -------------------------
+def _loop_count_bits(bb) -> int:
+    return sum(1 for _ in bb)
+
+def _loop_king_safety(board, color, phase_weight, mailbox) -> int:
+    sign = 1 if color == WHITE else -1
+    king_sq = utils.king_square(board, color)
+    safety = 0
+    if phase_weight < 0.3:
+        if color == WHITE:
+            shield_sqs = [king_sq.north(), king_sq.nw(), king_sq.ne()]
+        else:
+            shield_sqs = [king_sq.south(), king_sq.sw(), king_sq.se()]
+        own_pawn = WHITE_PAWN if color == WHITE else BLACK_PAWN
+        shield = sum(19 for sq in shield_sqs if sq and mailbox[sq.index()] == own_pawn)
+        safety += int(shield * phase_weight)
+        king_file = king_sq.index() % 8
+        if king_file in [3, 4]:
+            safety -= int(41 * phase_weight)
+        back_rank = 0 if color == WHITE else 7
+        if king_sq.index() // 8 == back_rank and king_file in [0, 1, 6, 7]:
+            safety += int(20 * phase_weight)
+    return sign * safety
+
+def _loop_is_passed(mailbox, square_index, is_white) -> bool:
+    rank, file = square_index // 8, square_index % 8
+    enemy_pawn = BLACK_PAWN if is_white else WHITE_PAWN
+    ranks = range(rank + 1, 8) if is_white else range(0, rank)
+    return not any(mailbox[r * 8 + f] == enemy_pawn
+                   for f in (file - 1, file, file + 1) if 0 <= f < 8 for r in ranks)
+
+def _loop_pawn_structure(board, mailbox):
+    """eval.pawn_structure's fields, with the file sets spread to bitboards."""
+    white_passed, black_passed = [], []
+    white_files = black_files = 0
+    for sq in board[WHITE, PAWN]:
+        white_files |= 1 << (sq.index() % 8)
+        if _loop_is_passed(mailbox, sq.index(), True):
+            white_passed.append(max(0, sq.index() // 8 - 1))
+    for sq in board[BLACK, PAWN]:
+        black_files |= 1 << (sq.index() % 8)
+        if _loop_is_passed(mailbox, sq.index(), False):
+            black_passed.append(max(0, 6 - sq.index() // 8))
+    isolated = (_loop_count_bits(utils.isolated_pawns(board, WHITE))
+                - _loop_count_bits(utils.isolated_pawns(board, BLACK)))
+    return (tuple(white_passed), tuple(black_passed), isolated, _loop_center(board),
+            white_files * 0x0101010101010101, black_files * 0x0101010101010101)
+
+def _loop_mop_up(board, phase_weight) -> int:
+    if phase_weight <= 0.5:
+        return 0
+    white_king = utils.king_square(board, WHITE).index()
+    black_king = utils.king_square(board, BLACK).index()
+    diff = sum((_loop_count_bits(board[WHITE, pt]) - _loop_count_bits(board[BLACK, pt])) * MATERIAL[pt]
+               for pt in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN))
+    if abs(diff) <= 500:
+        return 0
+    distance = abs(white_king % 8 - black_king % 8) + abs(white_king // 8 - black_king // 8)
+    loser = black_king if diff > 0 else white_king
+    edge = min(loser % 8, 7 - loser % 8, loser // 8, 7 - loser // 8)
+    score = (14 - distance) * 5 + (3 - edge) * 7
+    return score if diff > 0 else -score
+
+def _loop_minors(board, phase_weight) -> int:
+    """piece_mobility(WHITE) - piece_mobility(BLACK) + piece_development, as evaluate_position adds them."""
+    mobility = {}
+    development = 0
+    for color, sign, back_rank in ((WHITE, 1, 0), (BLACK, -1, 7)):
+        mobility[color] = 0
+        for ptype in (KNIGHT, BISHOP):
+            for sq in board[color, ptype]:
+                if sq.index() // 8 != back_rank:
+                    mobility[color] += 2 * sign
+                else:
+                    development -= 9 * sign
+    if phase_weight > 0.3:
+        development = 0  # Development only counts in the opening
+    return mobility[WHITE] - mobility[BLACK] + int(development * phase_weight)
+
+def _loop_center(board) -> int:
+    score = 0
+    for color, sign in ((WHITE, 10), (BLACK, -10)):
+        for sq in board[color, PAWN]:
+            if sq.index() % 8 in (3, 4) and sq.index() // 8 in (3, 4):
+                score += sign
+    return score
+
+def _loop_rook_files(board, mailbox) -> int:
+    score = 0
+    for color, sign, own, enemy in ((WHITE, 1, WHITE_PAWN, BLACK_PAWN), (BLACK, -1, BLACK_PAWN, WHITE_PAWN)):
+        for sq in board[color, ROOK]:
+            file_pieces = mailbox[sq.index() % 8::8]
+            if own not in file_pieces:
+                score += sign * (20 if enemy in file_pieces else 35)
+    return score
+
+# -------------------------
+# Tests
+# -------------------------
+def _mismatches(loop, bitboard):
+    return [board.fen() for board, mailbox, pawns in POSITIONS
+            if loop(board, mailbox, pawns) != bitboard(board, mailbox, pawns)]
+
+def test_count_bits():
+    for color in (WHITE, BLACK):
+        for ptype in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN):
+            assert _mismatches(lambda b, m, p: _loop_count_bits(b[color, ptype]),
+                               lambda b, m, p: ev.count_bits(b[color, ptype])) == []
+
+@pytest.mark.parametrize("phase_weight", [0.0, 0.2, 0.6])
+def test_king_safety(phase_weight):
+    for color in (WHITE, BLACK):
+        assert _mismatches(lambda b, m, p: _loop_king_safety(b, color, phase_weight, m),
+                           lambda b, m, p: ev.king_safety(b, color, phase_weight)) == []
+
+def test_pawn_structure():
+    assert _mismatches(lambda b, m, p: _loop_pawn_structure(b, m),
+                       lambda b, m, p: tuple(ev.pawn_structure(b))) == []
+
+@pytest.mark.parametrize("phase_weight", [0.4, 0.8, 1.0])
+def test_mop_up(phase_weight):
+    assert _mismatches(lambda b, m, p: _loop_mop_up(b, phase_weight),
+                       lambda b, m, p: ev.mop_up_eval(b, phase_weight)) == []
+
+@pytest.mark.parametrize("phase_weight", [0.2, 0.8])
+def test_minor_pieces(phase_weight):
+    assert _mismatches(lambda b, m, p: _loop_minors(b, phase_weight),
+                       lambda b, m, p: (ev.piece_mobility(b, WHITE) - ev.piece_mobility(b, BLACK)
+                                        + ev.piece_development(b, phase_weight))) == []
+
+def test_center_control():
+    assert _mismatches(lambda b, m, p: _loop_center(b), lambda b, m, p: ev.center_control(b)) == []
+
+def test_rook_on_open_file():
+    assert _mismatches(lambda b, m, p: _loop_rook_files(b, m),
+                       lambda b, m, p: ev.rook_on_open_file(b, WHITE, p) + ev.rook_on_open_file(b, BLACK, p)) == []
@@ -0,0 +1,59 @@
+"""
+Early exits of eval.evaluate_lazy and the bounds they leave in the eval
+cache: a score returned outside the window must be a true bound.
+"""
+import bulletchess
+from eval import EVAL_STAGES, compute_psqt, evaluate_lazy, pawn_structure
+from eval_cache import LOWER, UPPER, EvalCache
+from perft import PERFT_POSITIONS
+from zobrist import build_mailbox
+
+FENS = [fen for _, fen, _ in PERFT_POSITIONS] + [
+    "8/8/8/4k3/8/8/3q4/R3K3 w Q - 0 1",
+    "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1",
+]
+OFFSETS = [-400, -150, -60, -20, -1, 0, 1, 20, 60, 150, 400]
+
+def _positions():
+    for fen in FENS:
+        board = bulletchess.Board.from_fen(fen)
+        yield board
+        for move in board.legal_moves():
+            child = board.copy()
+            child.apply(move)
+            yield child
+
+def test_early_exit_is_a_bound():
+    exits = 0
+    for board in _positions():
+        psqt = compute_psqt(build_mailbox(board))
+        pawns = pawn_structure(board)
+        exact, stages = evaluate_lazy(board, psqt, pawns)
+        assert stages == EVAL_STAGES
+        for low in OFFSETS:
+            for high in OFFSETS:
+                if low > high:
+                    continue
+                lower, upper = exact + low, exact + high
+                score, stages = evaluate_lazy(board, psqt, pawns, lower, upper)
+                if stages == EVAL_STAGES:
+                    assert score == exact
+                    continue
+                exits += 1
+                if score > upper:
+                    assert exact >= score, board.fen()
+                else:
+                    assert score < lower and exact <= score, board.fen()
+    assert exits  # The window offsets do reach the early exits
+
+def test_cached_bounds_answer_only_outside_the_window():
+    cache = EvalCache(16)
+    cache.store(5, 100.0, LOWER)
+    assert cache.probe(5, -50.0, 50.0) == 100.0  # At least 100: above the window
+    assert cache.probe(5, 50.0, 150.0) is None
+    cache.store(6, -100.0, UPPER)
+    assert cache.probe(6, -50.0, 50.0) == -100.0
+    assert cache.probe(6, -150.0, 0.0) is None
+    assert cache.probe(6) is None  # No window: only exact scores answer
+    cache.store(6, 7.0)
+    assert cache.probe(6) == 7.0
@@ -0,0 +1,60 @@
+"""
+Proof-number mate solver (mate_solver.py) and the alternative mates that
+mating puzzles accept with it (puzzle_manager.py).
+"""
+import bulletchess
+import pytest
+from bulletchess import CHECKMATE
+from mate_solver import check_mating_move, solve_mate
+from puzzle_manager import PuzzleSession
+
+LADDER = "7k/8/8/8/8/8/R7/1R4K1 w - - 0 1"  # Mate in 2 with either rook first
+
+@pytest.mark.parametrize("fen, max_moves, mate_in", [
+    ("6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1", 3, 1),
+    (LADDER, 3, 2),
+    (LADDER, 1, None),
+    ("4k3/8/8/8/8/8/8/4K3 w - - 0 1", 2, None),
+])
+def test_solve_mate(fen, max_moves, mate_in):
+    board = bulletchess.Board.from_fen(fen)
+    result = solve_mate(board, max_moves)
+    assert result["mate_in"] == mate_in
+    assert result["status"] == ("mate" if mate_in else "no_mate")
+    assert board.fen() == fen
+    if mate_in:
+        assert len(result["pv"]) == 2 * mate_in - 1
+        for uci in result["pv"]:
+            board.apply(bulletchess.Move.from_uci(uci))
+        assert board in CHECKMATE
+
+def test_budget_runs_out():
+    result = solve_mate(bulletchess.Board.from_fen(LADDER), 3, max_nodes=5)
+    assert result["status"] == "unknown"
+
+def test_check_mating_move():
+    board = bulletchess.Board.from_fen(LADDER)
+    assert check_mating_move(board, "b1b7", 2)["status"] == "mate"
+    assert check_mating_move(board, "a2a3", 2)["status"] == "no_mate"
+    assert check_mating_move(board, "b1b7", 1)["status"] == "no_mate"
+    assert check_mating_move(board, "e2e4", 2)["status"] == "no_mate"  # Illegal
+    assert board.fen() == LADDER
+
+def test_puzzle_accepts_alternative_mate():
+    session = PuzzleSession({
+        "puzzle_id": "ladder",
+        "fen": "6k1/8/8/8/8/8/R7/1R4K1 b - - 0 1",
+        "moves": ["g8h8", "b1b7", "h8g8", "a2a8"],
+        "rating": 1000,
+    })
+    assert session.make_move("a2a7")["status"] == "correct"
+    assert session.make_move("b1b8")["status"] == "complete"
+
+def test_puzzle_rejects_non_mating_move():
+    session = PuzzleSession({
+        "puzzle_id": "ladder",
+        "fen": "6k1/8/8/8/8/8/R7/1R4K1 b - - 0 1",
+        "moves": ["g8h8", "b1b7", "h8g8", "a2a8"],
+        "rating": 1000,
+    })
+    assert session.make_move("a2a3")["status"] == "wrong"
@@ -0,0 +1,30 @@
+"""
+Move generation and apply/undo against the known perft counts of
+perft.PERFT_POSITIONS, directly and through SearchContext.make_move/unmake_move.
+"""
+import bulletchess
+import pytest
+from chess_engine import SearchContext
+from perft import PERFT_POSITIONS, perft, perft_engine
+
+MAX_NODES = 10000  # Deepest known count per position up to this many leaves
+
+CASES = [(name, fen, depth, count)
+         for name, fen, counts in PERFT_POSITIONS
+         for depth, count in enumerate(counts, 1) if count <= MAX_NODES]
+
+@pytest.mark.parametrize("name, fen, depth, count", CASES)
+def test_perft(name, fen, depth, count):
+    board = bulletchess.Board.from_fen(fen)
+    assert perft(board, depth) == count
+    assert perft(board, depth, bulk=False) == count
+    assert board.fen() == fen  # Every move was taken back
+
+@pytest.mark.parametrize("name, fen, depth, count", CASES)
+def test_perft_engine(name, fen, depth, count):
+    board = bulletchess.Board.from_fen(fen)
+    ctx = SearchContext(tt_size_mb=1)
+    ctx.set_root(board)
+    assert perft_engine(ctx, board, depth, bulk=False) == count
+    assert board.fen() == fen
+    assert not ctx.undo_stack
@@ -0,0 +1,58 @@
+"""
+Static exchange evaluation (see.py) on known exchanges.
+"""
+import bulletchess
+import pytest
+from see import see, see_ge
+from zobrist import build_mailbox
+
+# (FEN, move, expected see() in SEE_VALUES centipawns). SEE ignores pins, so the
+# f4e5 case is 0 even though the f6 pawn cannot legally recapture.
+SEE_POSITIONS = [
+    ("1k1r4/1pp4p/p7/4p3/8/P5P1/1PP4P/2K1R3 w - - 0 1", "e1e5", 100),
+    ("1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1", "d3e5", -220),
+    ("1k1r4/1ppn3p/p4b2/4n3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1", "d3e5", 150),
+    ("4R3/2r3p1/5bk1/1p1r3p/p2PR1P1/P1BK1P2/1P6/8 b - - 0 1", "h5g4", 0),
+    ("4r1k1/5pp1/nbp4p/1p2p2q/1P2P1b1/1BP2N1P/1B2QPPK/3R4 b - - 0 1", "g4f3", -10),
+    ("2r1r1k1/pp1bppbp/3p1np1/q3P3/2P2P2/1P2B3/P1N1B1PP/2RQ1RK1 b - - 0 1", "d6e5", 100),
+    ("7r/5qpk/p1Qp1b1p/3r3n/BB3p2/5p2/P1P2P2/4RK1R w - - 0 1", "e1e8", 0),
+    ("6rr/6pk/p1Qp1b1p/2n5/1B3p2/5p2/P1P2P2/4RK1R w - - 0 1", "e1e8", -500),
+    ("7r/5qpk/2Qp1b1p/1N1r3n/BB3p2/5p2/P1P2P2/4RK1R w - - 0 1", "e1e8", -500),
+    ("6RR/4bP2/8/8/5r2/3K4/5p2/4k3 w - - 0 1", "f7f8q", 230),
+    ("6RR/4bP2/8/8/5r2/3K4/5p2/4k3 w - - 0 1", "f7f8n", 220),
+    ("7R/5P2/8/8/6r1/3K4/5p2/4k3 w - - 0 1", "f7f8q", 800),
+    ("7R/5P2/8/8/6r1/3K4/5p2/4k3 w - - 0 1", "f7f8b", 230),
+    ("7R/4bP2/8/8/1q6/3K4/5p2/4k3 w - - 0 1", "f7f8r", -100),
+    ("8/4kp2/2npp3/1Nn5/1p2PQP1/7q/1PP1B3/4KR1r b - - 0 1", "h1f1", 0),
+    ("2r2r1k/6bp/p7/2q2p1Q/3PpP2/1B6/P5PP/2RR3K b - - 0 1", "c5c1", 100),
+    ("r2qk1nr/pp2ppbp/2b3p1/2p1p3/8/2N2N2/PPPP1PPP/R1BQR1K1 w kq - 0 1", "f3e5", 100),
+    ("6r1/4kq2/b2p1p2/p1pPb3/p1P2B1Q/2P4P/2B1R1P1/6K1 w - - 0 1", "f4e5", 0),
+    ("3q2nk/pb1r1p2/np6/3P2Pp/2p1P3/2R4B/PQ3P1P/3R2K1 w - h6 0 1", "g5h6", 0),
+    ("3q2nk/pb1r1p2/np6/3P2Pp/2p1P3/2R1B2B/PQ3P1P/3R2K1 w - h6 0 1", "g5h6", 100),
+    ("2r4r/1P4pk/p2p1b1p/7n/BB3p2/2R2p2/P1P2P2/4RK2 w - - 0 1", "c3c8", 500),
+    ("2r4k/2r4p/p7/2b2p1b/4pP2/1BR5/P1R3PP/2Q4K w - - 0 1", "c3c5", 330),
+    ("8/pp6/2pkp3/4bp2/2R3b1/2P5/PP4B1/1K6 w - - 0 1", "g2c6", -230),
+    ("4q3/1p1pr1kb/1B2rp2/6p1/pP3PP1/P7/1R4P1/2Q2K2 b - - 0 1", "h7b1", -330),
+    ("3r3k/3r4/2n1n3/8/3p4/2PR4/1B1Q4/3R3K w - - 0 1", "d3d4", -90),
+    ("3r3k/3r4/2n1n3/8/3p4/2PR4/1B1Q4/3R3K w - - 0 1", "c3d4", 0),
+    ("k7/8/8/3p4/8/2N5/8/K7 w - - 0 1", "c3d5", 100),
+    ("k7/8/2p5/3p4/8/2N5/8/K7 w - - 0 1", "c3d5", -220),
+    ("k2r4/3r4/8/3p4/8/8/3R4/K2R4 w - - 0 1", "d2d5", -400),
+]
+
+
+@pytest.mark.parametrize("fen, uci, expected", SEE_POSITIONS)
+def test_see(fen, uci, expected):
+    board = bulletchess.Board.from_fen(fen)
+    move = bulletchess.Move.from_uci(uci)
+    assert see(board, move) == expected
+    assert see(board, move, build_mailbox(board)) == expected
+
+@pytest.mark.parametrize("fen, uci, expected", SEE_POSITIONS)
+def test_see_ge(fen, uci, expected):
+    board = bulletchess.Board.from_fen(fen)
+    move = bulletchess.Move.from_uci(uci)
+    mailbox = build_mailbox(board)
+    for threshold in (expected - 1, expected, expected + 1):
+        assert see_ge(board, move, threshold) == (expected >= threshold)
+        assert see_ge(board, move, threshold, mailbox) == (expected >= threshold)
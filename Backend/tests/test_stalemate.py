@@ -0,0 +1,36 @@
+"""
+Stalemate in negamax and quiescence: the node must score 0 before the
+depth-0 hand-off, futility, null move or stand pat can return a bound.
+"""
+import bulletchess
+import pytest
+from chess_engine import SearchContext, SearchStats, negamax, quiescence
+from timeman import TimeManager
+
+STALEMATES = [
+    "k7/2Q4p/1K5P/8/8/8/8/7R b - - 0 1",
+    "7k/5Q2/6K1/8/8/8/8/8 b - - 0 1",
+    "8/8/8/8/8/6k1/5q2/7K w - - 0 1",
+]
+WINDOWS = [(-300, -299), (-1, 1), (299, 300)]
+
+def _context(board: bulletchess.Board) -> SearchContext:
+    ctx = SearchContext(tt_size_mb=1)
+    ctx.set_root(board)
+    ctx.time_manager = TimeManager(float("inf"))
+    ctx.stats = SearchStats()
+    return ctx
+
+@pytest.mark.parametrize("fen", STALEMATES)
+@pytest.mark.parametrize("window", WINDOWS)
+@pytest.mark.parametrize("depth", [0, 1, 2])
+def test_negamax_stalemate(fen, window, depth):
+    board = bulletchess.Board.from_fen(fen)
+    assert board in bulletchess.STALEMATE
+    assert negamax(_context(board), board, depth, *window, True) == (0.0, False)
+
+@pytest.mark.parametrize("fen", STALEMATES)
+@pytest.mark.parametrize("window", WINDOWS)
+def test_quiescence_stalemate(fen, window):
+    board = bulletchess.Board.from_fen(fen)
+    assert quiescence(_context(board), board, *window) == 0.0
@@ -0,0 +1,31 @@
+"""
+Clock polling of the search (timeman.py): every node counts down to the
+next poll, so the clock is never read less often than CLOCK_POLL_NODES.
+"""
+import bulletchess
+import pytest
+from bench import BENCH_POSITIONS
+from chess_engine import SearchContext, get_best_move_and_eval
+from timeman import CLOCK_POLL_NODES, TimeManager
+
+@pytest.mark.parametrize("fen", BENCH_POSITIONS[:6])
+def test_poll_gap(monkeypatch, fen):
+    polled = [0]
+    poll = TimeManager.poll
+
+    def recording_poll(self, nodes=0):
+        polled.append(nodes)
+        return poll(self, nodes)
+
+    monkeypatch.setattr(TimeManager, "poll", recording_poll)
+    ctx = SearchContext(tt_size_mb=4)
+    board = bulletchess.Board.from_fen(fen)
+    get_best_move_and_eval(board, time_limit=float("inf"), max_depth=4, ctx=ctx)
+    polled.append(ctx.nodes_searched)
+    assert max(b - a for a, b in zip(polled, polled[1:])) <= CLOCK_POLL_NODES
+
+def test_hard_limit_stops_search():
+    ctx = SearchContext(tt_size_mb=4)
+    move, _ = get_best_move_and_eval(bulletchess.Board(), time_limit=0.05, max_depth=64, ctx=ctx)
+    assert move is not None
+    assert ctx.depth_reached < 64
@@ -0,0 +1,46 @@
+"""
+Incremental Zobrist keys, pawn keys and mailbox (SearchContext.make_move)
+against recomputing them from the board after every move.
+"""
+import bulletchess
+import pytest
+from bulletchess import CHECK
+from chess_engine import SearchContext
+from perft import PERFT_POSITIONS
+from zobrist import compute_key
+
+FENS = [fen for _, fen, _ in PERFT_POSITIONS] + [
+    "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3",  # En passant capture available
+]
+
+def _walk(ctx: SearchContext, board: bulletchess.Board, depth: int):
+    """Every line `depth` plies deep, with a null move wherever it is legal."""
+    if depth == 0:
+        return
+    moves = list(board.legal_moves())
+    if board not in CHECK:
+        moves.append(None)
+    for move in moves:
+        ctx.make_move(board, move)  # Raises if a key or the mailbox is off
+        _walk(ctx, board, depth - 1)
+        ctx.unmake_move(board)
+
+@pytest.mark.parametrize("fen", FENS)
+def test_incremental_keys(fen):
+    board = bulletchess.Board.from_fen(fen)
+    ctx = SearchContext(tt_size_mb=1)
+    ctx.verify_keys = True
+    ctx.set_root(board)
+    root_key = ctx.key
+    _walk(ctx, board, 2)
+    assert ctx.key == root_key and not ctx.undo_stack
+
+def test_transpositions_share_a_key():
+    a, b = bulletchess.Board(), bulletchess.Board()
+    for uci in ("g1f3", "g8f6", "b1c3"):
+        a.apply(bulletchess.Move.from_uci(uci))
+    for uci in ("b1c3", "g8f6", "g1f3"):
+        b.apply(bulletchess.Move.from_uci(uci))
+    assert compute_key(a) == compute_key(b)
+    a.apply(bulletchess.Move.from_uci("b8c6"))
+    assert compute_key(a) != compute_key(b)
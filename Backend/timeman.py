@@ -0,0 +1,116 @@
+"""
+Search time management.
+
+A TimeManager is created for every search. Negamax and quiescence nodes
+both count down poll_countdown and call poll() when it runs out, so the clock
+(monotonic) and the cross-process stop event are read every CLOCK_POLL_NODES
+nodes whatever the mix of node types, instead of at every node.
+
+Two limits apply:
+    hard limit  the full time budget; the running iteration is aborted
+    soft limit  a fraction of it; no new iteration is started after it, or
+                when the previous iteration suggests the next one cannot
+                finish before the hard limit
+
+When the best move has stayed the same for STABLE_ITERATIONS iterations in a
+row the soft limit shrinks further, so easy positions return early.
+
+The iteration estimate already stops most timed searches before the soft
+limit (`microbench.py timeman`), so the soft limit sits well above half the
+budget and does not cut searches short on its own.
+
+A search with a node budget (skill levels, see skill.py) stops on nodes
+instead, so it does not depend on machine load: no iteration is started
+once NODE_SOFT_RATIO of the budget is spent, and the running one is aborted
+at the budget. The clock then only acts as the hard limit. The first
+iteration always completes so there is a move to play.
+"""
+import time
+from typing import Optional
+
+CLOCK_POLL_NODES = 256  # Nodes between two reads of the clock
+SOFT_LIMIT_RATIO = 0.7  # Soft limit as a fraction of the time budget
+ITERATION_GROWTH = 2.0  # Assumed time ratio between consecutive iterations
+STABLE_ITERATIONS = 4  # Iterations with an unchanged best move before exiting early
+STABLE_SOFT_RATIO = 0.6  # Soft limit scale once the best move is stable
+STABLE_MIN_DEPTH = 5  # Shallower iterations say little about stability
+NODE_SOFT_RATIO = 0.5  # Share of a node budget after which no iteration starts
+
+
+class TimeManager:
+    """
+    Time limits and stop conditions of one search.
+
+    `flexible=False` keeps only the hard limit and the stop event; Lazy SMP
+    helpers use it so they keep searching until the main process stops them.
+    `max_nodes` is a node budget replacing the soft time limits.
+    """
+
+    def __init__(self, time_limit: float, stop_event=None, flexible: bool = True,
+                 max_nodes: Optional[int] = None):
+        self.start = time.monotonic()
+        self.time_limit = time_limit
+        self.hard_deadline = self.start + time_limit
+        self.soft_limit = time_limit * SOFT_LIMIT_RATIO if flexible else time_limit
+        self.flexible = flexible and max_nodes is None
+        self.max_nodes = max_nodes
+        self.stop_event = stop_event
+        self.aborted = False
+        self.poll_countdown = CLOCK_POLL_NODES  # Decremented by the search at every node
+        self.stop_reason: Optional[str] = None
+        self.best_move = None
+        self.stable_iterations = 0
+        self.iteration_start = self.start
+        self.last_iteration_time = 0.0
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start
+
+    def poll(self, nodes: int = 0) -> bool:
+        """Read the clock and stop event; True (and stays True) once the search must abort."""
+        self.poll_countdown = CLOCK_POLL_NODES
+        if self.aborted:
+            return True
+        if self.max_nodes is not None and nodes >= self.max_nodes and self.best_move is not None:
+            self.aborted = True
+            self.stop_reason = "node_limit"
+        elif time.monotonic() >= self.hard_deadline:
+            self.aborted = True
+            self.stop_reason = "hard_limit"
+        elif self.stop_event is not None and self.stop_event.is_set():
+            self.aborted = True
+            self.stop_reason = "stopped"
+        return self.aborted
+
+    def start_iteration(self, nodes: int = 0) -> bool:
+        """Whether another iteration should be started."""
+        if self.poll(nodes):
+            return False
+        if self.max_nodes is not None:
+            if self.best_move is not None and nodes >= self.max_nodes * NODE_SOFT_RATIO:
+                self.stop_reason = "node_soft_limit"
+                return False
+            self.iteration_start = time.monotonic()
+            return True
+        now = time.monotonic()
+        elapsed = now - self.start
+        soft_limit = self.soft_limit
+        if self.flexible and self.stable_iterations >= STABLE_ITERATIONS:
+            soft_limit *= STABLE_SOFT_RATIO
+        if elapsed >= soft_limit:
+            self.stop_reason = "stable" if soft_limit < self.soft_limit else "soft_limit"
+            return False
+        if self.flexible and now + self.last_iteration_time * ITERATION_GROWTH > self.hard_deadline:
+            self.stop_reason = "no_time_for_iteration"
+            return False
+        self.iteration_start = now
+        return True
+
+    def end_iteration(self, depth: int, best_move):
+        """Record a completed iteration and its best move."""
+        self.last_iteration_time = time.monotonic() - self.iteration_start
+        if depth >= STABLE_MIN_DEPTH and best_move == self.best_move:
+            self.stable_iterations += 1
+        else:
+            self.stable_iterations = 0
+        self.best_move = best_move
@@ -0,0 +1,206 @@
+"""
+Fixed-capacity transposition table for the chess engine.
+
+Entries live in one preallocated array of unsigned 64-bit words, so the table
+never grows, never needs a pruning pass and costs 16 bytes per entry instead of
+a Python object per position. Entries are grouped in buckets of BUCKET_SIZE
+slots; a new entry replaces the least valuable slot in its bucket, where value
+is the search depth minus a penalty for entries left over from older searches.
+
+The table can live in shared memory and be written by several processes
+without locks (Lazy SMP). To make torn writes harmless each slot stores the key
+XOR-ed with the data; a probe only accepts the slot if XOR-ing the two words
+gives back the key it looked for.
+
+Each slot is two words:
+    word 0: position key XOR word 1
+    word 1: packed data
+        bits  0-14  best move (origin | destination << 6 | promotion << 12)
+        bits 16-23  depth
+        bits 24-25  flag (EXACT / LOWER / UPPER)
+        bits 26-31  generation (search counter, used for aging)
+        bits 32-63  value in 1/VALUE_SCALE centipawns, offset to unsigned
+"""
+from array import array
+from typing import Dict, Optional
+import bulletchess
+from bulletchess import SQUARES, KNIGHT, BISHOP, ROOK, QUEEN
+
+BUCKET_SIZE = 4
+WORDS_PER_ENTRY = 2
+BYTES_PER_ENTRY = WORDS_PER_ENTRY * 8
+
+VALUE_SCALE = 1024
+VALUE_OFFSET = 1 << 31
+VALUE_LIMIT = (VALUE_OFFSET - 1) / VALUE_SCALE
+
+GENERATION_MASK = 0x3F
+MAX_DEPTH = 0xFF
+
+KEY_MASK = 0xFFFFFFFFFFFFFFFF
+
+FLAG_CODES = {"EXACT": 1, "LOWER": 2, "UPPER": 3}
+FLAG_NAMES = (None, "EXACT", "LOWER", "UPPER")
+
+PROMOTION_CODES = {None: 0, KNIGHT: 1, BISHOP: 2, ROOK: 3, QUEEN: 4}
+PROMOTION_TYPES = (None, KNIGHT, BISHOP, ROOK, QUEEN)
+
+# Number of slots inspected when estimating how full the table is
+HASHFULL_SAMPLE = 1000
+
+
+class TTEntry:
+    __slots__ = ("value", "depth", "flag", "best_move")
+    def __init__(self, value: float, depth: int, flag: str, best_move: Optional[bulletchess.Move]):
+        self.value = value
+        self.depth = depth
+        self.flag = flag
+        self.best_move = best_move
+
+
+# Decoded moves are shared between all tables; there are fewer than 2^15 codes.
+_move_cache: Dict[int, bulletchess.Move] = {}
+
+def encode_move(move: Optional[bulletchess.Move]) -> int:
+    if move is None:
+        return 0
+    return (move.origin.index()
+            | (move.destination.index() << 6)
+            | (PROMOTION_CODES[move.promotion] << 12))
+
+def decode_move(code: int) -> Optional[bulletchess.Move]:
+    if code == 0:
+        return None
+    move = _move_cache.get(code)
+    if move is None:
+        origin = SQUARES[code & 0x3F]
+        destination = SQUARES[(code >> 6) & 0x3F]
+        promotion = PROMOTION_TYPES[(code >> 12) & 0x7]
+        if promotion is None:
+            move = bulletchess.Move(origin, destination)
+        else:
+            move = bulletchess.Move(origin, destination, promotion)
+        _move_cache[code] = move
+    return move
+
+
+def _num_buckets(size_mb: float) -> int:
+    """Largest power-of-two bucket count that fits in `size_mb`."""
+    bucket_bytes = BUCKET_SIZE * BYTES_PER_ENTRY
+    num_buckets = 1
+    while num_buckets * 2 * bucket_bytes <= size_mb * 1024 * 1024:
+        num_buckets *= 2
+    return num_buckets
+
+
+class TranspositionTable:
+    """Bucketed, array-backed transposition table with generation aging."""
+
+    def __init__(self, size_mb: float = 16, buffer=None):
+        num_buckets = _num_buckets(size_mb)
+        self.num_buckets = num_buckets
+        self.num_entries = num_buckets * BUCKET_SIZE
+        self.bucket_mask = num_buckets - 1
+        self.generation = 0
+        if buffer is None:
+            self.table = array('Q', bytes(self.num_entries * BYTES_PER_ENTRY))
+        else:
+            # Externally owned memory (e.g. multiprocessing.shared_memory)
+            self.table = memoryview(buffer)[:self.num_entries * BYTES_PER_ENTRY].cast('Q')
+
+    @staticmethod
+    def bytes_needed(size_mb: float) -> int:
+        """Size of the entry array a table of `size_mb` will use."""
+        return _num_buckets(size_mb) * BUCKET_SIZE * BYTES_PER_ENTRY
+
+    def new_search(self):
+        """Advance the generation so entries from earlier searches age out first."""
+        self.generation = (self.generation + 1) & GENERATION_MASK
+
+    def clear(self):
+        self.table[:] = array('Q', bytes(self.num_entries * BYTES_PER_ENTRY))
+        self.generation = 0
+
+    def probe(self, key: int) -> Optional[TTEntry]:
+        key &= KEY_MASK
+        table = self.table
+        start = (key & self.bucket_mask) * BUCKET_SIZE * WORDS_PER_ENTRY
+        for i in range(start, start + BUCKET_SIZE * WORDS_PER_ENTRY, WORDS_PER_ENTRY):
+            data = table[i + 1]
+            if data and table[i] ^ data == key:
+                return TTEntry(
+                    ((data >> 32) - VALUE_OFFSET) / VALUE_SCALE,
+                    (data >> 16) & 0xFF,
+                    FLAG_NAMES[(data >> 24) & 0x3],
+                    decode_move(data & 0x7FFF),
+                )
+        return None
+
+    def store(self, key: int, value: float, depth: int, flag: str,
+              best_move: Optional[bulletchess.Move]):
+        """Store an entry using depth-preferred replacement with aging."""
+        key &= KEY_MASK
+        table = self.table
+        generation = self.generation
+        start = (key & self.bucket_mask) * BUCKET_SIZE * WORDS_PER_ENTRY
+
+        slot = -1
+        worst = None
+        for i in range(start, start + BUCKET_SIZE * WORDS_PER_ENTRY, WORDS_PER_ENTRY):
+            data = table[i + 1]
+            if not data:
+                if slot < 0:
+                    slot = i
+                    worst = -1 << 30
+                continue
+            if table[i] ^ data == key:
+                # Same position: keep the deeper result from the current search
+                # unless the new one is exact
+                if (depth < ((data >> 16) & 0xFF) and flag != "EXACT"
+                        and ((data >> 26) & GENERATION_MASK) == generation):
+                    return
+                if best_move is None:
+                    # Preserve the known best move for move ordering
+                    best_move = decode_move(data & 0x7FFF)
+                slot = i
+                break
+            # Prefer replacing shallow entries and entries from older searches
+            age = (generation - ((data >> 26) & GENERATION_MASK)) & GENERATION_MASK
+            worth = ((data >> 16) & 0xFF) - 8 * age
+            if worst is None or worth < worst:
+                worst = worth
+                slot = i
+
+        if value > VALUE_LIMIT:
+            value = VALUE_LIMIT
+        elif value < -VALUE_LIMIT:
+            value = -VALUE_LIMIT
+        if depth < 0:
+            depth = 0
+        elif depth > MAX_DEPTH:
+            depth = MAX_DEPTH
+
+        data = (
+            (int(round(value * VALUE_SCALE)) + VALUE_OFFSET) << 32
+            | generation << 26
+            | FLAG_CODES[flag] << 24
+            | depth << 16
+            | encode_move(best_move)
+        )
+        table[slot] = key ^ data
+        table[slot + 1] = data
+
+    def memory_bytes(self) -> int:
+        """Memory used by the entry array."""
+        return len(self.table) * self.table.itemsize
+
+    def hashfull(self) -> int:
+        """Permille of sampled slots holding an entry from the current search."""
+        table = self.table
+        sample = min(HASHFULL_SAMPLE, self.num_entries)
+        used = 0
+        for i in range(0, sample * WORDS_PER_ENTRY, WORDS_PER_ENTRY):
+            data = table[i + 1]
+            if data and ((data >> 26) & GENERATION_MASK) == self.generation:
+                used += 1
+        return used * 1000 // sample
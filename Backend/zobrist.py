@@ -0,0 +1,170 @@
+"""
+Zobrist hashing for the search.
+
+compute_key/compute_pawn_key build a key from scratch. During the search the
+keys are instead updated incrementally from the move being played (see
+SearchContext.make_move), which only touches the squares the move changes.
+
+A position key covers piece placement, side to move, castling rights and the
+en passant file. The pawn key covers pawns only and identifies a pawn
+structure for caches that depend on nothing else.
+
+The search also keeps a mailbox: a 64-entry list holding the piece index
+(PIECE_INDEX) on each square, or EMPTY. move_delta reads the moving and
+captured pieces from it and plays the move on it, so looking up the piece on
+a square never has to scan the per-type bitboards.
+"""
+import random
+from typing import Dict, List, Optional, Tuple
+import bulletchess
+from bulletchess import (
+    WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, PIECE_TYPES, Piece,
+    A1, H1, A8, H8, E1, E8,
+)
+
+_rng = random.Random(0x5EED_2B0B)
+
+def _rand64() -> int:
+    return _rng.getrandbits(64)
+
+# Piece indices: white pawn..king = 0..5, black pawn..king = 6..11
+PIECE_TYPE_INDEX = {ptype: i for i, ptype in enumerate(PIECE_TYPES)}
+PIECE_INDEX: Dict[Piece, int] = {
+    Piece(color, ptype): (0 if color == WHITE else 6) + PIECE_TYPE_INDEX[ptype]
+    for color in (WHITE, BLACK) for ptype in PIECE_TYPES
+}
+WHITE_PAWN = PIECE_INDEX[Piece(WHITE, PAWN)]
+BLACK_PAWN = PIECE_INDEX[Piece(BLACK, PAWN)]
+WHITE_KING = PIECE_INDEX[Piece(WHITE, KING)]
+BLACK_KING = PIECE_INDEX[Piece(BLACK, KING)]
+
+EMPTY = -1
+# Piece index -> piece type (index % 6 follows PIECE_TYPES)
+PIECE_INDEX_TYPES = [ptype for _ in (WHITE, BLACK) for ptype in PIECE_TYPES]
+
+PIECE_KEYS = [[_rand64() for _ in range(64)] for _ in range(12)]
+SIDE_KEY = _rand64()
+CASTLING_KEYS = [_rand64() for _ in range(16)]
+EP_FILE_KEYS = [_rand64() for _ in range(8)]
+
+# Castling rights as a 4-bit mask
+WHITE_OO, WHITE_OOO, BLACK_OO, BLACK_OOO = 1, 2, 4, 8
+_CASTLING_FEN_BITS = {"K": WHITE_OO, "Q": WHITE_OOO, "k": BLACK_OO, "q": BLACK_OOO}
+
+# Rights that survive a move touching a square (king or rook leaving/captured)
+CASTLING_KEEP = [0xF] * 64
+CASTLING_KEEP[E1.index()] &= ~(WHITE_OO | WHITE_OOO)
+CASTLING_KEEP[H1.index()] &= ~WHITE_OO
+CASTLING_KEEP[A1.index()] &= ~WHITE_OOO
+CASTLING_KEEP[E8.index()] &= ~(BLACK_OO | BLACK_OOO)
+CASTLING_KEEP[H8.index()] &= ~BLACK_OO
+CASTLING_KEEP[A8.index()] &= ~BLACK_OOO
+
+# King destination -> (rook origin, rook destination) for castling moves
+CASTLING_ROOK_MOVES = {6: (7, 5), 2: (0, 3), 62: (63, 61), 58: (56, 59)}
+
+def castling_mask(board: bulletchess.Board) -> int:
+    mask = 0
+    for ch in board.castling_rights.fen():
+        mask |= _CASTLING_FEN_BITS.get(ch, 0)
+    return mask
+
+def ep_file(board: bulletchess.Board) -> int:
+    """File of the en passant square, or -1."""
+    ep = board.en_passant_square
+    return -1 if ep is None else ep.index() % 8
+
+def compute_key(board: bulletchess.Board) -> int:
+    key = 0
+    for color in (WHITE, BLACK):
+        for ptype in PIECE_TYPES:
+            table = PIECE_KEYS[PIECE_INDEX[Piece(color, ptype)]]
+            for sq in board[color, ptype]:
+                key ^= table[sq.index()]
+    if board.turn == BLACK:
+        key ^= SIDE_KEY
+    key ^= CASTLING_KEYS[castling_mask(board)]
+    file = ep_file(board)
+    if file >= 0:
+        key ^= EP_FILE_KEYS[file]
+    return key
+
+def build_mailbox(board: bulletchess.Board) -> List[int]:
+    mailbox = [EMPTY] * 64
+    for color in (WHITE, BLACK):
+        for ptype in PIECE_TYPES:
+            index = PIECE_INDEX[Piece(color, ptype)]
+            for sq in board[color, ptype]:
+                mailbox[sq.index()] = index
+    return mailbox
+
+def compute_pawn_key(board: bulletchess.Board) -> int:
+    key = 0
+    for sq in board[WHITE, PAWN]:
+        key ^= PIECE_KEYS[WHITE_PAWN][sq.index()]
+    for sq in board[BLACK, PAWN]:
+        key ^= PIECE_KEYS[BLACK_PAWN][sq.index()]
+    return key
+
+def move_delta(mailbox: List[int], move: bulletchess.Move, castling: int,
+               ep: int) -> Tuple[int, int, int, int]:
+    """
+    Key changes caused by `move`; the move is also played on `mailbox`.
+
+    `castling` and `ep` are the current castling mask and en passant file.
+    Returns (key xor, pawn key xor, new castling mask, new ep file).
+    """
+    origin = move.origin.index()
+    dest = move.destination.index()
+    moving = mailbox[origin]
+    mailbox[origin] = EMPTY
+    key = PIECE_KEYS[moving][origin] ^ SIDE_KEY
+    pawn = 0
+    new_ep = -1
+
+    victim = mailbox[dest]
+    if victim != EMPTY:
+        key ^= PIECE_KEYS[victim][dest]
+        if victim == WHITE_PAWN or victim == BLACK_PAWN:
+            pawn ^= PIECE_KEYS[victim][dest]
+
+    if moving == WHITE_PAWN or moving == BLACK_PAWN:
+        pawn ^= PIECE_KEYS[moving][origin]
+        if ep >= 0 and victim == EMPTY and (dest - origin) % 8 != 0:
+            # En passant: the captured pawn sits behind the destination square
+            victim = BLACK_PAWN if moving == WHITE_PAWN else WHITE_PAWN
+            victim_sq = dest - 8 if moving == WHITE_PAWN else dest + 8
+            key ^= PIECE_KEYS[victim][victim_sq]
+            pawn ^= PIECE_KEYS[victim][victim_sq]
+            mailbox[victim_sq] = EMPTY
+        elif abs(dest - origin) == 16:
+            new_ep = origin % 8
+        promotion = move.promotion
+        if promotion is not None:
+            moving += PIECE_TYPE_INDEX[promotion]  # Same color, promoted type
+        else:
+            pawn ^= PIECE_KEYS[moving][dest]
+    elif (moving == WHITE_KING or moving == BLACK_KING) and abs(dest - origin) == 2:
+        rook_from, rook_to = CASTLING_ROOK_MOVES[dest]
+        rook = moving - PIECE_TYPE_INDEX[KING] + PIECE_TYPE_INDEX[ROOK]
+        key ^= PIECE_KEYS[rook][rook_from] ^ PIECE_KEYS[rook][rook_to]
+        mailbox[rook_from] = EMPTY
+        mailbox[rook_to] = rook
+
+    key ^= PIECE_KEYS[moving][dest]
+    mailbox[dest] = moving
+
+    new_castling = castling & CASTLING_KEEP[origin] & CASTLING_KEEP[dest]
+    if new_castling != castling:
+        key ^= CASTLING_KEYS[castling] ^ CASTLING_KEYS[new_castling]
+    if ep >= 0:
+        key ^= EP_FILE_KEYS[ep]
+    if new_ep >= 0:
+        key ^= EP_FILE_KEYS[new_ep]
+    return key, pawn, new_castling, new_ep
+
+def null_move_delta(ep: int) -> int:
+    key = SIDE_KEY
+    if ep >= 0:
+        key ^= EP_FILE_KEYS[ep]
+    return key